@@ -8,6 +8,9 @@ from .enums import (
     OrderType,
     OptionType,
     ExitRoutine,
+    OverflowPolicy,
+    Lane,
+    ShardMode,
 )
 
 from .config import Settings
\ No newline at end of file
@@ -1,7 +1,9 @@
+from typing import Any, List, Optional
+
 from cryptofeed.defines import COINBASE
-from pydantic import BaseSettings, PositiveInt
+from pydantic import BaseSettings, PositiveInt, validator
 
-from .enums import TradingType
+from .enums import OverflowPolicy, ShardMode, TradingType
 
 
 class Settings(BaseSettings):
@@ -24,11 +26,62 @@ class Settings(BaseSettings):
     exchanges = [COINBASE]
 
     # local path to portfolio io
-    portfolio_fp: str
+    portfolio_fp: Optional[str] = None
+
+    # max number of market data events held by the engine queue
+    queue_size: PositiveInt = 10000
+
+    # what to do with market data when the engine queue is full
+    overflow_policy: OverflowPolicy = OverflowPolicy.BLOCK
+
+    # number of worker processes handlers are sharded over, 1 runs them in process
+    shards: PositiveInt = 1
+
+    # how handlers and market data are split over the shards
+    shard_mode: ShardMode = ShardMode.SYMBOL
+
+    # ray cluster for cpu bound callbacks, None starts a local one
+    ray_address: Optional[str] = None
+
+    # run ray tasks in process, for debugging and tests
+    ray_local_mode = False
+
+    # stamp events and keep per event type and per callback latency histograms
+    latency_stats = True
+
+    # local port to serve prometheus metrics on, None does not export them
+    metrics_port: Optional[int] = None
 
-    alpha_models: List[AlphaModel] = []
+    # run cryptofeed in its own process, ticks reach the engine through shared memory
+    feed_process = False
+
+    # number of ticks the shared memory ring holds, rounded up to a power of two
+    feed_ring_size: PositiveInt = 65536
+
+    # binary journal every dispatched event is appended to, None does not journal
+    journal_fp: Optional[str] = None
+
+    # directory ticks are stored under, partitioned by instrument and day, None does not store them
+    tick_store_fp: Optional[str] = None
+
+    # seconds a handler callback may take per event, None for no limit
+    handler_timeout: Optional[float] = None
+
+    # consecutive failures or timeouts that trip a handler out of dispatch
+    breaker_threshold: PositiveInt = 5
+
+    # seconds of engine time a tripped handler sits out
+    breaker_cooldown: float = 60.0
+
+    alpha_models: List[Any] = []
+
+    @validator("shards")
+    def _replays_unsharded(cls, shards: int, values: dict) -> int:
+        # backtests replay synchronously in one process, see `Backtest`
+        if shards > 1 and values.get("trading_type") == TradingType.BACKTEST:
+            raise ValueError("backtests run unsharded, shards must be 1")
+        return shards
     
 
    
 
-
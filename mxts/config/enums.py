@@ -72,6 +72,29 @@ class EventType(BaseEnum):
     EXIT = "EXIT"
 
 
+class Lane(BaseEnum):
+    # engine dispatch priority, highest first
+    ORDER_ENTRY = "ORDER_ENTRY"
+    SYSTEM = "SYSTEM"
+    MARKET_DATA = "MARKET_DATA"
+
+
+class OverflowPolicy(BaseEnum):
+    # wait for the consumer to free a slot
+    BLOCK = "BLOCK"
+    # evict the oldest queued market data event
+    DROP_OLDEST = "DROP_OLDEST"
+    # always replace a queued event for the same instrument with the latest one
+    CONFLATE = "CONFLATE"
+
+
+class ShardMode(BaseEnum):
+    # every shard runs every strategy on a slice of the symbols
+    SYMBOL = "SYMBOL"
+    # strategies are spread over the shards, each sees every symbol
+    STRATEGY = "STRATEGY"
+
+
 class DataType(BaseEnum):
     DATA = "DATA"
     ERROR = "ERROR"
@@ -0,0 +1,4 @@
+from ..config.enums import ExchangeType
+from .data import Error, Event, Instrument, Order, Position, Result, Trade
+from .handler import EventHandler
+from .order_book import OrderBook
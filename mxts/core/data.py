@@ -19,6 +19,12 @@ from ..config.enums import (
 class Event(BaseModel):
     type: EventType
     data: Any
+    # latency stamps on the monotonic clock in nanoseconds, see `mxts.engine.latency`
+    exchange_ts: Optional[int] = None
+    receipt_ts: Optional[int] = None
+    enqueue_ts: Optional[int] = None
+    dispatch_ts: Optional[int] = None
+    complete_ts: Optional[int] = None
 
 
 class Error(BaseModel):
@@ -29,6 +35,13 @@ class Error(BaseModel):
     callback: Callable
 
 
+class Result(BaseModel):
+    type: DataType = DataType.DATA
+    data: Any
+    value: Any
+    callback: str
+
+
 class Instrument(BaseModel):
     """
     Args:
@@ -59,6 +72,7 @@ class Instrument(BaseModel):
         leg2_side (Side):
             Applies to: SPREAD
     """
+    name: str
     exchange: ExchangeType
     type: InstrumentType
     broker_id: Optional[str]
@@ -1,23 +1,129 @@
-import asyncio
+import dis
+from typing import Dict, Tuple
 # from typing import TYPE_CHECKING, Callable, Optional, Tuple
 
 from mxts.config.enums import EventType
 
 from .data import Event
 
-def callback(*events):
+def callback(*events, conflate=False):
+    """register a coroutine as the callback for `events`
+
+    Args:
+        events (EventType): event types to subscribe to, if omitted the
+            events of the overridden callback are inherited
+        conflate (bool): if the callback falls behind, only deliver the
+            latest tick per (exchange, instrument) instead of every tick
+    """
     def inner(func):
         if not hasattr(func, 'registered'):
             setattr(func, 'registered', True)
             setattr(func, 'events', events)
+            setattr(func, 'conflate', conflate)
         return func
     return inner
 
+
+def batched(max_size=1024, max_wait=0.05):
+    """register a coroutine as a batched tick callback, it receives a columnar
+    `TickBatch` of every `Ticker` event since its last call instead of one call per tick
+
+    Args:
+        max_size (int): max ticks per batch
+        max_wait (float): max seconds a tick waits before its batch is delivered
+    """
+    def inner(func):
+        func = callback(EventType.TICKER)(func)
+        setattr(func, 'batch', (max_size, max_wait))
+        return func
+    return inner
+
+
+def cpu_bound(*events, actors=1, max_pending=8):
+    """register a synchronous, CPU heavy method as the callback for `events`
+
+    The method runs in Ray actors, each holding a copy of the handler taken at
+    registration time, and its return value comes back to the engine as a
+    `Data` event carrying a `Result`.
+
+    Args:
+        events (EventType): event types to subscribe to
+        actors (int): number of Ray actors to spread calls over
+        max_pending (int): max in flight calls per actor before dispatch waits
+    """
+    def inner(func):
+        func = callback(*events)(func)
+        setattr(func, 'cpu_bound', (actors, max_pending))
+        return func
+    return inner
+
+
+def _events(cls: type, name: str) -> tuple:
+    """events of the nearest `callback` decorated definition of `name` in the mro,
+    so subclasses can override a callback without re-decorating it"""
+    for klass in cls.__mro__:
+        events = getattr(klass.__dict__.get(name), 'events', None)
+        if events:
+            return events
+    return ()
+
+
+# opcodes of a body that does nothing but return None, across python versions
+_NOOP_OPS = frozenset(
+    ("RESUME", "RETURN_GENERATOR", "GEN_START", "POP_TOP", "NOP", "CACHE", "LOAD_CONST", "RETURN_VALUE", "RETURN_CONST")
+)
+
+
+def _noop(func) -> bool:
+    """whether a function body is empty, i.e. only `pass`, `...` or a docstring"""
+    code = getattr(func, '__code__', None)
+    if code is None:
+        return False
+    for ins in dis.get_instructions(code):
+        if ins.opname not in _NOOP_OPS:
+            return False
+        if ins.opname in ("LOAD_CONST", "RETURN_CONST") and ins.argval is not None:
+            return False
+    return True
+
+
+def _callbacks(cls: type) -> Dict[str, Tuple[EventType, ...]]:
+    """events of every `on_*` callback of a class, leaving out inherited empty
+    bodies (e.g. the defaults of `EventHandler`); the class' own definitions
+    are kept even if empty"""
+    callbacks = {}
+    for name in dir(cls):
+        if not name.startswith("on_"):
+            continue
+        events = _events(cls, name)
+        if events and (name in cls.__dict__ or not _noop(getattr(cls, name))):
+            callbacks[name] = events
+    return callbacks
+
+
 class EventHandler():
-    
-    def __init__(self) -> None:
-        cb_names = [m for m in dir(self) if m.startswith("on_")]
-        self.callbacks = {m: getattr(getattr(self, m), 'events', []) for m in cb_names}
+    """Base class of everything that receives engine events
+
+    The callbacks a class subscribes, `callbacks`, are worked out once when
+    the class is created rather than per instance, and inherited callbacks
+    with an empty body are left out, so the engine never schedules a
+    coroutine for a no-op default a subclass did not override.
+    """
+
+    # name -> events of the callbacks the engine dispatches to, see `_callbacks`,
+    # none for this class as every default is a no-op
+    callbacks: Dict[str, Tuple[EventType, ...]] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.callbacks = _callbacks(cls)
+
+    def __getstate__(self) -> dict:
+        # the engine a handler is registered with (`_manager`) stays behind when
+        # the handler is pickled, e.g. into a ray actor, it holds queues and files
+        state = self.__dict__.copy()
+        state.pop('_manager', None)
+        return state
         
     #################################################
     # Event Handler Callback                        #
@@ -28,9 +134,7 @@ class EventHandler():
     @callback(EventType.TRADE)
     async def on_trade(self, event: Event) -> None:
         """Called whenever a `Trade` event is received"""
-        #print("calling on_trade")
-        await asyncio.sleep(2)
-        return
+        pass
 
     @callback(EventType.OPEN, EventType.CANCEL)
     async def on_order(self, event: Event) -> None:
@@ -86,6 +190,10 @@ class EventHandler():
         """Called once at engine exit time"""
         pass
 
+    async def on_ticks(self, batch) -> None:
+        """Called with a `TickBatch` of ticks, opt in by decorating an override with `batched`"""
+        pass
+
     ################################################
     # Order Entry Callbacks                        #
     #                                              #
@@ -120,3 +228,4 @@ class EventHandler():
     async def on_canceled(self, event: Event) -> None:
         """Called on my order canceled"""
         pass
+
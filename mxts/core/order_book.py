@@ -0,0 +1,114 @@
+import heapq
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+from ..config.enums import OrderFlag, OrderType, Side
+from .data import Order
+
+
+class OrderBook:
+    """Price-time priority book of resting orders for a single instrument
+
+    Limit orders rest in one heap per side, keyed by price then arrival, and
+    `Stop` orders wait in a second pair of heaps keyed by trigger price. Adds
+    are O(log n); cancels are O(1) and leave a dead heap entry behind that is
+    discarded when it reaches the top.
+    """
+
+    def __init__(self) -> None:
+        self._seq = itertools.count()
+        self._limits: Dict[Side, list] = {Side.BUY: [], Side.SELL: []}
+        self._stops: Dict[Side, list] = {Side.BUY: [], Side.SELL: []}
+        self._orders: Dict[int, Order] = {}
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._orders
+
+    def add(self, order: Order) -> None:
+        """rest an order, bids and sell stops are keyed on negated price"""
+        buy = order.side == Side.BUY
+        if order.order_type == OrderType.STOP:
+            # buy stops trigger lowest first, sell stops highest first
+            heap, key = self._stops[order.side], order.price if buy else -order.price
+        else:
+            heap, key = self._limits[order.side], -order.price if buy else order.price
+        heapq.heappush(heap, (key, next(self._seq), order))
+        self._orders[order.id] = order
+
+    def remove(self, order_id: int) -> Optional[Order]:
+        """take an order out of the book, returns None if it is not resting"""
+        return self._orders.pop(order_id, None)
+
+    def _peek(self, heap: list) -> Optional[Tuple[float, int, Order]]:
+        while heap:
+            order = heap[0][2]
+            if self._orders.get(order.id) is order:
+                return heap[0]
+            # cancelled or filled, drop the stale entry
+            heapq.heappop(heap)
+        return None
+
+    def best(self, side: Side) -> Optional[Order]:
+        """top of book resting limit order on `side`"""
+        entry = self._peek(self._limits[side])
+        return entry[2] if entry else None
+
+    def match(self, side: Side, price: float, size: float) -> List[Tuple[Order, float]]:
+        """fill resting `side` orders priced at or through `price`, up to `size`
+
+        Orders are filled in price-time priority and their `filled` is updated
+        in place. An `ALL_OR_NONE` order that cannot be filled completely is
+        passed over without losing its place.
+
+        Returns:
+            list of (order, filled volume)
+        """
+        heap = self._limits[side]
+        buy = side == Side.BUY
+        fills: List[Tuple[Order, float]] = []
+        skipped = []
+
+        while size > 0:
+            entry = self._peek(heap)
+            if entry is None:
+                break
+            order = entry[2]
+            if (order.price < price) if buy else (order.price > price):
+                break
+
+            remaining = order.volume - order.filled
+            if order.flag == OrderFlag.ALL_OR_NONE and remaining > size:
+                skipped.append(heapq.heappop(heap))
+                continue
+
+            volume = min(remaining, size)
+            order.filled += volume
+            size -= volume
+            fills.append((order, volume))
+            if volume == remaining:
+                heapq.heappop(heap)
+                del self._orders[order.id]
+
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return fills
+
+    def triggered(self, bid: float, ask: float) -> List[Order]:
+        """remove and return stop orders triggered by the market, buy stops
+        trigger once `ask` reaches their price and sell stops once `bid` does"""
+        out = []
+        for side, heap in self._stops.items():
+            while True:
+                entry = self._peek(heap)
+                if entry is None:
+                    break
+                order = entry[2]
+                if (ask < order.price) if side == Side.BUY else (bid > order.price):
+                    break
+                heapq.heappop(heap)
+                del self._orders[order.id]
+                out.append(order)
+        return out
@@ -0,0 +1,102 @@
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+from mxts.config import EventType
+from mxts.core.data import Event
+
+if TYPE_CHECKING:
+    from mxts.engine.engine import TradingEngine
+
+NANOS = 1_000_000_000
+
+
+def event_time(event: Event) -> Optional[int]:
+    """exchange timestamp of an event in epoch nanoseconds, if it has one"""
+    ts: Any = getattr(event.data, "timestamp", None)
+    if ts is None:
+        return None
+    if isinstance(ts, int):
+        return ts
+    if isinstance(ts, float):
+        return int(ts * NANOS)
+    # datetime like
+    return int(ts.timestamp() * NANOS)
+
+
+class Backtest:
+    """Deterministic, as fast as possible replay of historical events
+
+    Events are handed straight to the engine's `process_event`, so handlers
+    see exactly the dispatch they get live, without a trip through the event
+    queue. Before each event the simulated clock behind `TradingEngine.now`
+    is moved to the event's timestamp and any heartbeats and periodics due in
+    between are run, periodics first when both are due. Across a gap in the
+    events longer than `max_heartbeats` heartbeats only the last
+    `max_heartbeats` are sent, so a gap of days (or a bad timestamp) costs
+    no more than a short one. Events raised while handling an event (errors,
+    results, order events) are drained before the next historical event, so
+    a replay only depends on its input.
+
+    Args:
+        engine (TradingEngine): engine to drive, in `BACKTEST` or `SIMULATION` mode
+        events (Iterable[Event]): historical events, in time order
+        max_heartbeats (int): max heartbeats sent between two events
+    """
+
+    def __init__(self, engine: "TradingEngine", events: Iterable[Event], max_heartbeats: int = 100) -> None:
+        self.engine = engine
+        self.events = events
+        self.max_heartbeats = max_heartbeats
+        self.count = 0
+
+    async def run(self) -> None:
+        engine = self.engine
+        engine._replaying = True
+        try:
+            await self._replay()
+        finally:
+            engine._replaying = False
+
+    async def _replay(self) -> None:
+        engine = self.engine
+        process_event = engine.process_event
+        settle = engine.settle
+        heartbeat = engine.config.heartbeat * NANOS
+        next_heartbeat: Optional[int] = None
+
+        await process_event(Event(type=EventType.START, data=None))
+
+        for event in self.events:
+            ts = event_time(event)
+            if ts is not None:
+                if next_heartbeat is None:
+                    next_heartbeat = ts + heartbeat
+                missed = (ts - next_heartbeat) // heartbeat + 1
+                if missed > self.max_heartbeats:
+                    # skip to the last heartbeats due before the event
+                    next_heartbeat += (missed - self.max_heartbeats) * heartbeat
+                while ts >= next_heartbeat:
+                    await self.timers(next_heartbeat)
+                    engine._latest = next_heartbeat
+                    await process_event(Event(type=EventType.HEARTBEAT, data=None))
+                    await settle()
+                    next_heartbeat += heartbeat
+                await self.timers(ts)
+                engine._latest = ts
+
+            await process_event(event)
+            await settle()
+            self.count += 1
+
+        await engine.flush()
+        # e.g. the last bars, flushed above
+        await settle()
+        await process_event(Event(type=EventType.EXIT, data=None))
+
+    async def timers(self, until: int) -> None:
+        """run the periodics due by `until` (epoch nanoseconds), each on its own time"""
+        engine = self.engine
+        periodics = engine.periodics
+        for when, periodic in periodics.expired(until):
+            engine._latest = when
+            await periodics.run(periodic)
+            await engine.settle()
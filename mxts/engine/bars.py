@@ -0,0 +1,214 @@
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple, Union
+
+from mxts.config import EventType
+from mxts.core.data import Event
+from mxts.core.handler import EventHandler, callback
+
+SECOND = 1_000_000_000
+
+# fixed length `CandlestickGranularity`s in seconds, `W` and `M` are calendar aligned
+GRANULARITIES = {
+    "S5": 5,
+    "S10": 10,
+    "S15": 15,
+    "S30": 30,
+    "M1": 60,
+    "M2": 120,
+    "M4": 240,
+    "M5": 300,
+    "M10": 600,
+    "M15": 900,
+    "M30": 1800,
+    "H1": 3600,
+    "H2": 7200,
+    "H3": 10800,
+    "H4": 14400,
+    "H6": 21600,
+    "H8": 28800,
+    "H12": 43200,
+    "D": 86400,
+    "W": 7 * 86400,
+}
+
+# the epoch is a Thursday, weekly bars start on Mondays
+_MONDAY = 4 * 86400 * SECOND
+
+KINDS = ("time", "tick", "volume", "dollar")
+
+
+class Bar:
+    """OHLCV bar of one instrument, delivered as the data of a `Data` event
+
+    Args:
+        exchange: exchange of the instrument
+        symbol: the instrument
+        kind (str): one of `KINDS`
+        size: granularity of time bars, tick count, volume or dollar value of the others
+        start (int): epoch nanoseconds the bar opens at, the first tick for non time bars
+        end (int): epoch nanoseconds the bar closes at, the last tick for non time bars
+    """
+
+    __slots__ = (
+        "exchange",
+        "symbol",
+        "kind",
+        "size",
+        "start",
+        "end",
+        "open",
+        "high",
+        "low",
+        "close",
+        "volume",
+        "notional",
+        "ticks",
+    )
+
+    def __init__(
+        self, exchange: Hashable, symbol: Hashable, kind: str, size: Union[str, float], start: int, end: int, price: float
+    ) -> None:
+        self.exchange = exchange
+        self.symbol = symbol
+        self.kind = kind
+        self.size = size
+        self.start = start
+        self.end = end
+        self.open = self.high = self.low = self.close = price
+        self.volume = 0.0
+        self.notional = 0.0
+        self.ticks = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<Bar({self.exchange} {self.symbol} {self.kind} {self.size} @ {self.start} "
+            f"o={self.open} h={self.high} l={self.low} c={self.close} v={self.volume})>"
+        )
+
+
+def _month(timestamp: int) -> Tuple[int, int]:
+    """(start, end) in epoch nanoseconds of the UTC month of a timestamp"""
+    day = datetime.fromtimestamp(timestamp // SECOND, tz=timezone.utc)
+    start = datetime(day.year, day.month, 1, tzinfo=timezone.utc)
+    end = datetime(day.year + day.month // 12, day.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp()) * SECOND, int(end.timestamp()) * SECOND
+
+
+class BarAggregator(EventHandler):
+    """Builds OHLCV bars of every instrument from the live or replayed ticks
+
+    Bars are cut on the timestamps carried by the market data, never the
+    wall clock, so a replay produces the same bars as the live session it
+    was recorded from. Time bars are aligned like `CandlestickGranularity`
+    and emitted on the first tick past their end, intervals without ticks
+    produce no bar. Tick, volume and dollar bars are emitted by the tick that
+    takes their count, volume or traded value to `size`. Each tick is O(1)
+    and only the open bar of each instrument is kept.
+
+    Args:
+        push_event (Callable): engine coroutine the `Data` events are pushed through
+        kind (str): one of `KINDS`
+        size: granularity (e.g. "M1") or seconds of time bars, the tick
+            count, volume or dollar value of the others
+        source (EventType): `Trade` prints, or `Ticker` mid prices which
+            carry no volume and so can only make time and tick bars
+    """
+
+    def __init__(
+        self,
+        push_event: Callable[..., Awaitable[None]],
+        kind: str = "time",
+        size: Union[str, float] = "M1",
+        source: EventType = EventType.TRADE,
+    ) -> None:
+        if kind not in KINDS:
+            raise ValueError(f"unknown bar kind {kind}, expected one of {KINDS}")
+        if source not in (EventType.TRADE, EventType.TICKER):
+            raise ValueError(f"bars are built from TRADE or TICKER events, not {source}")
+        if source == EventType.TICKER and kind in ("volume", "dollar"):
+            raise ValueError(f"{kind} bars need TRADE events, tickers carry no volume")
+        self._push_event = push_event
+        self.kind = kind
+        self.size = size
+        self.source = source
+        self.interval = 0
+        if kind == "time":
+            if size == "M":
+                self.interval = -1
+            else:
+                seconds = GRANULARITIES.get(size) if isinstance(size, str) else size
+                if not seconds or seconds <= 0:
+                    raise ValueError(f"unknown bar granularity {size}")
+                self.interval = int(seconds * SECOND)
+        elif size <= 0:  # type: ignore[operator]
+            raise ValueError(f"bar size must be positive, got {size}")
+        self.emitted = 0
+        self._bars: Dict[Tuple[Hashable, Hashable], Bar] = {}
+
+    def _bounds(self, timestamp: int) -> Tuple[int, int]:
+        """(start, end) of the time bar a timestamp falls in"""
+        if self.interval < 0:
+            return _month(timestamp)
+        offset = _MONDAY if self.size == "W" else 0
+        start = timestamp - (timestamp - offset) % self.interval
+        return start, start + self.interval
+
+    @callback(EventType.TICKER)
+    async def on_ticker(self, event: Event) -> None:
+        if self.source == EventType.TICKER:
+            data = event.data
+            await self.update(data.exchange, data.symbol, _timestamp(data), (float(data.bid) + float(data.ask)) / 2, 0.0)
+
+    @callback(EventType.TRADE)
+    async def on_trade(self, event: Event) -> None:
+        if self.source == EventType.TRADE:
+            data = event.data
+            await self.update(data.exchange, data.symbol, _timestamp(data), float(data.price), float(data.amount))
+
+    async def update(self, exchange: Hashable, symbol: Hashable, timestamp: int, price: float, volume: float) -> None:
+        """add a tick, `timestamp` in epoch nanoseconds"""
+        key = (exchange, symbol)
+        bar = self._bars.get(key)
+        if bar is not None and self.interval and timestamp >= bar.end:
+            del self._bars[key]
+            await self._emit(bar)
+            bar = None
+        if bar is None:
+            start, end = self._bounds(timestamp) if self.interval else (timestamp, timestamp)
+            bar = self._bars[key] = Bar(exchange, symbol, self.kind, self.size, start, end, price)
+
+        if price > bar.high:
+            bar.high = price
+        elif price < bar.low:
+            bar.low = price
+        bar.close = price
+        bar.volume += volume
+        bar.notional += price * volume
+        bar.ticks += 1
+
+        if self.interval:
+            return
+        bar.end = timestamp
+        kind = self.kind
+        filled = bar.ticks if kind == "tick" else bar.volume if kind == "volume" else bar.notional
+        if filled >= self.size:  # type: ignore[operator]
+            del self._bars[key]
+            await self._emit(bar)
+
+    async def _emit(self, bar: Bar) -> None:
+        self.emitted += 1
+        await self._push_event(Event(type=EventType.DATA, data=bar), False)
+
+    async def flush(self) -> None:
+        """emit every open bar, e.g. at the end of a session"""
+        bars, self._bars = self._bars, {}
+        for bar in bars.values():
+            await self._emit(bar)
+
+
+def _timestamp(data) -> int:
+    """epoch nanoseconds of a cryptofeed trade or ticker, at its exchange time if it has one"""
+    timestamp: Optional[float] = getattr(data, "timestamp", None)
+    if timestamp is None:
+        timestamp = data.receipt_timestamp
+    return int(timestamp * SECOND)
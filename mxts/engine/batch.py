@@ -0,0 +1,188 @@
+import asyncio
+import math
+from functools import partial
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from mxts.config import EventType
+from mxts.core.data import Event
+
+
+class SymbolTable:
+    """Stable integer codes for (exchange, symbol) pairs"""
+
+    def __init__(self) -> None:
+        self._codes: Dict[Hashable, int] = {}
+        self._keys: List[Tuple[Hashable, Hashable]] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def code(self, exchange: Hashable, symbol: Hashable) -> int:
+        key = (exchange, symbol)
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self._keys)
+            self._keys.append(key)
+        return code
+
+    def lookup(self, code: int) -> Tuple[Hashable, Hashable]:
+        """(exchange, symbol) of a code"""
+        return self._keys[code]
+
+
+class TickBatch:
+    """Columnar batch of ticks
+
+    The arrays are views onto the batcher's buffers and are only valid until
+    the batched callback returns, copy them to keep them around.
+
+    Args:
+        timestamp (np.ndarray): exchange timestamps, float64 epoch seconds
+        instrument (np.ndarray): int32 instrument codes, see `symbols`
+        bid (np.ndarray): float64 best bids
+        ask (np.ndarray): float64 best asks
+        size (np.ndarray): float64 tick sizes, NaN if the feed has none
+        symbols (SymbolTable): instrument code lookup
+    """
+
+    __slots__ = ("timestamp", "instrument", "bid", "ask", "size", "symbols")
+
+    def __init__(
+        self,
+        timestamp: np.ndarray,
+        instrument: np.ndarray,
+        bid: np.ndarray,
+        ask: np.ndarray,
+        size: np.ndarray,
+        symbols: SymbolTable,
+    ) -> None:
+        self.timestamp = timestamp
+        self.instrument = instrument
+        self.bid = bid
+        self.ask = ask
+        self.size = size
+        self.symbols = symbols
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __repr__(self) -> str:
+        return f"<TickBatch(size={len(self)})>"
+
+
+class _Buffer:
+    __slots__ = ("timestamp", "instrument", "bid", "ask", "size")
+
+    def __init__(self, capacity: int) -> None:
+        self.timestamp = np.empty(capacity, dtype=np.float64)
+        self.instrument = np.empty(capacity, dtype=np.int32)
+        self.bid = np.empty(capacity, dtype=np.float64)
+        self.ask = np.empty(capacity, dtype=np.float64)
+        self.size = np.empty(capacity, dtype=np.float64)
+
+
+def _float(value: Optional[object]) -> float:
+    return math.nan if value is None else float(value)  # type: ignore[arg-type]
+
+
+class TickBatcher:
+    """Accumulates ticks into preallocated columns for a batched callback
+
+    A batch is handed to the callback once it holds `max_size` ticks or
+    `max_wait` seconds after its first tick, whichever comes first; with
+    `max_wait` None batches are only cut by size and `flush`. Ticks keep
+    filling a second buffer while the callback runs; if that one fills up
+    too the dispatcher waits for the callback, so memory stays fixed.
+
+    Args:
+        callback (Callable): the batched `on_ticks` coroutine
+        symbols (SymbolTable): engine wide instrument codes
+        max_size (int): max ticks per batch
+        max_wait (Optional[float]): max seconds a tick waits for its batch to be delivered
+        guard (Callable): coroutine called with (event, callback, call) that
+            awaits `call()`, the call of the callback, under the handler's
+            time budget and circuit breaker and reports its failures
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[TickBatch], Awaitable[None]],
+        symbols: SymbolTable,
+        max_size: int,
+        max_wait: Optional[float],
+        guard: Callable[[Event, Callable, Callable[[], Awaitable[None]]], Awaitable[None]],
+    ) -> None:
+        self.callback = callback
+        self.symbols = symbols
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self._guard = guard
+        self._buffers = [_Buffer(max_size), _Buffer(max_size)]
+        self._size = 0
+        self._deadline = 0.0
+        self._full = asyncio.Event()
+        self._space = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def __call__(self, event: Event) -> None:
+        while self._size == self.max_size:
+            self._space.clear()
+            await self._space.wait()
+
+        data = event.data
+        buf, i = self._buffers[0], self._size
+        buf.timestamp[i] = _float(getattr(data, "timestamp", None))
+        buf.instrument[i] = self.symbols.code(
+            getattr(data, "exchange", None),
+            getattr(data, "symbol", getattr(data, "instrument", None)),
+        )
+        buf.bid[i] = _float(getattr(data, "bid", None))
+        buf.ask[i] = _float(getattr(data, "ask", None))
+        buf.size[i] = _float(getattr(data, "size", None))
+        self._size += 1
+
+        if self._size == 1 and self.max_wait is not None:
+            self._deadline = asyncio.get_event_loop().time() + self.max_wait
+        if self._size == self.max_size:
+            self._full.set()
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._deliver())
+
+    def _take(self) -> TickBatch:
+        buf, n = self._buffers[0], self._size
+        self._buffers.reverse()
+        self._size = 0
+        self._full.clear()
+        self._space.set()
+        return TickBatch(
+            buf.timestamp[:n], buf.instrument[:n], buf.bid[:n], buf.ask[:n], buf.size[:n], self.symbols
+        )
+
+    async def _deliver(self) -> None:
+        loop = asyncio.get_event_loop()
+        try:
+            while self._size:
+                if self.max_wait is None:
+                    await self._full.wait()
+                elif self._size < self.max_size and self._deadline > loop.time():
+                    try:
+                        await asyncio.wait_for(self._full.wait(), self._deadline - loop.time())
+                    except asyncio.TimeoutError:
+                        pass
+
+                batch = self._take()
+                self.batches += 1
+                event = Event(type=EventType.TICKER, data=batch)
+                await self._guard(event, self.callback, partial(self.callback, batch))
+        finally:
+            self._task = None
+
+    async def flush(self) -> None:
+        """deliver every buffered tick now"""
+        if self._task is not None:
+            self._full.set()
+        while self._task is not None:
+            await asyncio.shield(self._task)
@@ -0,0 +1,63 @@
+from typing import Callable, Dict, Optional
+
+from mxts.core.handler import EventHandler
+
+
+class CircuitBreaker:
+    """Per handler time budget and circuit breaker
+
+    Every callback of the handler is given `timeout` seconds per event (no
+    limit if None), overrunning counts as a failure just like raising. Once
+    any one callback fails `threshold` times in a row the breaker trips: the
+    engine stops dispatching to the handler for `cooldown` seconds of engine
+    time, then re-admits it half open, so a single further failure of that
+    callback trips it again while a success closes it.
+
+    Args:
+        handler (EventHandler): the guarded handler
+        timeout (Optional[float]): seconds a callback may take per event
+        threshold (int): consecutive failures that trip the breaker
+        cooldown (float): seconds a tripped handler sits out
+    """
+
+    __slots__ = ("handler", "timeout", "threshold", "cooldown", "failures", "trips", "reopen_at")
+
+    def __init__(self, handler: EventHandler, timeout: Optional[float], threshold: int, cooldown: float) -> None:
+        self.handler = handler
+        self.timeout = timeout
+        self.threshold = threshold
+        self.cooldown = cooldown
+        # consecutive failures per failing callback
+        self.failures: Dict[Callable, int] = {}
+        self.trips = 0
+        # engine time in epoch nanoseconds the handler is re-admitted at, None while closed
+        self.reopen_at: Optional[int] = None
+
+    @property
+    def tripped(self) -> bool:
+        return self.reopen_at is not None
+
+    def failure(self, callback: Callable) -> bool:
+        """count a failure of a callback, returns whether the breaker should trip"""
+        failures = self.failures[callback] = self.failures.get(callback, 0) + 1
+        return failures >= self.threshold and self.reopen_at is None
+
+    def success(self, callback: Callable) -> None:
+        if self.failures:
+            self.failures.pop(callback, None)
+
+    def trip(self, now: int) -> None:
+        self.reopen_at = now + int(self.cooldown * 1_000_000_000)
+        self.trips += 1
+
+    def readmit(self) -> None:
+        """half open, the next failure trips the breaker again"""
+        self.reopen_at = None
+        for callback in self.failures:
+            self.failures[callback] = self.threshold - 1
+
+    def __repr__(self) -> str:
+        return (
+            f"<CircuitBreaker({type(self.handler).__name__}, failures={sum(self.failures.values())}, "
+            f"trips={self.trips}, tripped={self.tripped})>"
+        )
@@ -0,0 +1,56 @@
+import asyncio
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from mxts.core.data import Event
+from mxts.engine.event_queue import MARKET_DATA_EVENTS, conflation_key
+
+
+class ConflatingCallback:
+    """Wraps a slow callback so it only ever sees the freshest tick
+
+    Calling the wrapper never waits on the callback: events are parked per
+    (type, exchange, instrument) and a newer tick overwrites a parked one.
+    A background task delivers parked events, oldest instrument first,
+    whenever the callback is free. Non market data events are never merged.
+
+    Args:
+        callback (Callable): the wrapped `on_*` coroutine
+        guard (Callable): coroutine called with (event, callback, call) that
+            awaits `call()`, the call of the callback, under the handler's
+            time budget and circuit breaker and reports its failures
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Event], Awaitable[None]],
+        guard: Callable[[Event, Callable, Callable[[], Awaitable[None]]], Awaitable[None]],
+    ) -> None:
+        self.callback = callback
+        self.conflated = 0
+        self._guard = guard
+        self._pending: Dict[Hashable, Event] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def __call__(self, event: Event) -> None:
+        key: Any = conflation_key(event) if event.type in MARKET_DATA_EVENTS else object()
+        if key in self._pending:
+            self.conflated += 1
+        self._pending[key] = event
+
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._deliver())
+
+    async def _deliver(self) -> None:
+        try:
+            while self._pending:
+                key = next(iter(self._pending))
+                event = self._pending.pop(key)
+                await self._guard(event, self.callback, partial(self.callback, event))
+        finally:
+            self._task = None
+
+    async def join(self) -> None:
+        """wait until every parked event has been delivered"""
+        while self._task is not None:
+            await asyncio.shield(self._task)
@@ -0,0 +1,133 @@
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from mxts.engine.snapshot import MID, SnapshotMatrix
+
+
+class RollingCovariance:
+    """Covariance and correlation matrix of the log mid returns of a snapshot's instruments
+
+    The snapshot is sampled every `interval` of market data time, on the
+    first tick at or past each sample time, and every sample's return vector
+    `r` updates the matrices in place with outer products:
+
+        exponentially weighted, with `halflife` samples:
+            d = r - mean, mean += a d, cov = (1 - a)(cov + a d d')
+        over the last `window` samples:
+            sums += r - r_old, products += r r' - r_old r_old'
+
+    so a sample costs O(N^2) whatever the history length. Returns of
+    instruments without a quote on both sides of a sample count as 0.
+    `cov` and `corr` are read-only views of the matrices, they change in
+    place on every sample. Instruments added to the snapshot later are not
+    tracked.
+
+    Args:
+        snapshot (SnapshotMatrix): quotes to sample
+        interval (int): nanoseconds between samples
+        halflife (Optional[float]): samples over which a return's weight halves
+        window (Optional[int]): samples in the window, if `halflife` is None
+    """
+
+    def __init__(
+        self, snapshot: SnapshotMatrix, interval: int, halflife: Optional[float] = None, window: Optional[int] = None
+    ) -> None:
+        if (halflife is None) == (window is None):
+            raise ValueError("pass exactly one of halflife and window")
+        if (halflife is not None and halflife <= 0) or (window is not None and window < 2):
+            raise ValueError("halflife must be positive and window at least 2")
+        self.snapshot = snapshot
+        self.interval = interval
+        self.halflife = halflife
+        self.window = window
+        self.instruments: List[str] = list(snapshot.instruments)
+        n = len(self.instruments)
+        # sample time the next update is due at, epoch nanoseconds
+        self.due = 0
+        self.samples = 0
+        self._prices: Optional[np.ndarray] = None
+        self._cov = np.zeros((n, n))
+        self._corr = np.full((n, n), np.nan)
+        self._scratch = np.empty((n, n))
+        if halflife is not None:
+            self._alpha = 1 - 0.5 ** (1 / halflife)
+            self._mean = np.zeros(n)
+        else:
+            self._returns = np.zeros((window, n))
+            self._sums = np.zeros(n)
+            self._products = np.zeros((n, n))
+
+    def sample(self, time: int) -> None:
+        """take a sample of the snapshot at `time`, epoch nanoseconds"""
+        self.due = time - time % self.interval + self.interval
+        n = len(self.instruments)
+        prices = self.snapshot.values[:n, MID]
+        if self._prices is None:
+            self._prices = prices.copy()
+            return
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.log(prices / self._prices)
+        returns[~np.isfinite(returns)] = 0.0
+        quoted = np.isfinite(prices)
+        self._prices[quoted] = prices[quoted]
+
+        if self.halflife is not None:
+            self._weighted(returns)
+        else:
+            self._windowed(returns)
+        self.samples += 1
+        self._correlate()
+
+    def _weighted(self, returns: np.ndarray) -> None:
+        a = self._alpha
+        d = returns - self._mean
+        self._mean += a * d
+        np.outer(d, d, out=self._scratch)
+        self._scratch *= a
+        self._cov += self._scratch
+        self._cov *= 1 - a
+
+    def _windowed(self, returns: np.ndarray) -> None:
+        slot = self.samples % self.window  # type: ignore[operator]
+        old = self._returns[slot]
+        self._sums += returns - old
+        self._products += np.outer(returns, returns, out=self._scratch)
+        self._products -= np.outer(old, old, out=self._scratch)
+        old[:] = returns
+        if slot == self.window - 1:  # type: ignore[operator]
+            # once per window, bounds the rounding drift of the running sums
+            np.sum(self._returns, axis=0, out=self._sums)
+            np.dot(self._returns.T, self._returns, out=self._products)
+        count = min(self.samples + 1, self.window)  # type: ignore[type-var]
+        if count < 2:
+            return
+        np.outer(self._sums, self._sums, out=self._scratch)
+        self._scratch /= count
+        np.subtract(self._products, self._scratch, out=self._cov)
+        self._cov /= count - 1
+
+    def _correlate(self) -> None:
+        std = np.sqrt(np.diag(self._cov))
+        np.outer(std, std, out=self._scratch)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.divide(self._cov, self._scratch, out=self._corr)
+
+    @property
+    def cov(self) -> np.ndarray:
+        cov = self._cov.view()
+        cov.flags.writeable = False
+        return cov
+
+    @property
+    def corr(self) -> np.ndarray:
+        """correlation matrix, NaN for instruments whose returns have no variance"""
+        corr = self._corr.view()
+        corr.flags.writeable = False
+        return corr
+
+    def frame(self, correlation: bool = True) -> pd.DataFrame:
+        """copy of the correlation, or covariance, matrix labelled by instrument"""
+        values = self._corr if correlation else self._cov
+        return pd.DataFrame(values.copy(), index=self.instruments, columns=self.instruments)
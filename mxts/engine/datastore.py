@@ -1,12 +1,321 @@
+import asyncio
+import inspect
 import logging
+import math
+from collections import deque
+from fnmatch import fnmatchcase
 from itertools import product
 from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import pandas as pd
 import numpy as np
 
+from mxts.config import OverflowPolicy
+from mxts.engine.covariance import RollingCovariance
+from mxts.engine.shared import RedisPublisher
+from mxts.engine.snapshot import Panel, SnapshotMatrix, asof_panel
+from mxts.engine.tiered import MemoryBudget, SegmentedBuffer
+from mxts.utils import nanos
+
 logger = logging.getLogger(__name__)
 
+
+class TickBuffer:
+    """Fixed capacity ring of (timestamp, bid, ask) ticks of one instrument
+
+    Columns are preallocated at twice the capacity and every tick is written
+    to slot `i` and its mirror `i + capacity`, so the last `capacity` ticks
+    are always contiguous: inserting is O(1) and `view` hands out ordered
+    zero-copy slices.
+
+    Args:
+        capacity (int): number of ticks kept
+    """
+
+    __slots__ = ("capacity", "timestamp", "bid", "ask", "count")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.timestamp = np.zeros(2 * capacity, dtype=np.int64)
+        self.bid = np.full(2 * capacity, np.nan)
+        self.ask = np.full(2 * capacity, np.nan)
+        # ticks ever appended
+        self.count = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp: int, bid: float, ask: float) -> Optional[Tuple[int, float, float]]:
+        """add a tick, returns the tick it pushed out of the window, if any"""
+        i = self.count % self.capacity
+        j = i + self.capacity
+        evicted = None
+        if self.count >= self.capacity:
+            evicted = int(self.timestamp[i]), float(self.bid[i]), float(self.ask[i])
+        self.timestamp[i] = self.timestamp[j] = timestamp
+        self.bid[i] = self.bid[j] = bid
+        self.ask[i] = self.ask[j] = ask
+        self.count += 1
+        return evicted
+
+    def view(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(timestamp, bid, ask) oldest first, views that later appends overwrite"""
+        n = len(self)
+        start = self.count % self.capacity if self.count > self.capacity else 0
+        end = start + n
+        return self.timestamp[start:end], self.bid[start:end], self.ask[start:end]
+
+    def latest(self) -> Tuple[int, float, float]:
+        i = (self.count - 1) % self.capacity
+        return int(self.timestamp[i]), float(self.bid[i]), float(self.ask[i])
+
+    def frame(self, name: str) -> pd.DataFrame:
+        """copy of the ticks as a DataFrame with `{name}_bid` and `{name}_ask`
+        columns indexed by time"""
+        timestamp, bid, ask = self.view()
+        return pd.DataFrame(
+            {f"{name}_bid": bid.copy(), f"{name}_ask": ask.copy()},
+            index=pd.to_datetime(timestamp),
+        )
+
+
+class RollingStats:
+    """Count, mean, std, min and max of the last `capacity` values of a series
+
+    Updates are O(1): mean and variance follow Welford's algorithm, with the
+    value leaving the window removed by running the update backwards, and
+    min/max are the fronts of monotonic deques of (index, value). Removal
+    slowly accumulates rounding error, `resync` recomputes the moments from
+    the window itself.
+
+    Args:
+        capacity (int): window length
+    """
+
+    __slots__ = ("capacity", "count", "mean", "_m2", "_seen", "_min", "_max", "latest")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        # values ever pushed, the index of the next one
+        self._seen = 0
+        self._min: Deque[Tuple[int, float]] = deque()
+        self._max: Deque[Tuple[int, float]] = deque()
+        self.latest = math.nan
+
+    def push(self, value: float, evicted: Optional[float] = None) -> None:
+        """add a value, `evicted` is the value it pushes out of the window"""
+        if evicted is not None:
+            if self.count == 1:
+                self.count, self.mean, self._m2 = 0, 0.0, 0.0
+            else:
+                delta = evicted - self.mean
+                self.count -= 1
+                self.mean -= delta / self.count
+                self._m2 = max(self._m2 - delta * (evicted - self.mean), 0.0)
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+        index = self._seen
+        self._seen += 1
+        oldest = index - self.capacity
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((index, value))
+        if self._min[0][0] <= oldest:
+            self._min.popleft()
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((index, value))
+        if self._max[0][0] <= oldest:
+            self._max.popleft()
+        self.latest = value
+
+    def resync(self, window: np.ndarray) -> None:
+        """recompute mean and variance exactly from the values in the window"""
+        self.count = len(window)
+        self.mean = float(window.mean()) if self.count else 0.0
+        self._m2 = float(((window - self.mean) ** 2).sum())
+
+    @property
+    def std(self) -> float:
+        """sample standard deviation, as `DataFrame.describe` reports it"""
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+    @property
+    def min(self) -> float:
+        return self._min[0][1] if self._min else math.nan
+
+    @property
+    def max(self) -> float:
+        return self._max[0][1] if self._max else math.nan
+
+
+class TickStats:
+    """Window statistics of an instrument's bid and ask sent to subscribers"""
+
+    __slots__ = (
+        "instrument",
+        "time",
+        "count",
+        "bid",
+        "bid_mean",
+        "bid_std",
+        "bid_min",
+        "bid_max",
+        "ask",
+        "ask_mean",
+        "ask_std",
+        "ask_min",
+        "ask_max",
+    )
+
+    def __init__(self, instrument: str, time: int, bid: RollingStats, ask: RollingStats) -> None:
+        self.instrument = instrument
+        self.time = time
+        self.count = bid.count
+        self.bid, self.bid_mean, self.bid_std, self.bid_min, self.bid_max = (
+            bid.latest, bid.mean, bid.std, bid.min, bid.max
+        )
+        self.ask, self.ask_mean, self.ask_std, self.ask_min, self.ask_max = (
+            ask.latest, ask.mean, ask.std, ask.min, ask.max
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"<TickStats({self.instrument} n={self.count} bid={self.bid} mean={self.bid_mean:.6g} "
+            f"ask={self.ask} mean={self.ask_mean:.6g})>"
+        )
+
+
+class Subscription:
+    """A subscriber of a `MarketDataStore`, its topics and delivery queue
+
+    Messages for the instruments a subscriber follows are queued for it and
+    handed to its `receive_msg` by a task of its own, so a slow subscriber
+    only ever holds up itself. Once `maxsize` messages are queued the
+    overflow `policy` decides what happens to the next one:
+
+        BLOCK: the publisher waits for this subscriber to catch up
+        DROP_OLDEST: evict the oldest queued message
+        CONFLATE: replace the queued message of the same instrument,
+                  falling back to DROP_OLDEST for a new instrument
+
+    Args:
+        subscriber: object with a `receive_msg(msg)` method or coroutine
+        topics (Optional[Iterable[str]]): instruments or fnmatch patterns,
+            e.g. "EUR_*", None for every instrument
+        maxsize (int): max number of queued messages
+        policy (OverflowPolicy): overflow policy
+    """
+
+    def __init__(
+        self,
+        subscriber: Any,
+        topics: Optional[Iterable[str]] = None,
+        maxsize: int = 1024,
+        policy: OverflowPolicy = OverflowPolicy.CONFLATE,
+    ) -> None:
+        self.subscriber = subscriber
+        self.maxsize = maxsize
+        self.policy = policy
+        topics = ["*"] if topics is None else list(topics)
+        self.instruments = {t for t in topics if not any(c in t for c in "*?[")}
+        self.patterns = [t for t in topics if t not in self.instruments]
+        self.delivered = 0
+        self.dropped = 0
+        self.conflated = 0
+        # cells of [instrument, msg], conflation swaps the msg of a queued cell
+        self._queue: Deque[List[Any]] = deque()
+        self._pending: Dict[str, List[Any]] = {}
+        self._space: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def matches(self, instrument: str) -> bool:
+        return instrument in self.instruments or any(fnmatchcase(instrument, p) for p in self.patterns)
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def offer(self, instrument: str, msg: Any) -> bool:
+        """queue a message without waiting, False if it has to wait for space under BLOCK"""
+        if self.policy == OverflowPolicy.CONFLATE:
+            cell = self._pending.get(instrument)
+            if cell is not None:
+                cell[1] = msg
+                self.conflated += 1
+                return True
+
+        if len(self._queue) >= self.maxsize:
+            if self.policy == OverflowPolicy.BLOCK:
+                return False
+            evicted = self._queue.popleft()
+            if self._pending.get(evicted[0]) is evicted:
+                del self._pending[evicted[0]]
+            self.dropped += 1
+
+        cell = [instrument, msg]
+        self._queue.append(cell)
+        if self.policy == OverflowPolicy.CONFLATE:
+            self._pending[instrument] = cell
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._deliver())
+        return True
+
+    async def put(self, instrument: str, msg: Any) -> None:
+        """queue a message, waiting for space under BLOCK"""
+        while not self.offer(instrument, msg):
+            if self._space is None:
+                self._space = asyncio.get_running_loop().create_future()
+            await self._space
+
+    async def _deliver(self) -> None:
+        receive = self.subscriber.receive_msg
+        try:
+            while self._queue:
+                cell = self._queue.popleft()
+                if self._pending.get(cell[0]) is cell:
+                    del self._pending[cell[0]]
+                if self._space is not None:
+                    if not self._space.done():
+                        self._space.set_result(None)
+                    self._space = None
+                try:
+                    result = receive(cell[1])
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    logger.exception(f"subscriber {self.subscriber!r} failed to receive {cell[0]}")
+                self.delivered += 1
+        finally:
+            self._task = None
+
+    async def join(self) -> None:
+        """wait until every queued message has been delivered"""
+        while self._task is not None:
+            await asyncio.shield(self._task)
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._queue.clear()
+        self._pending.clear()
+
+    def __repr__(self) -> str:
+        return (
+            f"<Subscription({self.subscriber!r}, depth={self.depth}, delivered={self.delivered}, "
+            f"dropped={self.dropped}, conflated={self.conflated})>"
+        )
+
+
 class MarketDataStore:
     """
 
@@ -16,38 +325,80 @@ class MarketDataStore:
     queue: event queue
     pairs: ccy pairs
     length: (int) length of time series
+    budget: (int or MemoryBudget) max bytes of time series held in memory
+        across all pairs, older segments spill to disk past it; None keeps
+        every series in memory
 
     """
-    def __init__(self, queue, pairs, length=10):
+    def __init__(self, queue, pairs, length=10, budget=None):
         self.queue = queue
-        self.data = {pair: pd.DataFrame(columns=[f"{pair}_bid", f"{pair}_ask" ]) for pair in pairs}
+        if isinstance(budget, int):
+            budget = MemoryBudget(budget)
+        self.budget: Optional[MemoryBudget] = budget
+        if budget is None:
+            self.data = {pair: TickBuffer(length) for pair in pairs}
+        else:
+            self.data = {pair: SegmentedBuffer(length, budget) for pair in pairs}
+        # (bid, ask) window statistics per pair
+        self.stats = {pair: (RollingStats(length), RollingStats(length)) for pair in pairs}
+        # latest quote of every pair, updated in place
+        self.snapshot = SnapshotMatrix(pairs)
+        # return covariance matrices sampled off the snapshot
+        self._covariances: List[RollingCovariance] = []
+        # redis mirrors of the pairs' stats
+        self._publishers: List[RedisPublisher] = []
         self.length = length
-        self._subscribers = set()
+        self._subscribers: Dict[Any, Subscription] = {}
+        # subscriptions of each instrument, worked out on its first message
+        self._routes: Dict[str, List[Subscription]] = {}
 
     # pub/sub functionality 
-    def attach(self, task):
-        self._subscribers.add(task)
+    def attach(self, task, topics=None, maxsize=1024, policy=OverflowPolicy.CONFLATE):
+        """subscribe `task` to the instruments matching `topics`, see `Subscription`"""
+        subscription = self._subscribers[task] = Subscription(task, topics, maxsize, policy)
+        self._routes.clear()
+        return subscription
     
     def detach(self, task):
-        self._subscribers.remove(task)
+        self._subscribers.pop(task).cancel()
+        self._routes.clear()
     
     @contextmanager
-    def subscribe(self, *tasks):
+    def subscribe(self, *tasks, topics=None, maxsize=1024, policy=OverflowPolicy.CONFLATE):
         for task in tasks:
-            self.attach(task)
+            self.attach(task, topics, maxsize, policy)
         try:
             yield
         finally:
             for task in tasks:
                 self.detach(task)
+
+    def _route(self, instrument):
+        subscriptions = self._routes.get(instrument)
+        if subscriptions is None:
+            subscriptions = self._routes[instrument] = [
+                s for s in self._subscribers.values() if s.matches(instrument)
+            ]
+        return subscriptions
     
-    def send(self, msg):
-        """ send latests stats to subscribers """
-        logger.info("Sending msg to subscribers")
-        for s in self._subscribers:
-            s.receive_msg(msg)
+    async def send(self, msg):
+        """ queue the latest stats of each instrument in `msg` for its subscribers """
+        for instrument, value in msg.items():
+            subscriptions = self._route(instrument)
+            if subscriptions:
+                await self._publish(instrument, {instrument: value}, subscriptions)
+
+    async def _publish(self, instrument, msg, subscriptions):
+        for s in subscriptions:
+            if not s.offer(instrument, msg):
+                await s.put(instrument, msg)
+
+    async def join(self):
+        """wait until every subscriber has received its queued messages"""
+        for s in list(self._subscribers.values()):
+            await s.join()
     
-    def update_data(self, event):
+    async def update_data(self, event):
         """ update data store with latest market data
 
         Args
@@ -55,29 +406,82 @@ class MarketDataStore:
         event (TickEvent)
         
         """
-        data = self.data[event.instrument]
-
-        data = data.append(
-            pd.DataFrame(
-                index=[event.time],
-                data={
-                    event.instrument + '_bid': [event.bid],
-                    event.instrument + '_ask': [event.ask],
-                }
-            )
-        )   
-        
-        if len(data) > self.length:
-            data = data.drop(index=data.index[0])
-        
-        self.data[event.instrument] = data 
-        
-        self.send({event.instrument: self.compute_stats(data)})
+        buffer = self.data[event.instrument]
+        bid, ask = self.stats[event.instrument]
+        time = nanos(event.time)
+        evicted = buffer.append(time, event.bid, event.ask)
+        self.snapshot.update(event.instrument, time, event.bid, event.ask)
+        for covariance in self._covariances:
+            if time >= covariance.due:
+                covariance.sample(time)
+        if evicted is None:
+            bid.push(event.bid)
+            ask.push(event.ask)
+        else:
+            bid.push(event.bid, evicted[1])
+            ask.push(event.ask, evicted[2])
+            if buffer.count % buffer.capacity == 0:
+                # once per window, amortized O(1)
+                _, bids, asks = buffer.view()
+                bid.resync(bids)
+                ask.resync(asks)
+        for publisher in self._publishers:
+            publisher.mark(event.instrument)
+
+        subscriptions = self._route(event.instrument)
+        if subscriptions:
+            stats = self.compute_stats(event.instrument)
+            await self._publish(event.instrument, {event.instrument: stats}, subscriptions)
+
+    def frame(self, pair):
+        """the stored ticks of a pair as a DataFrame, oldest first"""
+        return self.data[pair].frame(pair)
     
-    @staticmethod
-    def compute_stats(data):
-        desc = data.describe()
-        latest = pd.DataFrame(data.iloc[0,:].to_dict(), index=["latest"])
-        stats = pd.concat([desc, latest])
-        return stats
+    def memory(self) -> Dict[str, int]:
+        """bytes of time series held in memory and, under a budget, spilled
+        to disk, evictions and reads from disk"""
+        if self.budget is not None:
+            return self.budget.stats()
+        resident = sum(b.timestamp.nbytes + b.bid.nbytes + b.ask.nbytes for b in self.data.values())
+        return {"resident_bytes": resident}
+
+    def close(self):
+        """remove the spilled time series"""
+        if self.budget is not None:
+            self.budget.close()
+
+    def compute_stats(self, pair):
+        """current window statistics of a pair"""
+        bid, ask = self.stats[pair]
+        return TickStats(pair, self.data[pair].latest()[0], bid, ask)
+
+    def share(self, redis, prefix="mxts", interval=0.1) -> RedisPublisher:
+        """mirror the pairs' latest quotes and window stats into redis, flushed
+        every `interval` seconds, see `RedisPublisher`"""
+        publisher = RedisPublisher(redis, self.compute_stats, prefix, interval)
+        self._publishers.append(publisher)
+        return publisher
+
+    def covariance(self, interval, halflife=None, window=None) -> RollingCovariance:
+        """track the covariance and correlation of the pairs' returns sampled every
+        `interval` (nanoseconds or timedelta like), see `RollingCovariance`"""
+        step = interval if isinstance(interval, (int, np.integer)) else pd.Timedelta(interval).value
+        covariance = RollingCovariance(self.snapshot, int(step), halflife, window)
+        self._covariances.append(covariance)
+        return covariance
+
+    def panel(self, start, end, interval) -> Panel:
+        """the pairs' stored ticks as-of joined onto samples every `interval` in `[start, end)`"""
+        return asof_panel({pair: buffer.view() for pair, buffer in self.data.items()}, start, end, interval)
+
+    def quantiles(self, pair, q: Sequence[float] = (0.25, 0.5, 0.75)):
+        """exact bid and ask quantiles of the window, computed on request
+
+        Returns:
+            (bid quantiles, ask quantiles) as arrays matching `q`
+        """
+        _, bid, ask = self.data[pair].view()
+        if not len(bid):
+            return np.full(len(q), np.nan), np.full(len(q), np.nan)
+        return np.quantile(bid, q), np.quantile(ask, q)
 
@@ -1,7 +1,8 @@
 import asyncio
-import datetime
 import logging
-from typing import AsyncGenerator
+import time
+from functools import partial
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
    
 # from aiostream.stream import merge  # type: ignore
 from cryptofeed import FeedHandler
@@ -11,21 +12,28 @@ from cryptofeed.exchanges import EXCHANGE_MAP
 from pandas import Timestamp
 
 from mxts.core.handler import EventHandler
-from mxts.core.data import Event
-from mxts.config import TradingType, EventType
+from mxts.core.data import Error, Event
+from mxts.config import TradingType, EventType, ExitRoutine, Lane
 from mxts.config.config import Settings
+from mxts.engine.backtest import Backtest
+from mxts.engine.bars import BarAggregator
+from mxts.engine.batch import SymbolTable, TickBatcher
+from mxts.engine.breaker import CircuitBreaker
+from mxts.engine.conflation import ConflatingCallback
+from mxts.engine.event_queue import EventQueue, LaneStats
+from mxts.engine.feed import FeedProcess
+from mxts.engine.journal import JournalWriter
+from mxts.engine.latency import LatencyRecorder, callback_name
+from mxts.engine.managers import Periodic, PeriodicManager, TradingHours
 from mxts.engine.portfolio import dump, load
+from mxts.engine.owners import OrderOwners
+from mxts.engine.shard import ORDER_RESPONSES, ROUTED_EVENTS, ShardRouter
+from mxts.engine.tickstore import TickStore
+from mxts.exchange.base.order_entry import OrderEntry
+from mxts.exchange.simulation import SimulationExchange
 
 LOG = logging.getLogger('mxts')
 
-# async def ticker(t, receipt_timestamp):
-#     print(f'Ticker received at {receipt_timestamp}: {t}')
-
-async def ticker(obj, receipt_ts):
-    # For debugging purposes
-    rts = datetime.utcfromtimestamp(receipt_ts).strftime('%Y-%m-%d %H:%M:%S')
-    print(f"{rts} - {obj}")
-
 
 class TradingEngine:
     """ Main trading application
@@ -42,43 +50,521 @@ class TradingEngine:
                     sandbox=self.config.trading_type == TradingType.SANDBOX,
                     symbols=self.config.symbols, 
                     channels=[TICKER], 
-                    callbacks={TICKER: ticker}
+                    callbacks={TICKER: self.ticker}
                 )
 
         # feeds are added in the run method
         self.feed_handler = FeedHandler()
             
-        self.portfolio = load(config.portfolio_fp)
-        LOG.info(f"loaded a portfolio with balance: {self.portfolio.balance}")
+        self.portfolio = None
+        if config.portfolio_fp:
+            self.portfolio = load(config.portfolio_fp)
+            LOG.info(f"loaded a portfolio with balance: {self.portfolio.balance}")
         
         self.alpha_models = []
 
+        # event dispatch
+        self.event_handlers: List[EventHandler] = []
+        self._handler_subs: Dict[EventType, List] = {e: [] for e in EventType}
+        self._event_queue = EventQueue(
+            maxsize=config.queue_size, policy=config.overflow_policy
+        )
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._conflating: List[ConflatingCallback] = []
+        self._batchers: List[TickBatcher] = []
+        self._executors: List = []
+        self._aggregators: List[BarAggregator] = []
+        self.symbols = SymbolTable()
+
+        # events dispatched per type
+        self.event_counts: Dict[EventType, int] = {e: 0 for e in EventType}
+
+        # append-only record of every dispatched event, for recovery and replay
+        self.journal: Optional[JournalWriter] = (
+            JournalWriter(config.journal_fp) if config.journal_fp else None
+        )
+
+        # on-disk tick history, appended to from the feeds
+        self.tick_store: Optional[TickStore] = TickStore(config.tick_store_fp) if config.tick_store_fp else None
+
+        # end to end latency histograms, None when switched off
+        self.latency: Optional[LatencyRecorder] = LatencyRecorder() if config.latency_stats else None
+
+        # (event type, callback) pairs of each handler, so they can be suspended
+        self._subscriptions: Dict[EventHandler, List[Tuple[EventType, Callable]]] = {}
+        # handler of each subscribed callback
+        self._handler_of: Dict[Callable, EventHandler] = {}
+        # reasons each suspended handler is out of dispatch for
+        self._suspended: Dict[EventHandler, Set[str]] = {}
+
+        # circuit breaker guarding each subscribed handler callback
+        self._breakers: Dict[Callable, CircuitBreaker] = {}
+        self._tripped: List[CircuitBreaker] = []
+
+        # every periodic and trading hours window runs off one timer wheel
+        self.periodics = PeriodicManager(self._periodic_failed)
+
+        # handler that placed each open order, and every handler that ever placed one
+        self._owners = OrderOwners()
+        self._traders: Set[EventHandler] = set()
+        # paper trading, orders are matched locally against the market data
+        self.order_entry: Optional[OrderEntry] = self._order_entry()
+        if isinstance(self.order_entry, EventHandler):
+            self._subscribe(self.order_entry)
+
+        # cryptofeed running in a child process, see `Settings.feed_process`
+        self._feed: Optional[FeedProcess] = None
+        self._feed_reader: Optional[asyncio.Task] = None
+
+        # simulated clock in epoch nanoseconds, advanced by the backtest driver,
+        # and whether `now` reads it, set while the driver runs
+        self._latest = 0
+        self._replaying = False
+
+        # handlers run in shard processes, the engine only routes events to them
+        self._router: Optional[ShardRouter] = None
+        if config.shards > 1:
+            self._router = ShardRouter(config, self.push_event, self.order_entry)
+            for e in ROUTED_EVENTS:
+                self._handler_subs[e].append(self._router.route)
+
     
+    def _order_entry(self) -> Optional[OrderEntry]:
+        """where orders are submitted, in BACKTEST and SIMULATION a local matching engine"""
+        if self.offline:
+            return SimulationExchange(self.push_event, self._stop_triggered)
+        return None
+
+    def _stop_triggered(self, stop, target) -> None:
+        """the owner of a triggered stop owns its target"""
+        if self._router is not None:
+            self._router.triggered(stop, target)
+        else:
+            self._owners.transfer(stop, target)
+
     @property
     def offline(self) -> bool:
         return self.config.trading_type in (TradingType.BACKTEST, TradingType.SIMULATION)
 
-    def register_handler(self, handler: EventHandler) -> None:
+    def register_handler(self, handler: EventHandler, timeout: Optional[float] = None) -> None:
         """register a handler and all callbacks that handler implements
         Args:
             handler (EventHandler): the event handler to register
+            timeout (Optional[float]): seconds each callback may take per event,
+                defaults to `Settings.handler_timeout`
        
         """
         LOG.info("registering handlers")
-        if handler not in set(self.event_handlers):
-            self.event_handlers.append(handler)
-            for callback, events in handler.callbacks.items():
-                for e in events:
-                    self._handler_subs[e].append(callback)
+        if handler in self.event_handlers:
+            return
+
+        self.event_handlers.append(handler)
+        if self._router is not None:
+            self._router.add(handler)
+        else:
+            # strategies reach periodics, the clock etc. through their manager
+            handler._manager = self
+            breaker = CircuitBreaker(
+                handler,
+                timeout if timeout is not None else self.config.handler_timeout,
+                self.config.breaker_threshold,
+                self.config.breaker_cooldown,
+            )
+            self._subscribe(handler, breaker)
+
+    def _subscribe(self, handler: EventHandler, breaker: Optional[CircuitBreaker] = None) -> None:
+        """subscribe a handler's callbacks to their events in this process"""
+        subscriptions = self._subscriptions.setdefault(handler, [])
+        # wrapped callbacks run off the dispatch loop, they time and count failures themselves
+        guard = partial(self._guarded, breaker)
+        for name, events in handler.callbacks.items():
+            callback = method = getattr(handler, name)
+            if events and getattr(callback, 'cpu_bound', None):
+                # ray is only needed once a cpu bound callback shows up
+                from mxts.engine.executor import RayExecutor, init_ray
+
+                init_ray(self.config.ray_address, self.config.ray_local_mode)
+                actors, max_pending = callback.cpu_bound
+                callback = RayExecutor(callback, actors, max_pending, self.push_event, guard)
+                self._executors.append(callback)
+            elif events and getattr(callback, 'batch', None):
+                max_size, max_wait = callback.batch
+                if self.offline:
+                    # wall clock deadlines would make replays nondeterministic
+                    max_wait = None
+                callback = TickBatcher(callback, self.symbols, max_size, max_wait, guard)
+                self._batchers.append(callback)
+            elif events and getattr(callback, 'conflate', False) and not self.offline:
+                callback = ConflatingCallback(callback, guard)
+                self._conflating.append(callback)
+            if events and breaker is not None and callback is method:
+                self._breakers[callback] = breaker
+            if events:
+                self._handler_of[callback] = handler
+            for e in events:
+                self._handler_subs[e].append(callback)
+                subscriptions.append((e, callback))
+
+    def _suspend(self, handler: EventHandler, reason: str) -> None:
+        """stop delivering events to a handler, until resumed for every reason it was suspended for"""
+        reasons = self._suspended.setdefault(handler, set())
+        reasons.add(reason)
+        if len(reasons) > 1:
+            return
+        for e, callback in self._subscriptions.get(handler, []):
+            # swap the list rather than mutate it, dispatch may be iterating over it
+            self._handler_subs[e] = [c for c in self._handler_subs[e] if c is not callback]
+
+    def _resume(self, handler: EventHandler, reason: str) -> None:
+        """deliver events to a suspended handler again, after the other handlers"""
+        reasons = self._suspended.get(handler)
+        if reasons is None or reason not in reasons:
+            return
+        reasons.discard(reason)
+        if reasons:
+            return
+        del self._suspended[handler]
+        for e, callback in self._subscriptions.get(handler, []):
+            self._handler_subs[e] = self._handler_subs[e] + [callback]
+
+    ###############
+    # Order entry #
+    ###############
+    async def new_order(self, handler: EventHandler, order) -> bool:
+        """submit `handler`'s order to the order entry, the order's responses
+        then go to `handler` and not to the other handlers that trade
+
+        Returns:
+            True if the order was received, False if it was rejected
+        """
+        if self.order_entry is None:
+            LOG.error(f"no order entry to submit {order} to in {self.config.trading_type} trading")
+            return False
+        remaining = order.volume - order.filled
+        self._traders.add(handler)
+        received = await self.order_entry.new_order(order)
+        # responses are queued by now but only dispatched, and so routed, later
+        self._owners.add(order, handler, remaining)
+        return received
+
+    async def newOrder(self, handler: EventHandler, order) -> bool:
+        """alias of `new_order`"""
+        return await self.new_order(handler, order)
+
+    async def cancel_order(self, handler: EventHandler, order) -> bool:
+        """cancel an order `handler` placed
+
+        Returns:
+            True if the order was canceled
+        """
+        if self.order_entry is None:
+            LOG.error(f"no order entry to cancel {order} on in {self.config.trading_type} trading")
+            return False
+        return await self.order_entry.cancel_order(order)
+
+    def _recipients(self, event: Event, callbacks: List[Callable]) -> List[Callable]:
+        """callbacks an order response goes to: those of the handler that placed
+        the order and of handlers that never place orders, e.g. recorders"""
+        owner = self._owners.owner(event)
+        if owner is None:
+            return callbacks
+        handler_of, traders = self._handler_of, self._traders
+        return [c for c in callbacks if handler_of.get(c) is owner or handler_of.get(c) not in traders]
+
+    def bars(
+        self, kind: str = "time", size: Union[str, float] = "M1", source: EventType = EventType.TRADE
+    ) -> BarAggregator:
+        """deliver OHLCV `Bar`s of every instrument as `Data` events, see `BarAggregator`,
+        the bars still open are delivered when the engine shuts down or a replay ends"""
+        aggregator = BarAggregator(self.push_event, kind, size, source)
+        self._subscribe(aggregator)
+        self._aggregators.append(aggregator)
+        return aggregator
+
+    #############
+    # Periodics #
+    #############
+    def periodic(
+        self,
+        function: Callable[[], Any],
+        second: Union[int, str] = 0,
+        minute: Union[int, str] = "*",
+        hour: Union[int, str] = "*",
+    ) -> Periodic:
+        """run a function whenever the engine clock matches second, minute and hour,
+        see `StrategyUtilsMixin.periodic`"""
+        return self.periodics.periodic(function, second, minute, hour)
+
+    def restrictTradingHours(
+        self,
+        handler: EventHandler,
+        start_second: Optional[int] = None,
+        start_minute: Optional[int] = None,
+        start_hour: Optional[int] = None,
+        end_second: Optional[int] = None,
+        end_minute: Optional[int] = None,
+        end_hour: Optional[int] = None,
+        on_end_of_day: ExitRoutine = ExitRoutine.NONE,
+    ) -> Optional[TradingHours]:
+        """only deliver events to `handler` between the start and end time of day,
+        unset fields default to 0 and an end of 00:00:00 is midnight
+
+        With `ExitRoutine.CLOSE_ALL` the handler's `cancel_all` is awaited
+        whenever trading hours end.
+        """
+        start = (start_hour or 0, start_minute or 0, start_second or 0)
+        end = (end_hour or 0, end_minute or 0, end_second or 0)
+
+        async def on_open() -> None:
+            self._resume(handler, "hours")
+
+        async def on_close() -> None:
+            self._suspend(handler, "hours")
+            cancel_all = getattr(handler, "cancel_all", None)
+            if on_end_of_day == ExitRoutine.CLOSE_ALL and cancel_all is not None:
+                await cancel_all()
 
-    async def push_event(self, event: Event) -> None:
+        return self.periodics.restrict(start, end, on_open, on_close)
+
+    async def _periodic_failed(self, periodic: Periodic, exc: Exception) -> None:
+        """log a failed periodic and raise an `Error` event"""
+        LOG.error(f"periodic {periodic} failed", exc_info=exc)
+        await self.push_event(
+            Event(
+                type=EventType.ERROR,
+                data=Error(data=periodic, exception=repr(exc), callback=periodic.function),
+            )
+        )
+
+    async def timers(self) -> None:
+        """run due periodics off the wall clock, waking at the top of every second"""
+        periodics = self.periodics
+        while True:
+            for _, periodic in periodics.expired(self.now().value):
+                await periodics.run(periodic)
+            await asyncio.sleep(1 - time.time() % 1)
+
+    async def ticker(self, obj, receipt_ts: float) -> None:
+        """cryptofeed ticker callback"""
+        event = Event(type=EventType.TICKER, data=obj)
+        if self.latency is not None:
+            event.exchange_ts = self.latency.monotonic(getattr(obj, "timestamp", None))
+            event.receipt_ts = self.latency.monotonic(receipt_ts)
+        if self.tick_store is not None:
+            self.tick_store.append_ticker(obj, receipt_ts)
+        await self.push_event(event)
+
+    async def push_event(self, event: Event, droppable: bool = True) -> None:
         """push internal event onto the queue"""
-        await self._event_queue.put(event)
+        if self.latency is not None and event.enqueue_ts is None:
+            event.enqueue_ts = time.monotonic_ns()
+        await self._event_queue.put_event(event, droppable)
+
+    def queue_stats(self) -> Dict[Lane, LaneStats]:
+        """per priority lane queue depth and wait time counters"""
+        return self._event_queue.stats()
+
+    def latency_stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """latency summaries in nanoseconds per event type and stage and per callback"""
+        return self.latency.stats() if self.latency is not None else {}
+
+    async def process_event(self, event: Event) -> None:
+        """fan an event out to every callback subscribed to its type"""
+        self.event_counts[event.type] += 1
+        if self.journal is not None:
+            self.journal.append(event)
+        if self._tripped:
+            self._readmit()
+
+        breakers = self._breakers
+        latency = self.latency
+        callbacks = self._handler_subs[event.type]
+        if self._traders and event.type in ORDER_RESPONSES:
+            callbacks = self._recipients(event, callbacks)
+        if latency is not None:
+            event.dispatch_ts = start = time.monotonic_ns()
+        for callback in callbacks:
+            breaker = breakers.get(callback)
+            try:
+                if breaker is None:
+                    await callback(event)
+                elif breaker.tripped:
+                    # tripped while this event was being dispatched
+                    continue
+                elif breaker.timeout is None:
+                    await callback(event)
+                else:
+                    await asyncio.wait_for(callback(event), breaker.timeout)
+            except Exception as e:
+                await self._callback_failed(event, callback, e)
+                if breaker is not None and breaker.failure(callback):
+                    await self._trip(breaker, callback, e)
+            else:
+                if breaker is not None:
+                    breaker.success(callback)
+            if latency is not None:
+                end = time.monotonic_ns()
+                latency.handler(callback, end - start)
+                start = end
+        if latency is not None:
+            event.complete_ts = start
+            latency.complete(event)
+
+    async def _trip(self, breaker: CircuitBreaker, callback, exc: Exception) -> None:
+        """take a repeatedly failing handler out of dispatch and raise an `Error` event"""
+        breaker.trip(self.now().value)
+        self._tripped.append(breaker)
+        self._suspend(breaker.handler, "breaker")
+        LOG.error(
+            f"{type(breaker.handler).__name__} tripped after {breaker.threshold} failures of "
+            f"{callback_name(callback)}, out for {breaker.cooldown}s"
+        )
+        await self.push_event(
+            Event(
+                type=EventType.ERROR,
+                data=Error(
+                    data=breaker,
+                    exception=f"circuit breaker tripped after {breaker.threshold} failures, last {exc!r}",
+                    callback=callback,
+                ),
+            )
+        )
+
+    async def _guarded(
+        self, breaker: Optional[CircuitBreaker], event: Event, callback, call: Callable[[], Awaitable[None]]
+    ) -> None:
+        """await `call()`, a wrapped callback's call of `callback`, under the
+        handler's time budget and circuit breaker, as `process_event` does
+        for the callbacks it calls itself"""
+        if breaker is not None and breaker.tripped:
+            return
+        try:
+            if breaker is None or breaker.timeout is None:
+                await call()
+            else:
+                await asyncio.wait_for(call(), breaker.timeout)
+        except Exception as e:
+            await self._callback_failed(event, callback, e)
+            if breaker is not None and breaker.failure(callback):
+                await self._trip(breaker, callback, e)
+        else:
+            if breaker is not None:
+                breaker.success(callback)
+
+    def _readmit(self) -> None:
+        """re-admit the tripped handlers whose cool-down is over"""
+        now = self.now().value
+        for breaker in [b for b in self._tripped if b.reopen_at <= now]:
+            self._tripped.remove(breaker)
+            breaker.readmit()
+            self._resume(breaker.handler, "breaker")
+            LOG.info(f"{type(breaker.handler).__name__} re-admitted to dispatch")
+
+    async def _callback_failed(self, event: Event, callback, exc: Exception) -> None:
+        """log a failed callback and raise an `Error` event"""
+        LOG.error(f"callback {callback_name(callback)} failed on {event.type}", exc_info=exc)
+        if event.type != EventType.ERROR:
+            await self.push_event(
+                Event(
+                    type=EventType.ERROR,
+                    data=Error(data=event, exception=repr(exc), callback=callback),
+                )
+            )
+
+    def conflation_stats(self) -> Dict[Tuple[EventHandler, str], int]:
+        """number of events conflated away per (handler, callback name) of each conflating callback"""
+        return {(self._handler_of[c], c.callback.__name__): c.conflated for c in self._conflating}
+
+    async def dispatch(self) -> None:
+        """main event loop, drains the event queue until an `Exit` event"""
+        if self._router is not None:
+            self._router.start()
+        timers = asyncio.ensure_future(self.timers())
+
+        while True:
+            event = await self._event_queue.get()
+            try:
+                await self.process_event(event)
+            finally:
+                self._event_queue.task_done()
+
+            if event.type == EventType.EXIT:
+                timers.cancel()
+                return
+
+    async def flush(self) -> None:
+        """wait for work handed off by conflating, batched and offloaded callbacks,
+        and emit the open bars"""
+        for callback in self._conflating + self._executors:
+            await callback.join()
+        for batcher in self._batchers:
+            await batcher.flush()
+        for aggregator in self._aggregators:
+            await aggregator.flush()
+
+    async def settle(self) -> None:
+        """synchronously process everything raised so far, used by the backtest driver"""
+        for executor in self._executors:
+            await executor.join()
+        queue = self._event_queue
+        while not queue.empty():
+            event = queue.get_nowait()
+            try:
+                await self.process_event(event)
+            finally:
+                queue.task_done()
+
+    async def backtest(self, events: Iterable[Event]) -> Backtest:
+        """replay historical events through the registered handlers"""
+        if self._router is not None:
+            raise ValueError("replays run unsharded, shards must be 1")
+        driver = Backtest(self, events)
+        await driver.run()
+        if self.journal is not None:
+            await self.journal.close()
+        return driver
+
+    async def heartbeat(self) -> None:
+        """push heartbeats onto the queue in absence of market data"""
+        async for event in self.tick():
+            await self.push_event(event)
+
+    def run(self, events: Optional[Iterable[Event]] = None) -> None:
+        """run the engine
+
+        Args:
+            events (Optional[Iterable[Event]]): historical events to replay, always
+                replayed in BACKTEST mode, SIMULATION runs on live feeds without them
+        """
+        if self.config.trading_type == TradingType.BACKTEST or events is not None:
+            asyncio.run(self.backtest(events or []))
+            return
+
+        if self.config.metrics_port is not None:
+            from mxts.engine.metrics import serve
+
+            serve(self, self.config.metrics_port)
+
+        loop = asyncio.get_event_loop()
+        if self.config.feed_process:
+            # the feed handler gets a process of its own, the engine owns this loop
+            self._feed = FeedProcess(self.config)
+            self._feed.start()
+            self._dispatcher = loop.create_task(self.dispatch())
+            self._feed_reader = loop.create_task(self._feed.consume(self.ticker))
+            loop.create_task(self.heartbeat())
+            loop.create_task(self.push_event(Event(type=EventType.START, target=None)))
+            loop.run_until_complete(self._dispatcher)
+            return
 
-    def run(self) -> None:
         # register the feeds
         for exch in self.feeds.values():
             self.feed_handler.add_feed(exch)
+
+        # the dispatcher shares the loop the feed handler runs on
+        self._dispatcher = loop.create_task(self.dispatch())
+        loop.create_task(self.heartbeat())
+        loop.create_task(self.push_event(Event(type=EventType.START, target=None)))
     
         self.feed_handler.run()
 
@@ -91,16 +577,13 @@ class TradingEngine:
 
         while True:
             yield Event(type=EventType.HEARTBEAT, target=None)
-            await asyncio.sleep(self.heartbeat)
+            await asyncio.sleep(self.config.heartbeat)
 
     def now(self) -> Timestamp:
         """Return the current datetime. Useful to avoid code changes between
-        live trading and backtesting. Defaults to `Timestamp.now`"""
-        return (
-            self._latest
-            if self.trading_type == TradingType.BACKTEST
-            else Timestamp.now()
-        )
+        live trading and backtesting: the simulated clock while events are
+        replayed, `Timestamp.now` otherwise"""
+        return Timestamp(self._latest) if self._replaying else Timestamp.now()
 
     def startup(self):
         # TODO: replace startup and shutdown with a context mgr
@@ -121,6 +604,30 @@ class TradingEngine:
         # Engine: Disconnect from exchanges
         # Engine: Write info to disk
         # Close DB connections
-        # Before engine shutdown, send an exit event
-        # await self.process_event(Event(type=EventType.EXIT, target=None))
-        pass
\ No newline at end of file
+        # Before engine shutdown, drain the queue and send an exit event
+        if self._feed is not None:
+            self._feed_reader.cancel()
+            self._feed.close()
+            LOG.info(f"feed process delivered {self._feed.received} ticks, {self._feed.overruns} overruns")
+        if self._dispatcher is not None:
+            await self._event_queue.join()
+            await self.flush()
+            if self._router is not None:
+                await self._router.shutdown()
+            # results of offloaded callbacks and shard order requests land back on the queue
+            await self._event_queue.join()
+        await self.push_event(Event(type=EventType.EXIT, target=None))
+        if self._dispatcher is not None:
+            await self._dispatcher
+
+        for executor in self._executors:
+            executor.shutdown()
+
+        if self.journal is not None:
+            await self.journal.close()
+
+        if self.tick_store is not None:
+            self.tick_store.close()
+
+        if self.latency is not None:
+            LOG.info(f"event latencies (us):\n{self.latency.dump()}")
\ No newline at end of file
@@ -0,0 +1,202 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, List
+
+from mxts.config import EventType, Lane, OverflowPolicy
+from mxts.core.data import Event
+
+# priority lane of each event type, lanes are drained in `Lane` declaration order
+LANES = {
+    EventType.OPEN: Lane.ORDER_ENTRY,
+    EventType.CANCEL: Lane.ORDER_ENTRY,
+    EventType.CHANGE: Lane.ORDER_ENTRY,
+    EventType.FILL: Lane.ORDER_ENTRY,
+    EventType.BOUGHT: Lane.ORDER_ENTRY,
+    EventType.SOLD: Lane.ORDER_ENTRY,
+    EventType.RECEIVED: Lane.ORDER_ENTRY,
+    EventType.REJECTED: Lane.ORDER_ENTRY,
+    EventType.CANCELED: Lane.ORDER_ENTRY,
+    EventType.HEARTBEAT: Lane.SYSTEM,
+    EventType.HALT: Lane.SYSTEM,
+    EventType.CONTINUE: Lane.SYSTEM,
+    EventType.ERROR: Lane.SYSTEM,
+    EventType.START: Lane.SYSTEM,
+    EventType.EXIT: Lane.SYSTEM,
+    EventType.TRADE: Lane.MARKET_DATA,
+    EventType.TICKER: Lane.MARKET_DATA,
+    EventType.DATA: Lane.MARKET_DATA,
+}
+
+# events that may be dropped or conflated when the engine falls behind
+MARKET_DATA_EVENTS = frozenset(e for e, lane in LANES.items() if lane == Lane.MARKET_DATA)
+
+
+def conflation_key(event: Event) -> Hashable:
+    """key identifying the stream an event belongs to, i.e. (type, exchange, instrument)"""
+    data = event.data
+    return (
+        event.type,
+        getattr(data, "exchange", None),
+        getattr(data, "symbol", getattr(data, "instrument", None)),
+    )
+
+
+class LaneStats:
+    """queue depth and wait time counters of a single lane, wait times in seconds"""
+
+    __slots__ = ("depth", "max_depth", "count", "wait_total", "wait_max")
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.max_depth = 0
+        self.count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def wait_mean(self) -> float:
+        return self.wait_total / self.count if self.count else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"<LaneStats(depth={self.depth}, max_depth={self.max_depth}, count={self.count}, "
+            f"wait_mean={self.wait_mean:.6f}, wait_max={self.wait_max:.6f})>"
+        )
+
+
+class EventQueue(asyncio.Queue):
+    """Bounded, prioritized engine event queue
+
+    Events are split into lanes by type (see `LANES`) and `get` always serves
+    the highest priority non-empty lane, so fills and rejects never wait
+    behind a backlog of ticks.
+
+    Only the market data lane counts against `maxsize`; order entry and system
+    events are always accepted immediately so a tick burst can never hold them up.
+    The overflow `policy` decides what happens to incoming market data:
+
+        BLOCK: when the bound is hit, wait for the dispatcher to free a slot
+        DROP_OLDEST: when the bound is hit, evict the oldest queued market data event
+        CONFLATE: always overwrite the queued event for the same instrument in
+                  place, whether or not the bound is hit, so at most one event
+                  per instrument is ever queued; a new instrument falls back
+                  to DROP_OLDEST when the bound is hit
+
+    Args:
+        maxsize (int): max number of queued market data events
+        policy (OverflowPolicy): overflow policy for market data
+    """
+
+    def __init__(self, maxsize: int = 0, policy: OverflowPolicy = OverflowPolicy.BLOCK) -> None:
+        self.policy = policy
+        self.dropped = 0
+        self.conflated = 0
+        # the underlying queue is unbounded, market data is bounded by the semaphore
+        super().__init__()
+        self._slots = asyncio.Semaphore(maxsize) if maxsize > 0 else None
+
+    def _init(self, maxsize: int) -> None:
+        # each entry is a mutable cell [key, event, enqueue time] so conflation can
+        # swap the event, key is None for events that are never dropped or conflated
+        self._lanes: Dict[Lane, Deque[List[Any]]] = {lane: deque() for lane in Lane}
+        self._stats: Dict[Lane, LaneStats] = {lane: LaneStats() for lane in Lane}
+        self._pending: Dict[Hashable, List[Any]] = {}
+        self._size = 0
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return not self._size
+
+    def _put(self, cell: List[Any]) -> None:
+        lane = LANES[cell[1].type]
+        self._lanes[lane].append(cell)
+        if cell[0] is not None:
+            self._pending[cell[0]] = cell
+        stats = self._stats[lane]
+        stats.depth += 1
+        if stats.depth > stats.max_depth:
+            stats.max_depth = stats.depth
+        self._size += 1
+
+    def _get(self) -> Event:
+        for lane, queue in self._lanes.items():
+            if queue:
+                break
+        cell = queue.popleft()
+        self._size -= 1
+
+        stats = self._stats[lane]
+        stats.depth -= 1
+        wait = time.monotonic() - cell[2]
+        stats.count += 1
+        stats.wait_total += wait
+        if wait > stats.wait_max:
+            stats.wait_max = wait
+
+        if cell[0] is not None:
+            self._forget(cell)
+            if self._slots is not None:
+                self._slots.release()
+        return cell[1]
+
+    def _forget(self, cell: List[Any]) -> None:
+        if self._pending.get(cell[0]) is cell:
+            del self._pending[cell[0]]
+
+    @property
+    def depth(self) -> int:
+        """number of queued market data events"""
+        return self._stats[Lane.MARKET_DATA].depth
+
+    def stats(self) -> Dict[Lane, LaneStats]:
+        """per lane queue depth and wait time counters"""
+        return self._stats
+
+    def saturated(self) -> bool:
+        """whether the market data bound has been hit"""
+        return self._slots is not None and self._slots.locked()
+
+    async def put_event(self, event: Event, droppable: bool = True) -> None:
+        """enqueue an event, applying the overflow policy to market data
+
+        Args:
+            event (Event): the event to enqueue
+            droppable (bool): if False the event skips the overflow policy,
+                for market data lane events that must never be lost
+        """
+        if not droppable or event.type not in MARKET_DATA_EVENTS:
+            self.put_nowait([None, event, time.monotonic()])
+            return
+
+        key = conflation_key(event)
+
+        if self.policy == OverflowPolicy.CONFLATE:
+            # coalesces below the bound too, a stale tick is never worth dispatching
+            cell = self._pending.get(key)
+            if cell is not None:
+                cell[1] = event
+                self.conflated += 1
+                return
+
+        if self._slots is not None:
+            if self.saturated() and self.policy != OverflowPolicy.BLOCK:
+                # take over the slot of the evicted event
+                self._evict_oldest()
+            else:
+                await self._slots.acquire()
+
+        self.put_nowait([key, event, time.monotonic()])
+
+    def _evict_oldest(self) -> None:
+        queue = self._lanes[Lane.MARKET_DATA]
+        # skip over any leading events that must not be dropped
+        i, cell = next((i, c) for i, c in enumerate(queue) if c[0] is not None)
+        del queue[i]
+        self._forget(cell)
+        self._stats[Lane.MARKET_DATA].depth -= 1
+        self._size -= 1
+        self.dropped += 1
+        self.task_done()
@@ -0,0 +1,109 @@
+import asyncio
+import itertools
+from functools import partial
+from typing import Any, Awaitable, Callable, Optional, Set
+
+import numpy as np
+import ray
+
+from mxts.config import EventType
+from mxts.core.data import Event, Result
+from mxts.core.handler import EventHandler
+
+# arrays at least this large are put in the object store and passed by reference
+OBJECT_STORE_THRESHOLD = 1 << 16
+
+
+def init_ray(address: Optional[str] = None, local_mode: bool = False) -> None:
+    """connect to (or start) ray once per process"""
+    if not ray.is_initialized():
+        ray.init(address=address, local_mode=local_mode, ignore_reinit_error=True)
+
+
+class _Worker:
+    """ray actor holding a copy of an event handler"""
+
+    def __init__(self, handler: EventHandler) -> None:
+        # the engine is not pickled along, there is none to reach in here
+        handler._manager = None
+        self._handler = handler
+
+    def call(self, name: str, type: EventType, data: Any) -> Any:
+        return getattr(self._handler, name)(Event(type=type, data=data))
+
+
+class RayExecutor:
+    """Runs a `cpu_bound` callback in ray actors, off the event loop
+
+    Calls are spread round robin over the actors and awaited in background
+    tasks, so the dispatcher only waits when every actor already has
+    `max_pending` calls in flight. Each return value is pushed back onto the
+    engine as a `Data` event carrying a `Result`; waiting for it is timed
+    and its exceptions counted through `guard` like any other callback.
+
+    The handler is put in the object store once and shared by all actors.
+    Large NumPy payloads are put in the object store before the call so
+    actors read them in place instead of unpickling a copy per call.
+
+    Args:
+        callback (Callable): the bound `cpu_bound` method
+        actors (int): number of actors
+        max_pending (int): max in flight calls per actor
+        push_event (Callable): coroutine that enqueues result events
+        guard (Callable): coroutine called with (event, callback, call) that
+            awaits `call()`, the call of the callback, under the handler's
+            time budget and circuit breaker and reports its failures
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Event], Any],
+        actors: int,
+        max_pending: int,
+        push_event: Callable[..., Awaitable[None]],
+        guard: Callable[[Event, Callable, Callable[[], Awaitable[None]]], Awaitable[None]],
+    ) -> None:
+        self.callback = callback
+        self._name = callback.__name__
+        self._push_event = push_event
+        self._guard = guard
+
+        handler = ray.put(callback.__self__)
+        worker = ray.remote(_Worker)
+        self._actors = [worker.remote(handler) for _ in range(actors)]
+        self._next = itertools.cycle(self._actors)
+
+        self._slots = asyncio.Semaphore(actors * max_pending)
+        self._inflight: Set[asyncio.Future] = set()
+
+    async def __call__(self, event: Event) -> None:
+        await self._slots.acquire()
+
+        data = event.data
+        if isinstance(data, np.ndarray) and data.nbytes >= OBJECT_STORE_THRESHOLD:
+            data = ray.put(data)
+
+        ref = next(self._next).call.remote(self._name, event.type, data)
+        task = asyncio.ensure_future(self._result(event, ref))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _result(self, event: Event, ref: "ray.ObjectRef") -> None:
+        try:
+            await self._guard(event, self.callback, partial(self._push_result, event, ref))
+        finally:
+            self._slots.release()
+
+    async def _push_result(self, event: Event, ref: "ray.ObjectRef") -> None:
+        result = Result(data=event, value=await ref, callback=self.callback.__qualname__)
+        await self._push_event(Event(type=EventType.DATA, data=result), droppable=False)
+
+    async def join(self) -> None:
+        """wait for every in flight call to come back"""
+        while self._inflight:
+            await asyncio.gather(*self._inflight)
+
+    def shutdown(self) -> None:
+        for actor in self._actors:
+            ray.kill(actor)
+        self._actors = []
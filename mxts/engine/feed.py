@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Awaitable, Callable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from mxts.config import TradingType
+from mxts.config.config import Settings
+from mxts.engine.batch import SymbolTable
+
+LOG = logging.getLogger('mxts')
+
+# fixed size tick record, `seq` is written last and is 0 while the slot is being written
+RECORD = np.dtype(
+    [
+        ("seq", "<u8"),
+        ("timestamp", "<f8"),
+        ("receipt", "<f8"),
+        ("bid", "<f8"),
+        ("ask", "<f8"),
+        ("instrument", "<i4"),
+        ("pad", "<i4"),
+    ]
+)
+
+# the header holds the number of records ever written, padded to a cache line
+HEADER = 64
+
+
+def feed_symbols(config: Settings) -> SymbolTable:
+    """instrument codes of the configured feeds, identical in every process"""
+    symbols = SymbolTable()
+    for exchange in config.exchanges:
+        for symbol in config.symbols:
+            symbols.code(exchange, symbol)
+    return symbols
+
+
+class Tick:
+    """Normalized ticker read off the ring, quacks like a cryptofeed `Ticker`"""
+
+    __slots__ = ("exchange", "symbol", "bid", "ask", "timestamp", "receipt_timestamp")
+
+    def __init__(
+        self, exchange: str, symbol: str, bid: float, ask: float, timestamp: Optional[float], receipt_timestamp: float
+    ) -> None:
+        self.exchange = exchange
+        self.symbol = symbol
+        self.bid = bid
+        self.ask = ask
+        self.timestamp = timestamp
+        self.receipt_timestamp = receipt_timestamp
+
+    def __repr__(self) -> str:
+        return f"<Tick({self.exchange} {self.symbol} {self.bid}/{self.ask} @ {self.timestamp})>"
+
+
+class TickRing:
+    """Single producer, single consumer ring of `RECORD`s in shared memory
+
+    The producer never waits: it overwrites the oldest slot when the ring is
+    full. Each slot carries the sequence number (plus one) of the record in
+    it, cleared while the slot is rewritten and set once the record is
+    complete, after which the header count is bumped. The consumer copies a
+    slot's fields straight out of shared memory and checks the sequence
+    number in the copy and in the slot afterwards, so a slot the producer
+    lapped is detected and counted as an overrun rather than read torn. Neither side takes a lock; this relies on stores
+    becoming visible in program order, as they do on x86.
+
+    Args:
+        shm (SharedMemory): segment holding the ring
+        capacity (int): number of slots, a power of two
+        owner (bool): whether `close` unlinks the segment
+    """
+
+    def __init__(self, shm: SharedMemory, capacity: int, owner: bool) -> None:
+        self._shm = shm
+        self._owner = owner
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._header = np.ndarray(1, dtype="<u8", buffer=shm.buf)
+        self.records = np.ndarray(capacity, dtype=RECORD, buffer=shm.buf, offset=HEADER)
+        self._seq = self.records["seq"]
+        # consumer position and lost records
+        self.tail = 0
+        self.overruns = 0
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @classmethod
+    def create(cls, capacity: int) -> "TickRing":
+        capacity = 1 << max(capacity - 1, 1).bit_length()
+        shm = SharedMemory(create=True, size=HEADER + capacity * RECORD.itemsize)
+        ring = cls(shm, capacity, owner=True)
+        ring._header[0] = 0
+        ring._seq[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, capacity: int, untrack: bool = False) -> "TickRing":
+        """open a ring another process created
+
+        `untrack` keeps this process' resource tracker off the segment, so
+        it is not unlinked when this process exits. Only pass it when the
+        process has a tracker of its own (spawn); a forked process shares
+        its parent's, which would lose the creator's registration.
+        """
+        shm = SharedMemory(name=name)
+        if untrack:
+            resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+        return cls(shm, capacity, owner=False)
+
+    @property
+    def head(self) -> int:
+        """number of records ever written"""
+        return int(self._header[0])
+
+    def write(self, instrument: int, timestamp: float, receipt: float, bid: float, ask: float) -> None:
+        """producer side, append a record"""
+        seq = int(self._header[0])
+        slot = seq & self._mask
+        self._seq[slot] = 0
+        self.records[slot] = (0, timestamp, receipt, bid, ask, instrument, 0)
+        self._seq[slot] = seq + 1
+        self._header[0] = seq + 1
+
+    def read(self, limit: int) -> Iterator[Tuple[int, float, float, float, float, int, int]]:
+        """consumer side, yield up to `limit` new records as tuples of `RECORD` fields
+
+        Each record's fields are copied out of the slot, which is what makes
+        the sequence check possible: the slot's sequence number is checked
+        again after the copy, records overwritten while being read are
+        skipped and counted as overruns. Nothing is pickled, but reads do copy.
+        """
+        head = int(self._header[0])
+        end = min(head, self.tail + limit)
+        while self.tail < end:
+            if head - self.tail > self.capacity:
+                # lapped, skip to the oldest record still in the ring
+                self.overruns += head - self.capacity - self.tail
+                self.tail = head - self.capacity
+                end = min(head, self.tail + limit)
+                continue
+
+            seq = self.tail + 1
+            slot = self.tail & self._mask
+            self.tail += 1
+            record = self.records[slot].item()
+            if record[0] != seq or self._seq[slot] != seq:
+                self.overruns += 1
+                continue
+            yield record
+
+    def close(self) -> None:
+        del self._header, self.records, self._seq
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+class FeedProcess:
+    """Runs the cryptofeed `FeedHandler` in a child process
+
+    The child normalizes every ticker into a `RECORD` on a `TickRing`; the
+    engine drains the ring on its own loop with `consume`, so websocket and
+    parsing work no longer competes with strategy code for the GIL and
+    ticks cross the process boundary without being pickled, copied once
+    out of shared memory as they are read. Ticks the engine fell too far
+    behind on are dropped and counted in `overruns`.
+
+    Args:
+        config (Settings): engine settings, feeds are built from `exchanges` and `symbols`
+    """
+
+    def __init__(self, config: Settings) -> None:
+        self.config = config
+        self.symbols = feed_symbols(config)
+        self.ring = TickRing.create(config.feed_ring_size)
+        self.received = 0
+        self._process: Optional[multiprocessing.Process] = None
+
+    @property
+    def overruns(self) -> int:
+        return self.ring.overruns
+
+    def start(self) -> None:
+        self._process = multiprocessing.Process(
+            target=_feed_main,
+            args=(self.config, self.ring.name, self.ring.capacity, multiprocessing.get_start_method() != "fork"),
+            name="mxts-feed",
+            daemon=True,
+        )
+        self._process.start()
+
+    async def consume(
+        self, ticker: Callable[[Tick, float], Awaitable[None]], idle: float = 0.0005, max_idle: float = 0.05
+    ) -> None:
+        """hand every tick on the ring to `ticker`
+
+        While the ring stays empty the sleep between polls doubles from
+        `idle` up to `max_idle` seconds, and drops back to `idle` as soon as
+        ticks arrive, so a quiet feed does not keep the loop spinning.
+        """
+        ring, lookup = self.ring, self.symbols.lookup
+        wait = idle
+        while True:
+            count = 0
+            for _, timestamp, receipt, bid, ask, instrument, _ in ring.read(1024):
+                exchange, symbol = lookup(instrument)
+                tick = Tick(
+                    exchange, symbol, bid, ask, None if math.isnan(timestamp) else timestamp, receipt
+                )
+                await ticker(tick, receipt)
+                count += 1
+            self.received += count
+            if count:
+                wait = idle
+                await asyncio.sleep(0)
+            else:
+                await asyncio.sleep(wait)
+                wait = min(wait * 2, max_idle)
+
+    def close(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+        self.ring.close()
+
+
+def _feed_main(config: Settings, name: str, capacity: int, untrack: bool) -> None:
+    """entry point of the feed process, `untrack` if it was not forked"""
+    from cryptofeed import FeedHandler
+    from cryptofeed.defines import TICKER
+    from cryptofeed.exchanges import EXCHANGE_MAP
+
+    ring = TickRing.attach(name, capacity, untrack=untrack)
+    symbols = feed_symbols(config)
+    codes = {symbols.lookup(code): code for code in range(len(symbols))}
+
+    async def ticker(obj, receipt_ts: float) -> None:
+        code = codes.get((obj.exchange, obj.symbol))
+        if code is None:
+            LOG.warning(f"dropping ticker of unconfigured instrument {obj.exchange} {obj.symbol}")
+            return
+        timestamp = math.nan if obj.timestamp is None else float(obj.timestamp)
+        ring.write(code, timestamp, receipt_ts, float(obj.bid), float(obj.ask))
+
+    feed_handler = FeedHandler()
+    for exchange in config.exchanges:
+        feed_handler.add_feed(
+            EXCHANGE_MAP[exchange](
+                sandbox=config.trading_type == TradingType.SANDBOX,
+                symbols=config.symbols,
+                channels=[TICKER],
+                callbacks={TICKER: ticker},
+            )
+        )
+    LOG.info(f"feed process writing {len(symbols)} instruments to ring {name}")
+    feed_handler.run()
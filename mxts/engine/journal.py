@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import mmap
+import os
+import pickle
+import struct
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+
+from mxts.core.data import Event
+
+if TYPE_CHECKING:
+    from mxts.engine.engine import TradingEngine
+
+LOG = logging.getLogger('mxts')
+
+MAGIC = b"MXTSJ001"
+
+# payload length, payload crc32, wall clock time the event was journaled in epoch nanoseconds
+RECORD = struct.Struct("<IIq")
+
+
+def _scan(buffer: "mmap.mmap", end: int) -> Iterator[Tuple[int, int, int]]:
+    """(time, payload start, payload end) of every complete record in a journal
+
+    Stops at the first record that is zero (space preallocated but never
+    written), runs past `end` or fails its checksum (torn by a crash).
+    """
+    offset = len(MAGIC)
+    while offset + RECORD.size <= end:
+        length, crc, ts = RECORD.unpack_from(buffer, offset)
+        start = offset + RECORD.size
+        if length == 0 or start + length > end or zlib.crc32(buffer[start : start + length]) != crc:
+            return
+        yield ts, start, start + length
+        offset = start + length
+
+
+class JournalWriter:
+    """Append-only, memory-mapped, length-prefixed binary event journal
+
+    Each record is a `RECORD` header followed by the pickled (type, data) of
+    an event, latency stamps are not kept. `append` only pickles on the event
+    loop; records are batched and copied into the map, then flushed to disk,
+    by a single writer thread once `batch_bytes` are pending or an event is
+    appended `flush_interval` seconds after the last batch.
+
+    The file grows `chunk` bytes at a time and is truncated to its records on
+    `close`. Reopening a journal, e.g. after a crash, appends after the last
+    complete record.
+
+    Args:
+        path (str): journal file
+        batch_bytes (int): pending bytes that trigger a write
+        flush_interval (float): max seconds a record waits before being written
+        chunk (int): bytes the file is grown by
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_bytes: int = 1 << 20,
+        flush_interval: float = 0.1,
+        chunk: int = 1 << 26,
+    ) -> None:
+        self.path = path
+        self.batch_bytes = batch_bytes
+        self.flush_interval = flush_interval
+        self.chunk = chunk
+        self.count = 0
+        self.skipped = 0
+
+        self._pending: List[bytes] = []
+        self._pending_bytes = 0
+        self._last = time.monotonic()
+        self._writes: Optional[Future] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+
+        self._file = open(path, "a+b")
+        self._file.seek(0, os.SEEK_END)
+        size = self._file.tell()
+        if size == 0:
+            self._file.truncate(chunk)
+            size = chunk
+        self._map = mmap.mmap(self._file.fileno(), size)
+        if size >= len(MAGIC) and self._map[: len(MAGIC)] == MAGIC:
+            self._end = len(MAGIC)
+            for _, _, end in _scan(self._map, size):
+                self._end = end
+        elif not any(self._map[: len(MAGIC)]):
+            self._map[: len(MAGIC)] = MAGIC
+            self._end = len(MAGIC)
+        else:
+            self._map.close()
+            self._file.close()
+            raise ValueError(f"{path} is not an event journal")
+
+    def append(self, event: Event) -> None:
+        """journal an event, it is written in the background"""
+        try:
+            payload = pickle.dumps((event.type, event.data), pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            self.skipped += 1
+            LOG.warning(f"can not journal {event.type} event: {e!r}")
+            return
+        self._pending.append(RECORD.pack(len(payload), zlib.crc32(payload), time.time_ns()))
+        self._pending.append(payload)
+        self._pending_bytes += RECORD.size + len(payload)
+        self.count += 1
+
+        now = time.monotonic()
+        if self._pending_bytes >= self.batch_bytes or now - self._last >= self.flush_interval:
+            self._submit()
+
+    def _submit(self) -> Optional[Future]:
+        if self._pending:
+            batch, self._pending, self._pending_bytes = self._pending, [], 0
+            self._writes = self._executor.submit(self._write, b"".join(batch))
+        self._last = time.monotonic()
+        return self._writes
+
+    def _write(self, data: bytes) -> None:
+        """copy a batch into the map and flush it to disk, on the writer thread"""
+        start, end = self._end, self._end + len(data)
+        if end > len(self._map):
+            self._map.flush()
+            self._map.close()
+            size = (end // self.chunk + 1) * self.chunk
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+        self._map[start:end] = data
+        # msync just the pages written to
+        page = start - start % mmap.ALLOCATIONGRANULARITY
+        self._map.flush(page, end - page)
+        self._end = end
+
+    async def flush(self) -> None:
+        """wait until every journaled event is on disk"""
+        writes = self._submit()
+        if writes is not None:
+            await asyncio.wrap_future(writes)
+
+    def _close(self) -> None:
+        self._map.flush()
+        self._map.close()
+        self._file.truncate(self._end)
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+    async def close(self) -> None:
+        """flush, trim the preallocated tail and close the journal"""
+        await self.flush()
+        await asyncio.wrap_future(self._executor.submit(self._close))
+        self._executor.shutdown()
+
+
+class JournalReader:
+    """Reads back a journal written by `JournalWriter`
+
+    Iterating yields the journaled events in order, so a journal can be
+    handed straight to `TradingEngine.run` to be replayed as fast as the
+    backtest driver goes. `replay` instead pushes the events onto a running
+    engine's queue, optionally at the pace they were journaled at.
+
+    Args:
+        path (str): journal file
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def records(self) -> Iterator[Tuple[int, Event]]:
+        """(time journaled in epoch nanoseconds, event) of every complete record"""
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < len(MAGIC):
+                return
+            with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as buffer:
+                if buffer[: len(MAGIC)] != MAGIC:
+                    raise ValueError(f"{self.path} is not an event journal")
+                for ts, start, end in _scan(buffer, size):
+                    type, data = pickle.loads(buffer[start:end])
+                    yield ts, Event(type=type, data=data)
+
+    def __iter__(self) -> Iterator[Event]:
+        for _, event in self.records():
+            yield event
+
+    async def replay(self, engine: "TradingEngine", realtime: bool = False) -> int:
+        """push the journaled events onto the engine's queue, returns the number pushed
+
+        Args:
+            engine (TradingEngine): engine to replay into, its dispatcher must be running
+            realtime (bool): wait out the time between events as it was when journaled
+        """
+        count = 0
+        first: Optional[int] = None
+        start = time.monotonic_ns()
+        for ts, event in self.records():
+            if realtime:
+                if first is None:
+                    first = ts
+                delay = (ts - first) - (time.monotonic_ns() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay / 1e9)
+            await engine.push_event(event, droppable=False)
+            count += 1
+        return count
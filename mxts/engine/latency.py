@@ -0,0 +1,195 @@
+import time
+from typing import Callable, Dict, List, Optional
+
+from mxts.config import EventType
+from mxts.core.data import Event
+
+# sub buckets per power of two, bounds the relative error of a bucket to 1 / 2 ** SUB_BITS
+SUB_BITS = 5
+SUB_BUCKETS = 1 << SUB_BITS
+
+# latency stages of an event, each spans the stamps on either side of it
+STAGES = (
+    ("network", "exchange_ts", "receipt_ts"),
+    ("ingest", "receipt_ts", "enqueue_ts"),
+    ("queue", "enqueue_ts", "dispatch_ts"),
+    ("dispatch", "dispatch_ts", "complete_ts"),
+)
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+def callback_name(callback: Callable) -> str:
+    """qualified name of a callback, looking through the conflating, batching and
+    ray wrappers to the handler method they wrap"""
+    while not hasattr(callback, "__qualname__") and hasattr(callback, "callback"):
+        callback = callback.callback
+    return getattr(callback, "__qualname__", repr(callback))
+
+
+class Histogram:
+    """HDR style log-linear histogram of nanosecond latencies
+
+    Values below `SUB_BUCKETS` get a bucket each, beyond that every power of
+    two is split into `SUB_BUCKETS` equal buckets, so percentiles are exact
+    to within ~3% at any scale while recording is a couple of integer ops
+    on a fixed size list. Negative values (e.g. from exchange clock skew)
+    are recorded as 0.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * ((64 - SUB_BITS + 1) * SUB_BUCKETS)
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    @staticmethod
+    def _index(value: int) -> int:
+        if value < SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - SUB_BITS - 1
+        return shift * SUB_BUCKETS + (value >> shift)
+
+    @staticmethod
+    def _lowest(index: int) -> int:
+        """smallest value that falls into a bucket"""
+        if index < 2 * SUB_BUCKETS:
+            return index
+        shift = index // SUB_BUCKETS - 1
+        return (index - shift * SUB_BUCKETS) << shift
+
+    def record(self, value: int) -> None:
+        if value < 0:
+            value = 0
+        self.counts[self._index(value)] += 1
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> int:
+        """value at or below which `p` percent of the recorded values fall"""
+        if not self.count:
+            return 0
+        if p >= 100:
+            return self.max
+        rank = max(1, -(-self.count * p // 100))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                # the middle of the bucket, clamped to what was actually seen
+                value = (self._lowest(index) + self._lowest(index + 1) - 1) // 2
+                return int(min(max(value, self.min), self.max))
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """count, mean, min, max and `PERCENTILES` in nanoseconds"""
+        summary: Dict[str, float] = {"count": self.count, "mean": self.mean, "min": self.min}
+        for p in PERCENTILES:
+            summary[f"p{p:g}"] = self.percentile(p)
+        summary["max"] = self.max
+        return summary
+
+    def __repr__(self) -> str:
+        return (
+            f"<Histogram(count={self.count}, mean={self.mean:.0f}, p50={self.percentile(50)}, "
+            f"p99={self.percentile(99)}, max={self.max})>"
+        )
+
+
+class LatencyRecorder:
+    """Per `EventType` and per callback latency histograms
+
+    The engine stamps events with `time.monotonic_ns` readings as they move
+    through it (see `Event`): exchange and cryptofeed receipt timestamps are
+    wall clock and are mapped onto the monotonic clock with `monotonic`.
+    Once all callbacks are done `complete` records every stage both stamps
+    of which are set, plus the `total` from the earliest stamp. Callback
+    histograms hold the time each `on_*` call took; conflating, batched and
+    offloaded callbacks only account for handing the event off.
+    """
+
+    def __init__(self) -> None:
+        # wall clock - monotonic clock, in nanoseconds
+        self._offset = time.time_ns() - time.monotonic_ns()
+        self.events: Dict[EventType, Dict[str, Histogram]] = {}
+        self.handlers: Dict[str, Histogram] = {}
+
+    def monotonic(self, seconds: Optional[float]) -> Optional[int]:
+        """map a wall clock time in epoch seconds onto the monotonic clock"""
+        if seconds is None:
+            return None
+        return int(seconds * 1_000_000_000) - self._offset
+
+    def handler(self, callback: Callable, elapsed: int) -> None:
+        """record how long a callback took on an event"""
+        name = callback_name(callback)
+        histogram = self.handlers.get(name)
+        if histogram is None:
+            histogram = self.handlers[name] = Histogram()
+        histogram.record(elapsed)
+
+    def complete(self, event: Event) -> None:
+        """record the stages of an event all callbacks are done with"""
+        histograms = self.events.get(event.type)
+        if histograms is None:
+            histograms = self.events[event.type] = {}
+
+        first: Optional[int] = None
+        for stage, start, end in STAGES:
+            begin = getattr(event, start)
+            if begin is None:
+                continue
+            if first is None:
+                first = begin
+            finish = getattr(event, end)
+            if finish is None:
+                continue
+            histogram = histograms.get(stage)
+            if histogram is None:
+                histogram = histograms[stage] = Histogram()
+            histogram.record(finish - begin)
+
+        if first is not None and event.complete_ts is not None:
+            histogram = histograms.get("total")
+            if histogram is None:
+                histogram = histograms["total"] = Histogram()
+            histogram.record(event.complete_ts - first)
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """summaries of every histogram, by event type and stage and by callback"""
+        return {
+            "events": {
+                e.value: {stage: h.summary() for stage, h in stages.items()}
+                for e, stages in self.events.items()
+            },
+            "handlers": {name: h.summary() for name, h in self.handlers.items()},
+        }
+
+    def dump(self) -> str:
+        """human readable table of every histogram, latencies in microseconds"""
+        header = f"{'':<48}{'count':>10}{'mean':>10}" + "".join(
+            f"{'p' + format(p, 'g'):>10}" for p in PERCENTILES
+        ) + f"{'max':>10}"
+        lines: List[str] = [header]
+
+        def row(name: str, h: Histogram) -> str:
+            values = [h.mean] + [h.percentile(p) for p in PERCENTILES] + [h.max]
+            return f"{name:<48}{h.count:>10}" + "".join(f"{v / 1000:>10.1f}" for v in values)
+
+        for e, stages in self.events.items():
+            for stage, h in stages.items():
+                lines.append(row(f"{e.value}.{stage}", h))
+        for name, h in self.handlers.items():
+            lines.append(row(name, h))
+        return "\n".join(lines)
@@ -0,0 +1 @@
+from .periodic import Periodic, PeriodicManager, TimerWheel, TradingHours
@@ -0,0 +1,324 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Iterator, List, Optional, Tuple, Union
+
+SECOND = 1_000_000_000
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+Field = Union[int, str]
+
+
+def _field(value: Field, limit: int) -> Optional[int]:
+    """normalize a cron field, None stands for '*'"""
+    if value == "*":
+        return None
+    value = int(value)
+    if not 0 <= value < limit:
+        raise ValueError(f"{value} is out of range [0, {limit})")
+    return value
+
+
+def _match(field: Optional[int], value: int) -> Optional[int]:
+    """smallest value >= `value` allowed by `field`, None if there is none"""
+    if field is None:
+        return value
+    return field if field >= value else None
+
+
+class Periodic:
+    """A function run by the engine whenever the clock matches its fields
+
+    Args:
+        function (Callable): coroutine function (or plain function) to run
+        second (Union[int, str]): second to run at, or '*' for every second
+        minute (Union[int, str]): minute to run at, or '*' for every minute
+        hour (Union[int, str]): hour to run at, or '*' for every hour
+    """
+
+    __slots__ = ("function", "second", "minute", "hour", "expires", "stopped")
+
+    def __init__(
+        self,
+        function: Callable[[], Any],
+        second: Field = 0,
+        minute: Field = "*",
+        hour: Field = "*",
+    ) -> None:
+        self.function = function
+        self.second = _field(second, 60)
+        self.minute = _field(minute, 60)
+        self.hour = _field(hour, 24)
+        # next run, in whole seconds since the epoch
+        self.expires: Optional[int] = None
+        self.stopped = False
+
+    def next(self, after: int) -> int:
+        """first second strictly after `after` (in seconds since the epoch) the periodic runs at"""
+        day, rest = divmod(after + 1, DAY)
+        hour, rest = divmod(rest, HOUR)
+        minute, second = divmod(rest, MINUTE)
+
+        while True:
+            h = _match(self.hour, hour)
+            if h is None:
+                day, hour, minute, second = day + 1, 0, 0, 0
+                continue
+            if h > hour:
+                hour, minute, second = h, 0, 0
+
+            m = _match(self.minute, minute)
+            if m is None:
+                hour, minute, second = hour + 1, 0, 0
+                if hour == 24:
+                    day, hour = day + 1, 0
+                continue
+            if m > minute:
+                minute, second = m, 0
+
+            s = _match(self.second, second)
+            if s is None:
+                minute, second = minute + 1, 0
+                if minute == 60:
+                    hour, minute = hour + 1, 0
+                    if hour == 24:
+                        day, hour = day + 1, 0
+                continue
+            return day * DAY + hour * HOUR + minute * MINUTE + s
+
+    def stop(self) -> None:
+        """stop running the periodic, it is dropped from the wheel when next due"""
+        self.stopped = True
+
+    async def execute(self) -> None:
+        result = self.function()
+        if asyncio.iscoroutine(result):
+            await result
+
+    def __repr__(self) -> str:
+        fields = ("*" if f is None else f for f in (self.hour, self.minute, self.second))
+        return f"<Periodic({getattr(self.function, '__qualname__', self.function)} @ {':'.join(map(str, fields))})>"
+
+
+class TimerWheel:
+    """Hierarchical timer wheel with one second resolution
+
+    Timers sit in one of three wheels depending on how far off they expire:
+    60 second slots for the current minute, 60 minute slots for the current
+    hour and 24 hour slots for the current day, anything later waits in an
+    overflow list. Every minute, hour and day boundary cascades the slot that
+    is coming up into the finer wheel, so adding a timer is O(1) and a second
+    only touches the timers due in it. Stretches of time with nothing due in
+    a wheel are skipped over wholesale.
+    """
+
+    def __init__(self) -> None:
+        self.now: Optional[int] = None
+        self._seconds: List[List[Periodic]] = [[] for _ in range(60)]
+        self._minutes: List[List[Periodic]] = [[] for _ in range(60)]
+        self._hours: List[List[Periodic]] = [[] for _ in range(24)]
+        self._overflow: List[Periodic] = []
+        self._counts = [0, 0, 0]
+        self._due: List[Periodic] = []
+
+    def __len__(self) -> int:
+        return sum(self._counts) + len(self._overflow) + len(self._due)
+
+    def add(self, timer: Periodic) -> None:
+        """file a timer under its `expires`, the wheel must have been started"""
+        expires, now = timer.expires, self.now
+        if expires <= now:
+            self._due.append(timer)
+        elif expires // MINUTE == now // MINUTE:
+            self._seconds[expires % 60].append(timer)
+            self._counts[0] += 1
+        elif expires // HOUR == now // HOUR:
+            self._minutes[expires // MINUTE % 60].append(timer)
+            self._counts[1] += 1
+        elif expires // DAY == now // DAY:
+            self._hours[expires // HOUR % 24].append(timer)
+            self._counts[2] += 1
+        else:
+            self._overflow.append(timer)
+
+    def _cascade(self, slot: List[Periodic], level: int) -> None:
+        timers = slot[:]
+        slot.clear()
+        self._counts[level] -= len(timers)
+        for timer in timers:
+            self.add(timer)
+
+    def advance(self, to: int) -> Iterator[Periodic]:
+        """move the wheel forward to `to` (seconds since the epoch), yielding
+        expired timers in expiry order, timers may be added while iterating"""
+        while self._due:
+            due, self._due = self._due, []
+            yield from due
+
+        counts = self._counts
+        while self.now < to:
+            now = self.now
+            if counts[0]:
+                t = now + 1
+            elif counts[1]:
+                t = (now // MINUTE + 1) * MINUTE
+            elif counts[2]:
+                t = (now // HOUR + 1) * HOUR
+            elif self._overflow:
+                t = (now // DAY + 1) * DAY
+            else:
+                t = to
+            t = min(t, to)
+            self.now = t
+
+            if t % DAY == 0 and self._overflow:
+                overflow, self._overflow = self._overflow, []
+                for timer in overflow:
+                    self.add(timer)
+            if t % HOUR == 0 and counts[2]:
+                self._cascade(self._hours[t // HOUR % 24], 2)
+            if t % MINUTE == 0 and counts[1]:
+                self._cascade(self._minutes[t // MINUTE % 60], 1)
+
+            slot = self._seconds[t % 60]
+            if slot:
+                timers = slot[:]
+                slot.clear()
+                counts[0] -= len(timers)
+                yield from timers
+            while self._due:
+                due, self._due = self._due, []
+                yield from due
+
+
+class TradingHours:
+    """Daily window a handler receives events in, see `PeriodicManager.restrict`"""
+
+    def __init__(self, start: int, end: int, open: Periodic, close: Periodic) -> None:
+        self.start = start
+        self.end = end
+        self.open = open
+        self.close = close
+
+    def contains(self, seconds: int) -> bool:
+        """whether a time of day (in seconds) falls inside the window"""
+        if self.start < self.end:
+            return self.start <= seconds < self.end
+        # the window wraps around midnight
+        return seconds >= self.start or seconds < self.end
+
+    def stop(self) -> None:
+        self.open.stop()
+        self.close.stop()
+
+
+class PeriodicManager:
+    """Engine owned scheduler of every periodic and trading hours window
+
+    All periodics share a single `TimerWheel` driven by whoever owns the
+    clock: a single task sleeping to the next second when trading live, the
+    backtest driver on simulated time. Periodics registered before the clock
+    first moves are scheduled from that first reading.
+
+    Args:
+        on_error (Callable): coroutine called with (periodic, exception) when a periodic raises
+    """
+
+    def __init__(self, on_error: Callable[[Periodic, Exception], Awaitable[None]]) -> None:
+        self._on_error = on_error
+        self._wheel = TimerWheel()
+        self._pending: List[Periodic] = []
+        self._windows: List[TradingHours] = []
+
+    def __len__(self) -> int:
+        return len(self._wheel) + len(self._pending)
+
+    @property
+    def started(self) -> bool:
+        return self._wheel.now is not None
+
+    def periodic(self, function: Callable[[], Any], second: Field = 0, minute: Field = "*", hour: Field = "*") -> Periodic:
+        """run `function` whenever the clock matches second, minute and hour"""
+        periodic = Periodic(function, second, minute, hour)
+        self._schedule(periodic)
+        return periodic
+
+    def _schedule(self, periodic: Periodic) -> None:
+        if self.started:
+            periodic.expires = periodic.next(self._wheel.now)
+            self._wheel.add(periodic)
+        else:
+            self._pending.append(periodic)
+
+    def restrict(
+        self,
+        start: Tuple[int, int, int],
+        end: Tuple[int, int, int],
+        on_open: Callable[[], Awaitable[None]],
+        on_close: Callable[[], Awaitable[None]],
+    ) -> Optional[TradingHours]:
+        """call `on_close` whenever the clock leaves the daily window
+        [start, end) and `on_open` whenever it enters it again
+
+        Args:
+            start (Tuple[int, int, int]): (hour, minute, second) the window opens at
+            end (Tuple[int, int, int]): (hour, minute, second) the window closes at
+        Returns:
+            TradingHours: the window, or None if it spans the whole day
+        """
+        if start == end:
+            return None
+        window = TradingHours(
+            start[0] * HOUR + start[1] * MINUTE + start[2],
+            end[0] * HOUR + end[1] * MINUTE + end[2],
+            Periodic(on_open, start[2], start[1], start[0]),
+            Periodic(on_close, end[2], end[1], end[0]),
+        )
+        self._windows.append(window)
+        if self.started:
+            self._open(window, self._wheel.now)
+        else:
+            self._pending.append(window)
+        return window
+
+    def _open(self, window: TradingHours, now: int) -> None:
+        window.open.expires = window.open.next(now)
+        if window.contains(now % DAY):
+            window.close.expires = window.close.next(now)
+        else:
+            # close straight away, the window opens at its next start
+            window.close.expires = now
+        self._wheel.add(window.open)
+        self._wheel.add(window.close)
+
+    def start(self, now: int) -> None:
+        """start the clock at `now` (in epoch nanoseconds)"""
+        # periodics due on the very first reading run
+        self._wheel.now = now // SECOND - 1
+        for item in self._pending:
+            if isinstance(item, TradingHours):
+                self._open(item, now // SECOND)
+            else:
+                self._schedule(item)
+        self._pending = []
+
+    def expired(self, now: int) -> Iterator[Tuple[int, Periodic]]:
+        """move the clock to `now` (in epoch nanoseconds), yielding (time in
+        epoch nanoseconds, periodic) for every periodic due by then, run each
+        with `run` before asking for the next"""
+        if not self.started:
+            self.start(now)
+        for periodic in self._wheel.advance(now // SECOND):
+            if not periodic.stopped:
+                yield periodic.expires * SECOND, periodic
+
+    async def run(self, periodic: Periodic) -> None:
+        """run an expired periodic and schedule its next run"""
+        expires = periodic.expires
+        try:
+            await periodic.execute()
+        except Exception as e:
+            await self._on_error(periodic, e)
+        if not periodic.stopped:
+            periodic.expires = periodic.next(expires)
+            self._wheel.add(periodic)
@@ -0,0 +1,116 @@
+from typing import TYPE_CHECKING, Iterator, List, Sequence, Tuple
+
+from prometheus_client import start_http_server
+from prometheus_client.core import REGISTRY, CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+
+from mxts.engine.latency import Histogram
+from mxts.exchange.base.stats import CLIENTS
+
+if TYPE_CHECKING:
+    from mxts.engine.engine import TradingEngine
+
+# histogram bucket upper bounds in seconds, 1us to 10s
+BUCKETS = tuple(m * 10.0 ** e for e in range(-6, 1) for m in (1, 2.5, 5)) + (10.0,)
+
+
+def buckets(histogram: Histogram, bounds: Sequence[float] = BUCKETS) -> List[Tuple[str, float]]:
+    """cumulative prometheus buckets of a nanosecond histogram"""
+    out: List[Tuple[str, float]] = []
+    counts = histogram.counts
+    index, seen = 0, 0
+    for bound in bounds:
+        limit = histogram._index(int(bound * 1e9))
+        while index < limit:
+            seen += counts[index]
+            index += 1
+        out.append((repr(bound), seen))
+    out.append(("+Inf", histogram.count))
+    return out
+
+
+class MetricsCollector:
+    """Prometheus view of the engine and exchange client counters
+
+    Nothing on the event path touches prometheus objects: the engine, its
+    queue and the exchange clients keep plain ints, dicts and `Histogram`s
+    that are only read here, from the exporter thread, when scraped. Dicts
+    are copied before iterating as they may grow while being read.
+
+    Args:
+        engine (TradingEngine): engine to export
+    """
+
+    def __init__(self, engine: "TradingEngine") -> None:
+        self.engine = engine
+
+    def collect(self) -> Iterator:
+        engine = self.engine
+
+        events = CounterMetricFamily("mxts_events", "events dispatched", labels=["type"])
+        for type, n in list(engine.event_counts.items()):
+            events.add_metric([type.value], n)
+        yield events
+
+        queue = engine._event_queue
+        depth = GaugeMetricFamily("mxts_queue_depth", "queued events", labels=["lane"])
+        max_depth = GaugeMetricFamily("mxts_queue_max_depth", "high water mark of queued events", labels=["lane"])
+        waits = CounterMetricFamily("mxts_queue_wait_seconds", "time events spent queued", labels=["lane"])
+        for lane, stats in list(queue.stats().items()):
+            depth.add_metric([lane.value], stats.depth)
+            max_depth.add_metric([lane.value], stats.max_depth)
+            waits.add_metric([lane.value], stats.wait_total)
+        yield depth
+        yield max_depth
+        yield waits
+        yield CounterMetricFamily("mxts_queue_dropped", "market data events dropped", value=queue.dropped)
+        yield CounterMetricFamily("mxts_queue_conflated", "market data events conflated", value=queue.conflated)
+
+        feed = engine._feed
+        if feed is not None:
+            yield CounterMetricFamily("mxts_feed_ticks", "ticks read off the feed ring", value=feed.received)
+            yield CounterMetricFamily("mxts_feed_overruns", "ticks overwritten before being read", value=feed.overruns)
+
+        latency = engine.latency
+        if latency is not None:
+            stages = HistogramMetricFamily(
+                "mxts_event_latency_seconds", "event latency per stage", labels=["type", "stage"]
+            )
+            for type, histograms in list(latency.events.items()):
+                for stage, h in list(histograms.items()):
+                    stages.add_metric([type.value, stage], buckets(h), h.total / 1e9)
+            yield stages
+
+            handlers = HistogramMetricFamily(
+                "mxts_handler_latency_seconds", "time spent in a callback", labels=["callback"]
+            )
+            for name, h in list(latency.handlers.items()):
+                handlers.add_metric([name], buckets(h), h.total / 1e9)
+            yield handlers
+
+        statuses = CounterMetricFamily(
+            "mxts_http_responses", "exchange HTTP responses", labels=["exchange", "endpoint", "status"]
+        )
+        limiter = HistogramMetricFamily(
+            "mxts_request_limiter_wait_seconds", "time requests waited on the rate limiter", labels=["exchange"]
+        )
+        reconnects = CounterMetricFamily(
+            "mxts_stream_reconnects", "stream connections opened after the first", labels=["exchange", "endpoint"]
+        )
+        for exchange, stats in list(CLIENTS.items()):
+            for (endpoint, status), n in list(stats.statuses.items()):
+                statuses.add_metric([exchange, endpoint, str(status)], n)
+            if stats.limiter_wait.count:
+                limiter.add_metric([exchange], buckets(stats.limiter_wait), stats.limiter_wait.total / 1e9)
+            for endpoint, n in stats.reconnects.items():
+                reconnects.add_metric([exchange, endpoint], n)
+        yield statuses
+        yield limiter
+        yield reconnects
+
+
+def serve(engine: "TradingEngine", port: int, addr: str = "127.0.0.1") -> MetricsCollector:
+    """export the engine's metrics over HTTP on a background thread"""
+    collector = MetricsCollector(engine)
+    REGISTRY.register(collector)
+    start_http_server(port, addr=addr)
+    return collector
@@ -0,0 +1,65 @@
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from mxts.config import EventType
+from mxts.core.data import Event
+
+# volume left below which an order counts as completely filled
+EPSILON = 1e-9
+
+
+def order_id(data: Any) -> Optional[Hashable]:
+    """id of the order an order event is about, the order itself or a `Trade` of it"""
+    return getattr(getattr(data, "taker_order", data), "id", None)
+
+
+class OrderOwners:
+    """Who placed each open order, so its responses only go back there
+
+    An order is tracked from submission until it is rejected, canceled or
+    its `Bought`/`Sold` trades add up to its volume, so finished orders do
+    not pile up.
+    """
+
+    def __init__(self) -> None:
+        # order id -> [owner, volume left to fill]
+        self._owners: Dict[Hashable, List[Any]] = {}
+        # order id -> (successor, its volume to fill) of orders replaced before being added
+        self._pending: Dict[Hashable, Tuple[Any, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+    def add(self, order: Any, owner: Any, remaining: float) -> None:
+        """track a submitted order with `remaining` volume still to fill"""
+        successor = self._pending.pop(order.id, None)
+        if successor is None:
+            self._owners[order.id] = [owner, remaining]
+        else:
+            # replaced while it was being submitted, e.g. a stop triggering at once
+            self._owners[successor[0].id] = [owner, successor[1]]
+
+    def transfer(self, order: Any, successor: Any) -> None:
+        """hand a finished order's owner on to the order replacing it, e.g. a
+        triggered stop's target"""
+        remaining = successor.volume - successor.filled
+        entry = self._owners.pop(order.id, None)
+        if entry is None:
+            # not added yet, `add` hands the owner on
+            self._pending[order.id] = (successor, remaining)
+        else:
+            self._owners[successor.id] = [entry[0], remaining]
+
+    def owner(self, event: Event) -> Optional[Any]:
+        """owner of the order an order response is for, forgetting the order
+        once the response is its last"""
+        key = order_id(event.data)
+        entry = self._owners.get(key)
+        if entry is None:
+            return None
+        if event.type in (EventType.REJECTED, EventType.CANCELED):
+            del self._owners[key]
+        elif event.type in (EventType.BOUGHT, EventType.SOLD):
+            entry[1] -= event.data.volume
+            if entry[1] <= EPSILON:
+                del self._owners[key]
+        return entry[0]
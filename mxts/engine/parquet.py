@@ -0,0 +1,382 @@
+import math
+import os
+import time
+from typing import Any, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from mxts.config import EventType
+from mxts.core.data import Event, Order, Trade
+from mxts.core.handler import EventHandler, callback
+from mxts.engine.bars import Bar
+from mxts.engine.feed import Tick
+from mxts.engine.tickstore import Ticks, TickStore
+from mxts.utils import nanos
+
+TIMESTAMP = pa.timestamp("ns", tz="UTC")
+
+TICKS = pa.schema(
+    [
+        ("timestamp", TIMESTAMP),
+        ("exchange", pa.string()),
+        ("symbol", pa.string()),
+        ("bid", pa.float64()),
+        ("ask", pa.float64()),
+        ("bid_size", pa.float64()),
+        ("ask_size", pa.float64()),
+    ]
+)
+
+# one row per `Bar`, stamped with the time it opened at
+CANDLES = pa.schema(
+    [
+        ("timestamp", TIMESTAMP),
+        ("exchange", pa.string()),
+        ("symbol", pa.string()),
+        ("open", pa.float64()),
+        ("high", pa.float64()),
+        ("low", pa.float64()),
+        ("close", pa.float64()),
+        ("volume", pa.float64()),
+    ]
+)
+
+# one row per order event, `status` is the event type, e.g. RECEIVED or CANCELED
+ORDERS = pa.schema(
+    [
+        ("timestamp", TIMESTAMP),
+        ("id", pa.int64()),
+        ("exchange", pa.string()),
+        ("symbol", pa.string()),
+        ("side", pa.string()),
+        ("order_type", pa.string()),
+        ("flag", pa.string()),
+        ("volume", pa.float64()),
+        ("price", pa.float64()),
+        ("notional", pa.float64()),
+        ("filled", pa.float64()),
+        ("status", pa.string()),
+    ]
+)
+
+TRADES = pa.schema(
+    [
+        ("timestamp", TIMESTAMP),
+        ("id", pa.int64()),
+        ("exchange", pa.string()),
+        ("symbol", pa.string()),
+        ("side", pa.string()),
+        ("price", pa.float64()),
+        ("volume", pa.float64()),
+        ("order_id", pa.int64()),
+        ("slippage", pa.float64()),
+        ("transaction_cost", pa.float64()),
+    ]
+)
+
+# portfolio snapshots, one row per balance
+BALANCES = pa.schema(
+    [
+        ("timestamp", TIMESTAMP),
+        ("exchange", pa.string()),
+        ("currency", pa.string()),
+        ("balance", pa.float64()),
+        ("reserved", pa.float64()),
+    ]
+)
+
+
+def _numpy(type: pa.DataType) -> Optional[np.dtype]:
+    """dtype a column of `type` is buffered in, None for a list of python objects"""
+    if pa.types.is_timestamp(type):
+        return np.dtype(np.int64)
+    if pa.types.is_floating(type) or pa.types.is_integer(type):
+        return np.dtype(type.to_pandas_dtype())
+    return None
+
+
+class ParquetWriter:
+    """Streams rows into a Parquet file, a row group at a time
+
+    Rows are appended to per column buffers, preallocated NumPy arrays for
+    numeric and timestamp columns, and turned into a record batch without
+    copying once `row_group_size` rows are pending, so a long running
+    process only ever holds one row group in memory. Whole columns can be
+    written with `write`. The file is created on the first write.
+
+    Args:
+        path (str): Parquet file
+        schema (pa.Schema): columns, e.g. `TICKS` or `ORDERS`, timestamps are
+            passed in as epoch nanoseconds
+        row_group_size (int): rows per row group
+        compression (str): Parquet compression codec
+    """
+
+    def __init__(
+        self, path: str, schema: pa.Schema, row_group_size: int = 65536, compression: str = "zstd"
+    ) -> None:
+        self.path = path
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.count = 0
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._buffers: List[Any] = []
+        for field in schema:
+            dtype = _numpy(field.type)
+            self._buffers.append([] if dtype is None else np.empty(row_group_size, dtype=dtype))
+        self._size = 0
+
+    def __enter__(self) -> "ParquetWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def append(self, *values: Any) -> None:
+        """buffer a row, values in schema order"""
+        i = self._size
+        for buffer, value in zip(self._buffers, values):
+            if isinstance(buffer, list):
+                buffer.append(value)
+            else:
+                buffer[i] = value
+        self._size = i + 1
+        self.count += 1
+        if self._size == self.row_group_size:
+            self.flush()
+
+    def write(self, columns: Mapping[str, Any]) -> None:
+        """write whole columns, e.g. NumPy arrays, as row groups after the buffered rows"""
+        self.flush()
+        arrays = [pa.array(columns[field.name], type=field.type) for field in self.schema]
+        table = pa.Table.from_arrays(arrays, schema=self.schema)
+        if table.num_rows:
+            self._file().write_table(table, row_group_size=self.row_group_size)
+            self.count += table.num_rows
+
+    def _file(self) -> pq.ParquetWriter:
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self.schema, compression=self.compression)
+        return self._writer
+
+    def flush(self) -> None:
+        """write the buffered rows out as a row group"""
+        n = self._size
+        if not n:
+            return
+        arrays = []
+        for field, buffer in zip(self.schema, self._buffers):
+            arrays.append(pa.array(buffer if isinstance(buffer, list) else buffer[:n], type=field.type))
+        self._file().write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        for buffer in self._buffers:
+            if isinstance(buffer, list):
+                buffer.clear()
+        self._size = 0
+
+    def close(self) -> None:
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def _filters(exchange: Optional[str], symbol: Optional[str], start, end) -> Optional[List[Tuple[str, str, Any]]]:
+    filters: List[Tuple[str, str, Any]] = []
+    if exchange is not None:
+        filters.append(("exchange", "=", exchange))
+    if symbol is not None:
+        filters.append(("symbol", "=", symbol))
+    if start is not None:
+        filters.append(("timestamp", ">=", pa.scalar(nanos(start), type=TIMESTAMP)))
+    if end is not None:
+        filters.append(("timestamp", "<", pa.scalar(nanos(end), type=TIMESTAMP)))
+    return filters or None
+
+
+def read(
+    path: str,
+    columns: Optional[Sequence[str]] = None,
+    exchange: Optional[str] = None,
+    symbol: Optional[str] = None,
+    start=None,
+    end=None,
+) -> pa.Table:
+    """rows of a Parquet file in `[start, end)` for an exchange and symbol
+
+    The filters are pushed down, row groups whose statistics rule them out
+    are never read.
+    """
+    return pq.read_table(path, columns=columns, filters=_filters(exchange, symbol, start, end))
+
+
+def _column(table: pa.Table, name: str, dtype) -> np.ndarray:
+    column = table.column(name)
+    if pa.types.is_timestamp(column.type):
+        column = column.cast(pa.int64())
+    return column.to_numpy().astype(dtype, copy=False)
+
+
+def read_ticks(path: str, exchange: str, symbol: str, start=None, end=None) -> Ticks:
+    """ticks of one instrument in `[start, end)`, oldest first"""
+    table = read(path, ["timestamp", "bid", "ask", "bid_size", "ask_size"], exchange, symbol, start, end)
+    timestamp = _column(table, "timestamp", np.int64)
+    order = np.argsort(timestamp, kind="stable")
+    return Ticks(
+        timestamp[order],
+        _column(table, "bid", np.float64)[order],
+        _column(table, "ask", np.float64)[order],
+        _column(table, "bid_size", np.float64)[order],
+        _column(table, "ask_size", np.float64)[order],
+    )
+
+
+def tick_events(path: str, exchange: Optional[str] = None, symbol: Optional[str] = None, start=None, end=None) -> Iterator[Event]:
+    """`Ticker` events of a ticks file in time order, to hand to `TradingEngine.run`"""
+    table = read(path, ["timestamp", "exchange", "symbol", "bid", "ask"], exchange, symbol, start, end)
+    timestamp = _column(table, "timestamp", np.int64)
+    order = np.argsort(timestamp, kind="stable")
+    exchanges = table.column("exchange").to_pylist()
+    symbols = table.column("symbol").to_pylist()
+    bid, ask = _column(table, "bid", np.float64), _column(table, "ask", np.float64)
+    for i in order.tolist():
+        seconds = timestamp[i] / 1e9
+        yield Event(
+            type=EventType.TICKER,
+            data=Tick(exchanges[i], symbols[i], float(bid[i]), float(ask[i]), seconds, seconds),
+        )
+
+
+def export_ticks(
+    store: TickStore, path: str, instruments: Optional[Iterable[Tuple[str, str]]] = None, start=None, end=None
+) -> int:
+    """copy tick history out of a `TickStore` into a Parquet file, a day per write, returns the rows written"""
+    with ParquetWriter(path, TICKS) as writer:
+        for exchange, symbol in store.instruments() if instruments is None else instruments:
+            for ticks in store.query(exchange, symbol, start, end):
+                n = len(ticks)
+                writer.write(
+                    {
+                        "timestamp": ticks.timestamp,
+                        "exchange": [exchange] * n,
+                        "symbol": [symbol] * n,
+                        "bid": ticks.bid,
+                        "ask": ticks.ask,
+                        "bid_size": ticks.bid_size,
+                        "ask_size": ticks.ask_size,
+                    }
+                )
+        return writer.count
+
+
+def _float(value) -> float:
+    return math.nan if value is None else float(value)
+
+
+def order_row(order: Order, status: EventType) -> Tuple:
+    """`ORDERS` row of an order event"""
+    return (
+        order.timestamp.value,
+        order.id,
+        order.exchange.value,
+        order.instrument.name,
+        order.side.value,
+        order.order_type.value,
+        order.flag.value,
+        order.volume,
+        order.price,
+        order.notional,
+        order.filled,
+        status.value,
+    )
+
+
+def trade_row(trade: Trade, timestamp: int) -> Tuple:
+    """`TRADES` row of a fill that happened at `timestamp` (epoch nanoseconds)"""
+    order = trade.taker_order
+    return (
+        timestamp,
+        trade.id,
+        order.exchange.value,
+        order.instrument.name,
+        order.side.value,
+        trade.price,
+        trade.volume,
+        order.id,
+        trade.slippage,
+        trade.transaction_cost,
+    )
+
+
+def candle_row(bar: Bar) -> Tuple:
+    """`CANDLES` row of a bar"""
+    return (bar.start, str(bar.exchange), str(bar.symbol), bar.open, bar.high, bar.low, bar.close, bar.volume)
+
+
+def write_balances(writer: ParquetWriter, balances: Iterable, timestamp) -> None:
+    """append a portfolio snapshot of cryptofeed `Balance`s taken at `timestamp`"""
+    timestamp = nanos(timestamp)
+    for balance in balances:
+        writer.append(
+            timestamp, str(balance.exchange), str(balance.currency), float(balance.balance), _float(balance.reserved)
+        )
+
+
+class ParquetRecorder(EventHandler):
+    """Records the ticks, order events, fills and bars the engine dispatches to Parquet
+
+    Writes `ticks.parquet`, `orders.parquet`, `trades.parquet` and, from the
+    `Bar`s of `TradingEngine.bars`, `candles.parquet` under `root`, a row
+    group at a time, and closes them on `Exit`. Fills are stamped with the
+    engine time they are dispatched at, the simulated clock in replays.
+    Register it like any other handler.
+
+    Args:
+        root (str): directory the files are written to
+        row_group_size (int): rows per row group
+    """
+
+    def __init__(self, root: str, row_group_size: int = 65536) -> None:
+        os.makedirs(root, exist_ok=True)
+        self.ticks = ParquetWriter(os.path.join(root, "ticks.parquet"), TICKS, row_group_size)
+        self.orders = ParquetWriter(os.path.join(root, "orders.parquet"), ORDERS, row_group_size)
+        self.trades = ParquetWriter(os.path.join(root, "trades.parquet"), TRADES, row_group_size)
+        self.candles = ParquetWriter(os.path.join(root, "candles.parquet"), CANDLES, row_group_size)
+
+    @callback(EventType.TICKER)
+    async def on_ticker(self, event: Event) -> None:
+        data = event.data
+        timestamp = getattr(data, "timestamp", None)
+        if timestamp is None:
+            timestamp = data.receipt_timestamp
+        self.ticks.append(
+            int(timestamp * 1_000_000_000),
+            data.exchange,
+            data.symbol,
+            float(data.bid),
+            float(data.ask),
+            _float(getattr(data, "bid_size", None)),
+            _float(getattr(data, "ask_size", None)),
+        )
+
+    @callback(EventType.RECEIVED, EventType.REJECTED, EventType.CANCELED)
+    async def on_order_status(self, event: Event) -> None:
+        self.orders.append(*order_row(event.data, event.type))
+
+    async def on_fill(self, event: Event) -> None:
+        self.trades.append(*trade_row(event.data, self._now()))
+
+    async def on_data(self, event: Event) -> None:
+        if isinstance(event.data, Bar):
+            self.candles.append(*candle_row(event.data))
+
+    async def on_exit(self, event: Event) -> None:
+        for writer in (self.ticks, self.orders, self.trades, self.candles):
+            writer.close()
+
+    def _now(self) -> int:
+        """engine time in epoch nanoseconds, the wall clock if not registered"""
+        manager = getattr(self, "_manager", None)
+        return manager.now().value if manager is not None else time.time_ns()
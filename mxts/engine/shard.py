@@ -0,0 +1,307 @@
+import asyncio
+import logging
+import multiprocessing
+import pickle
+import zlib
+from multiprocessing.connection import Connection
+from typing import Any, Awaitable, Callable, Hashable, List, Optional
+
+from mxts.config import EventType, ShardMode
+from mxts.config.config import Settings
+from mxts.core.data import Event
+from mxts.core.handler import EventHandler
+from mxts.engine.owners import OrderOwners
+from mxts.exchange.base.order_entry import OrderEntry
+
+LOG = logging.getLogger('mxts')
+
+# order requests raised inside a shard travel up to the router, which owns the exchanges
+ORDER_REQUESTS = frozenset((EventType.OPEN, EventType.CANCEL, EventType.CHANGE))
+
+# exchange responses to orders, routed back to the shard that owns the order
+ORDER_RESPONSES = frozenset(
+    (
+        EventType.FILL,
+        EventType.BOUGHT,
+        EventType.SOLD,
+        EventType.RECEIVED,
+        EventType.REJECTED,
+        EventType.CANCELED,
+    )
+)
+
+MARKET_DATA = frozenset((EventType.TICKER, EventType.TRADE, EventType.DATA))
+
+# sent to every shard
+BROADCAST = frozenset((EventType.HEARTBEAT, EventType.HALT, EventType.CONTINUE, EventType.START))
+
+# every event type the router forwards to its shards
+ROUTED_EVENTS = ORDER_RESPONSES | MARKET_DATA | BROADCAST
+
+# max events buffered per shard before the router waits on the channel
+MAX_PENDING = 65536
+
+
+def shard_of(symbol: Hashable, shards: int) -> int:
+    """stable (process independent) shard index of a symbol"""
+    return zlib.crc32(str(symbol).encode()) % shards
+
+
+def _symbol(data: Any) -> Optional[Hashable]:
+    return getattr(data, "symbol", getattr(data, "instrument", None))
+
+
+def _send(conn: Connection, events: List[Event]) -> None:
+    # protocol 5 hands large buffers (e.g. numpy arrays) over out of band,
+    # so they are written to the pipe directly rather than copied into the pickle
+    buffers: List[pickle.PickleBuffer] = []
+    payload = pickle.dumps(events, protocol=5, buffer_callback=buffers.append)
+    conn.send((len(buffers), payload))
+    for buf in buffers:
+        conn.send_bytes(buf.raw())
+
+
+def _recv(conn: Connection) -> List[Event]:
+    count, payload = conn.recv()
+    buffers = [conn.recv_bytes() for _ in range(count)]
+    return pickle.loads(payload, buffers=buffers)
+
+
+class Channel:
+    """Batching, ordered sender over one end of a pipe
+
+    Events are buffered and written by a single background task through the
+    default executor, so everything queued while a write is in flight goes
+    out as one batch and the event loop never blocks on the pipe.
+    """
+
+    def __init__(self, conn: Connection, max_pending: int = MAX_PENDING) -> None:
+        self.conn = conn
+        self.sent = 0
+        self._max_pending = max_pending
+        self._pending: List[Event] = []
+        self._task: Optional[asyncio.Task] = None
+        self._drained = asyncio.Event()
+
+    async def send(self, event: Event) -> None:
+        while len(self._pending) >= self._max_pending:
+            self._drained.clear()
+            await self._drained.wait()
+
+        self._pending.append(event)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._flush())
+
+    async def _flush(self) -> None:
+        loop = asyncio.get_event_loop()
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                self._drained.set()
+                await loop.run_in_executor(None, _send, self.conn, batch)
+                self.sent += len(batch)
+        finally:
+            self._task = None
+
+    async def join(self) -> None:
+        while self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def receive(self, callback: Callable[[Event], Awaitable[None]]) -> None:
+        """feed every incoming event to `callback` until the other end hangs up"""
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                events = await loop.run_in_executor(None, _recv, self.conn)
+            except (EOFError, OSError):
+                return
+            for event in events:
+                await callback(event)
+
+
+class Shard:
+    """router side handle of a shard process"""
+
+    def __init__(self, index: int, process: multiprocessing.Process, channel: Channel) -> None:
+        self.index = index
+        self.process = process
+        self.channel = channel
+        self.reader: Optional[asyncio.Future] = None
+
+
+class ShardRouter:
+    """Fans the router's events out to shard processes
+
+    Each shard runs its own engine and dispatch loop with its share of the
+    registered handlers:
+
+        SYMBOL: every shard runs every handler, market data is routed by
+                symbol so a handler instance only sees its shard's symbols
+        STRATEGY: handlers are dealt round robin over the shards, market data
+                  is sent to every shard
+
+    Order requests raised in a shard are submitted to the router's
+    `order_entry` and the order's responses go back to that shard only,
+    until the order is done. Responses to orders no shard raised fall back
+    to symbol routing in SYMBOL mode and go to every shard otherwise. Other
+    events raised in a shard are pushed onto the router's own queue.
+
+    Args:
+        config (Settings): engine settings, `shards` is the number of processes
+        push_event (Callable): router engine coroutine receiving shard events
+        order_entry (Optional[OrderEntry]): where shard orders are submitted
+    """
+
+    def __init__(
+        self,
+        config: Settings,
+        push_event: Callable[[Event], Awaitable[None]],
+        order_entry: Optional[OrderEntry] = None,
+    ) -> None:
+        self.config = config
+        self.mode = config.shard_mode
+        self.count = config.shards
+        self.order_entry = order_entry
+        self._push_event = push_event
+        self._handlers: List[List[EventHandler]] = [[] for _ in range(self.count)]
+        self._next = 0
+        # shard index of every open order a shard raised
+        self._owners = OrderOwners()
+        self._shards: List[Shard] = []
+
+    def add(self, handler: EventHandler) -> None:
+        if self.mode == ShardMode.STRATEGY:
+            self._handlers[self._next % self.count].append(handler)
+            self._next += 1
+        else:
+            for handlers in self._handlers:
+                handlers.append(handler)
+
+    def start(self) -> None:
+        """spawn the shard processes, handlers must be registered by now"""
+        for index, handlers in enumerate(self._handlers):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_shard_main,
+                args=(index, handlers, self.config, child),
+                name=f"mxts-shard-{index}",
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            shard = Shard(index, process, Channel(parent))
+            shard.reader = asyncio.ensure_future(shard.channel.receive(self._from_shard(index)))
+            self._shards.append(shard)
+
+    def _from_shard(self, index: int) -> Callable[[Event], Awaitable[None]]:
+        async def receive(event: Event) -> None:
+            if event.type in ORDER_REQUESTS:
+                await self._request(index, event)
+            else:
+                await self._push_event(event)
+
+        return receive
+
+    async def _request(self, index: int, event: Event) -> None:
+        """submit an order request of a shard to the order entry"""
+        order = event.data
+        if self.order_entry is None:
+            LOG.error(f"no order entry to submit the {event.type} of shard {index} to, dropping {order}")
+            return
+        if event.type == EventType.OPEN:
+            remaining = order.volume - order.filled
+            await self.order_entry.new_order(order)
+            # responses are only routed once dispatched, after this
+            self._owners.add(order, index, remaining)
+        elif event.type == EventType.CANCEL:
+            await self.order_entry.cancel_order(order)
+        else:
+            LOG.error(f"order changes are not supported by the order entry, dropping {order}")
+
+    def triggered(self, stop, target) -> None:
+        """a stop a shard raised triggered, its target goes back to the same shard"""
+        self._owners.transfer(stop, target)
+
+    def targets(self, event: Event) -> List[int]:
+        """indices of the shards an event is routed to"""
+        if event.type in ORDER_RESPONSES:
+            owner = self._owners.owner(event)
+            if owner is not None:
+                return [owner]
+
+        if event.type not in BROADCAST and self.mode == ShardMode.SYMBOL:
+            symbol = _symbol(event.data)
+            if symbol is not None:
+                return [shard_of(symbol, self.count)]
+
+        return list(range(self.count))
+
+    async def route(self, event: Event) -> None:
+        for index in self.targets(event):
+            await self._shards[index].channel.send(event)
+
+    async def shutdown(self) -> None:
+        """drain, stop and join every shard"""
+        loop = asyncio.get_event_loop()
+        for shard in self._shards:
+            await shard.channel.send(Event(type=EventType.EXIT, data=None))
+            await shard.channel.join()
+        for shard in self._shards:
+            # the shard hangs up once it has processed everything
+            await shard.reader
+            await loop.run_in_executor(None, shard.process.join)
+            shard.channel.conn.close()
+        self._shards = []
+
+
+def _shard_main(index: int, handlers: List[EventHandler], config: Settings, conn: Connection) -> None:
+    """entry point of a shard process"""
+    asyncio.run(_run_shard(index, handlers, config, conn))
+
+
+async def _run_shard(index: int, handlers: List[EventHandler], config: Settings, conn: Connection) -> None:
+    from mxts.engine.engine import TradingEngine
+
+    channel = Channel(conn)
+
+    class ShardEngine(TradingEngine):
+        def _order_entry(self) -> Optional[OrderEntry]:
+            # the router owns the order entry
+            return None
+
+        async def push_event(self, event: Event, droppable: bool = True) -> None:
+            if event.type in ORDER_REQUESTS:
+                await channel.send(event)
+            else:
+                await super().push_event(event, droppable)
+
+        async def new_order(self, handler: EventHandler, order) -> bool:
+            await self.push_event(Event(type=EventType.OPEN, data=order))
+            return True
+
+        async def cancel_order(self, handler: EventHandler, order) -> bool:
+            await self.push_event(Event(type=EventType.CANCEL, data=order))
+            return True
+
+    engine = ShardEngine(config.copy(update={"exchanges": [], "shards": 1, "portfolio_fp": None}))
+    for handler in handlers:
+        engine.register_handler(handler)
+    engine._dispatcher = asyncio.ensure_future(engine.dispatch())
+    LOG.info(f"shard {index} running {len(handlers)} handlers")
+
+    loop = asyncio.get_event_loop()
+    while True:
+        try:
+            events = await loop.run_in_executor(None, _recv, conn)
+        except (EOFError, OSError):
+            # the router is gone
+            events = [Event(type=EventType.EXIT, data=None)]
+
+        for event in events:
+            if event.type == EventType.EXIT:
+                await engine.shutdown()
+                await channel.join()
+                conn.close()
+                return
+            # bypass ShardEngine.push_event, routed events stay local
+            await TradingEngine.push_event(engine, event)
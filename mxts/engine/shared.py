@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set
+
+LOG = logging.getLogger('mxts')
+
+# hash fields parsed as integers, the rest but the instrument are floats
+INTEGER_FIELDS = ("time", "count")
+
+
+async def connect(address: str = "redis://localhost", **kwargs):
+    """open an aioredis connection pool, aioredis is only needed for this"""
+    import aioredis
+
+    return await aioredis.create_redis_pool(address, **kwargs)
+
+
+class RedisPublisher:
+    """Mirrors the latest quote and window stats of instruments into Redis
+
+    Ticks only mark their instrument as changed; every `interval` seconds
+    the stats of the changed instruments are written in one pipeline, so
+    Redis sees a round trip per flush whatever the tick rate. Each
+    instrument's stats are a hash at `{prefix}:{instrument}`, the
+    instruments the set `{prefix}:instruments`, and every flush publishes
+    the space separated instruments it updated on `{prefix}:updates`.
+    A failed flush is logged and retried with the next one.
+
+    Args:
+        redis: aioredis client, e.g. from `connect`
+        stats (Callable[[str], TickStats]): current stats of an instrument
+        prefix (str): prefix of the keys and channel
+        interval (float): seconds between flushes
+    """
+
+    def __init__(self, redis, stats: Callable[[str], Any], prefix: str = "mxts", interval: float = 0.1) -> None:
+        self.redis = redis
+        self.stats = stats
+        self.prefix = prefix
+        self.interval = interval
+        self.flushes = 0
+        self.writes = 0
+        self._dirty: Set[str] = set()
+        self._known: Set[str] = set()
+        self._task: Optional[asyncio.Future] = None
+
+    def mark(self, instrument: str) -> None:
+        """an instrument ticked, starts flushing on the first call"""
+        self._dirty.add(instrument)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """write the stats of the instruments changed since the last flush"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        instruments = sorted(dirty)
+        pipe = self.redis.pipeline()
+        new = [instrument for instrument in instruments if instrument not in self._known]
+        if new:
+            pipe.sadd(f"{self.prefix}:instruments", *new)
+        for instrument in instruments:
+            stats = self.stats(instrument)
+            pipe.hmset_dict(f"{self.prefix}:{instrument}", {name: getattr(stats, name) for name in stats.__slots__})
+        pipe.publish(f"{self.prefix}:updates", " ".join(instruments))
+        try:
+            await pipe.execute()
+        except Exception:
+            LOG.exception("redis flush of %d instruments failed", len(instruments))
+            self._dirty |= dirty
+            return
+        self._known.update(new)
+        self.flushes += 1
+        self.writes += len(instruments)
+
+    async def close(self) -> None:
+        """stop flushing, after writing what is pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+class RedisMarketData:
+    """Reads the stats a `RedisPublisher` mirrors, e.g. from another process
+
+    Args:
+        redis: aioredis client, e.g. from `connect`
+        prefix (str): prefix the publisher writes under
+    """
+
+    def __init__(self, redis, prefix: str = "mxts") -> None:
+        self.redis = redis
+        self.prefix = prefix
+
+    async def instruments(self) -> List[str]:
+        return sorted(await self.redis.smembers(f"{self.prefix}:instruments", encoding="utf-8"))
+
+    async def stats(self, instrument: str) -> Optional[Dict[str, Any]]:
+        """latest stats of an instrument, None if never published"""
+        return _parse(await self.redis.hgetall(f"{self.prefix}:{instrument}", encoding="utf-8"))
+
+    async def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """latest stats of every instrument, read in one pipeline"""
+        instruments = await self.instruments()
+        pipe = self.redis.pipeline()
+        futures = [pipe.hgetall(f"{self.prefix}:{instrument}", encoding="utf-8") for instrument in instruments]
+        await pipe.execute()
+        snapshot = {}
+        for instrument, future in zip(instruments, futures):
+            stats = _parse(await future)
+            if stats is not None:
+                snapshot[instrument] = stats
+        return snapshot
+
+
+def _parse(fields: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    if not fields:
+        return None
+    return {
+        name: value if name == "instrument" else int(value) if name in INTEGER_FIELDS else float(value)
+        for name, value in fields.items()
+    }
@@ -0,0 +1,143 @@
+from typing import Any, Dict, Iterable, List, Mapping
+
+import numpy as np
+import pandas as pd
+
+from mxts.utils import nanos
+
+# columns of a snapshot row
+FIELDS = ("bid", "ask", "mid")
+BID, ASK, MID = range(len(FIELDS))
+
+
+class SnapshotMatrix:
+    """Latest quote of every instrument as one instruments x `FIELDS` matrix
+
+    Rows are assigned in order of first appearance and updated in place, so
+    a tick is a dict lookup and one row write. Storage is preallocated and
+    only grows, by doubling, when an instrument beyond its capacity shows
+    up. `values` and `times` are read-only views, valid until the next
+    instrument is added; copy them to keep a snapshot. Rows of instruments
+    without a quote yet are NaN.
+
+    Args:
+        instruments (Iterable[str]): instruments known up front
+        capacity (int): rows to preallocate
+    """
+
+    def __init__(self, instruments: Iterable[str] = (), capacity: int = 64) -> None:
+        self.index: Dict[str, int] = {}
+        self.instruments: List[str] = []
+        capacity = max(capacity, 1)
+        self._values = np.full((capacity, len(FIELDS)), np.nan)
+        self._times = np.zeros(capacity, dtype=np.int64)
+        for instrument in instruments:
+            self.row(instrument)
+
+    def __len__(self) -> int:
+        return len(self.instruments)
+
+    def row(self, instrument: str) -> int:
+        """row of an instrument, adding it if new"""
+        row = self.index.get(instrument)
+        if row is None:
+            row = self.index[instrument] = len(self.instruments)
+            self.instruments.append(instrument)
+            if row == len(self._times):
+                values = np.full((2 * row, len(FIELDS)), np.nan)
+                values[:row] = self._values
+                times = np.zeros(2 * row, dtype=np.int64)
+                times[:row] = self._times
+                self._values, self._times = values, times
+        return row
+
+    def update(self, instrument: str, time: int, bid: float, ask: float) -> None:
+        row = self.index.get(instrument)
+        if row is None:
+            row = self.row(instrument)
+        self._values[row] = (bid, ask, (bid + ask) / 2)
+        self._times[row] = time
+
+    @property
+    def values(self) -> np.ndarray:
+        """instruments x `FIELDS` view of the latest quotes"""
+        values = self._values[: len(self.instruments)]
+        values.flags.writeable = False
+        return values
+
+    @property
+    def times(self) -> np.ndarray:
+        """epoch nanoseconds of each instrument's latest quote"""
+        times = self._times[: len(self.instruments)]
+        times.flags.writeable = False
+        return times
+
+    def frame(self) -> pd.DataFrame:
+        """copy of the snapshot as a DataFrame indexed by instrument"""
+        frame = pd.DataFrame(self.values.copy(), index=list(self.instruments), columns=list(FIELDS))
+        frame["time"] = pd.to_datetime(self.times.copy())
+        return frame
+
+
+class Panel:
+    """Quotes of several instruments sampled on a common time grid
+
+    Args:
+        times (np.ndarray): int64 epoch nanoseconds of the samples
+        instruments (List[str]): instruments, in column order
+        values (np.ndarray): times x instruments x `FIELDS`, NaN before an
+            instrument's first quote
+    """
+
+    __slots__ = ("times", "instruments", "values")
+
+    def __init__(self, times: np.ndarray, instruments: List[str], values: np.ndarray) -> None:
+        self.times = times
+        self.instruments = instruments
+        self.values = values
+
+    def field(self, name: str) -> np.ndarray:
+        """times x instruments view of one of `FIELDS`"""
+        return self.values[:, :, FIELDS.index(name)]
+
+    def frame(self, name: str = "mid") -> pd.DataFrame:
+        return pd.DataFrame(self.field(name), index=pd.to_datetime(self.times), columns=list(self.instruments))
+
+    def __repr__(self) -> str:
+        return f"<Panel(times={len(self.times)}, instruments={len(self.instruments)})>"
+
+
+def asof_panel(ticks: Mapping[str, Any], start, end, interval) -> Panel:
+    """as-of join of each instrument's ticks onto a fixed grid of sample times
+
+    Every sample takes each instrument's last quote at or before it, found by
+    binary search, so building the panel costs O(samples * log(ticks)) per
+    instrument and no per tick work.
+
+    Args:
+        ticks (Mapping): instrument to its `Ticks`, e.g. from `TickStore.read`,
+            or (timestamp, bid, ask) arrays, e.g. from `TickBuffer.view`,
+            timestamps int64 epoch nanoseconds in ascending order
+        start: first sample, epoch nanoseconds, seconds or datetime like
+        end: as `start`, exclusive
+        interval: nanoseconds between samples, or a timedelta like, e.g. "1s"
+    """
+    step = interval if isinstance(interval, (int, np.integer)) else pd.Timedelta(interval).value
+    times = np.arange(nanos(start), nanos(end), step, dtype=np.int64)
+    instruments = list(ticks)
+    values = np.full((len(times), len(instruments), len(FIELDS)), np.nan)
+    for column, instrument in enumerate(instruments):
+        series = ticks[instrument]
+        if isinstance(series, tuple):
+            timestamp, bid, ask = series
+        else:
+            timestamp, bid, ask = series.timestamp, series.bid, series.ask
+        index = np.searchsorted(timestamp, times, side="right") - 1
+        quoted = index >= 0
+        rows = index[quoted]
+        out = values[quoted, column]
+        out[:, BID] = bid[rows]
+        out[:, ASK] = ask[rows]
+        out[:, MID] = (out[:, BID] + out[:, ASK]) / 2
+        values[quoted, column] = out
+    return Panel(times, instruments, values)
@@ -0,0 +1,298 @@
+import heapq
+import math
+import os
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from mxts.config import EventType
+from mxts.core.data import Event
+from mxts.engine.feed import Tick
+from mxts.utils import nanos
+
+# one raw little endian file per column in every partition, `timestamp` is epoch nanoseconds
+COLUMNS = (
+    ("timestamp", np.dtype("<i8")),
+    ("bid", np.dtype("<f8")),
+    ("ask", np.dtype("<f8")),
+    ("bid_size", np.dtype("<f8")),
+    ("ask_size", np.dtype("<f8")),
+)
+
+DAY = 86_400_000_000_000
+
+
+def _day(timestamp: int) -> date:
+    return datetime.fromtimestamp(timestamp // DAY * 86_400, tz=timezone.utc).date()
+
+
+class Ticks:
+    """Columns of a run of ticks of one instrument, oldest first
+
+    Read straight off a partition the columns are read-only `np.memmap`
+    slices, pages are only read in from disk as they are touched.
+
+    Args:
+        timestamp (np.ndarray): int64 epoch nanoseconds
+        bid (np.ndarray): float64 best bids
+        ask (np.ndarray): float64 best asks
+        bid_size (np.ndarray): float64 best bid sizes, NaN if the feed has none
+        ask_size (np.ndarray): float64 best ask sizes, NaN if the feed has none
+    """
+
+    __slots__ = tuple(name for name, _ in COLUMNS)
+
+    def __init__(
+        self, timestamp: np.ndarray, bid: np.ndarray, ask: np.ndarray, bid_size: np.ndarray, ask_size: np.ndarray
+    ) -> None:
+        self.timestamp = timestamp
+        self.bid = bid
+        self.ask = ask
+        self.bid_size = bid_size
+        self.ask_size = ask_size
+
+    @classmethod
+    def empty(cls) -> "Ticks":
+        return cls(*(np.empty(0, dtype=dtype) for _, dtype in COLUMNS))
+
+    @classmethod
+    def concat(cls, parts: List["Ticks"]) -> "Ticks":
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return cls.empty()
+        return cls(*(np.concatenate([getattr(p, name) for p in parts]) for name, _ in COLUMNS))
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def between(self, start: Optional[int], end: Optional[int]) -> "Ticks":
+        """ticks with `start <= timestamp < end`, found by binary search"""
+        lo = 0 if start is None else int(np.searchsorted(self.timestamp, start, side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.timestamp, end, side="left"))
+        return Ticks(*(getattr(self, name)[lo:hi] for name, _ in COLUMNS))
+
+    def frame(self) -> pd.DataFrame:
+        """copy of the ticks as a DataFrame indexed by time"""
+        return pd.DataFrame(
+            {name: np.array(getattr(self, name)) for name, _ in COLUMNS[1:]},
+            index=pd.to_datetime(np.array(self.timestamp)),
+        )
+
+    def __repr__(self) -> str:
+        return f"<Ticks(size={len(self)})>"
+
+
+class _Partition:
+    """Append side of one instrument's day, ticks are buffered and written a column at a time"""
+
+    def __init__(self, path: str, day: date, capacity: int) -> None:
+        self.path = path
+        self.day = day
+        os.makedirs(path, exist_ok=True)
+        # `timestamp` is written last, its length is the number of complete
+        # ticks, anything past that in the other columns is from a crash
+        count = _length(path)
+        self._files = {}
+        for name, dtype in COLUMNS:
+            f = open(os.path.join(path, name), "ab")
+            f.truncate(count * dtype.itemsize)
+            self._files[name] = f
+        self.last = _last(path, count)
+        self._buffers = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS}
+        self._size = 0
+
+    @property
+    def full(self) -> bool:
+        return self._size == len(self._buffers["timestamp"])
+
+    def append(self, timestamp: int, bid: float, ask: float, bid_size: float, ask_size: float) -> None:
+        i = self._size
+        buffers = self._buffers
+        buffers["timestamp"][i] = timestamp
+        buffers["bid"][i] = bid
+        buffers["ask"][i] = ask
+        buffers["bid_size"][i] = bid_size
+        buffers["ask_size"][i] = ask_size
+        self._size = i + 1
+        self.last = timestamp
+
+    def flush(self) -> None:
+        if not self._size:
+            return
+        for name, _ in reversed(COLUMNS):
+            f = self._files[name]
+            f.write(self._buffers[name][: self._size].tobytes())
+            f.flush()
+        self._size = 0
+
+    def close(self) -> None:
+        self.flush()
+        for f in self._files.values():
+            f.close()
+
+
+def _size(value) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _length(path: str) -> int:
+    try:
+        return os.path.getsize(os.path.join(path, "timestamp")) // COLUMNS[0][1].itemsize
+    except FileNotFoundError:
+        return 0
+
+
+def _last(path: str, count: int) -> int:
+    """last timestamp written to a partition"""
+    if not count:
+        return -(1 << 63)
+    with open(os.path.join(path, "timestamp"), "rb") as f:
+        f.seek((count - 1) * 8)
+        return int(np.frombuffer(f.read(8), dtype="<i8")[0])
+
+
+class TickStore:
+    """Columnar on-disk tick history, partitioned by instrument and UTC day
+
+    Each partition is a directory `root/exchange/symbol/YYYY-MM-DD` holding
+    one raw binary file per column of `COLUMNS`. Appends are buffered per
+    instrument and written `flush_size` ticks at a time; queries `np.memmap`
+    the partitions they touch and binary search the timestamps, so nothing
+    is parsed and only the pages read are resident.
+
+    Timestamps must not go backwards within an instrument for the binary
+    search to hold, a tick older than the last one appended is stored at the
+    last timestamp and counted in `reordered`.
+
+    Args:
+        root (str): directory the partitions live under
+        flush_size (int): ticks buffered per instrument before being written
+    """
+
+    def __init__(self, root: str, flush_size: int = 4096) -> None:
+        self.root = root
+        self.flush_size = flush_size
+        self.count = 0
+        self.reordered = 0
+        self._partitions: Dict[Tuple[str, str], _Partition] = {}
+
+    def _path(self, exchange: str, symbol: str, day: Optional[date] = None) -> str:
+        path = os.path.join(self.root, str(exchange), str(symbol).replace(os.sep, "_"))
+        return path if day is None else os.path.join(path, day.isoformat())
+
+    def append(
+        self,
+        exchange: str,
+        symbol: str,
+        timestamp: int,
+        bid: float,
+        ask: float,
+        bid_size: float = math.nan,
+        ask_size: float = math.nan,
+    ) -> None:
+        """store a tick, `timestamp` in epoch nanoseconds"""
+        key = (exchange, symbol)
+        partition = self._partitions.get(key)
+        if partition is None or timestamp // DAY != partition.last // DAY:
+            if partition is not None and timestamp < partition.last:
+                # late tick of the previous day, stays in that day
+                timestamp = partition.last
+                self.reordered += 1
+            else:
+                if partition is not None:
+                    partition.close()
+                partition = self._partitions[key] = _Partition(
+                    self._path(exchange, symbol, _day(timestamp)), _day(timestamp), self.flush_size
+                )
+        if timestamp < partition.last:
+            timestamp = partition.last
+            self.reordered += 1
+        partition.append(timestamp, bid, ask, bid_size, ask_size)
+        self.count += 1
+        if partition.full:
+            partition.flush()
+
+    def append_ticker(self, obj, receipt_ts: float) -> None:
+        """store a cryptofeed `Ticker`, at its exchange time if it has one"""
+        timestamp = getattr(obj, "timestamp", None)
+        self.append(
+            obj.exchange,
+            obj.symbol,
+            int((receipt_ts if timestamp is None else timestamp) * 1_000_000_000),
+            float(obj.bid),
+            float(obj.ask),
+            _size(getattr(obj, "bid_size", None)),
+            _size(getattr(obj, "ask_size", None)),
+        )
+
+    def flush(self) -> None:
+        """write out every buffered tick, queries only see written ticks"""
+        for partition in self._partitions.values():
+            partition.flush()
+
+    def close(self) -> None:
+        for partition in self._partitions.values():
+            partition.close()
+        self._partitions.clear()
+
+    def instruments(self) -> List[Tuple[str, str]]:
+        """(exchange, symbol) of every instrument with history"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            (exchange, symbol)
+            for exchange in os.listdir(self.root)
+            for symbol in os.listdir(os.path.join(self.root, exchange))
+        )
+
+    def days(self, exchange: str, symbol: str) -> List[date]:
+        path = self._path(exchange, symbol)
+        if not os.path.isdir(path):
+            return []
+        return sorted(date.fromisoformat(day) for day in os.listdir(path))
+
+    def _map(self, path: str) -> Ticks:
+        count = _length(path)
+        if not count:
+            return Ticks.empty()
+        return Ticks(
+            *(np.memmap(os.path.join(path, name), dtype=dtype, mode="r", shape=(count,)) for name, dtype in COLUMNS)
+        )
+
+    def query(self, exchange: str, symbol: str, start=None, end=None) -> Iterator[Ticks]:
+        """zero copy `Ticks` of each day with ticks in `[start, end)`
+
+        Args:
+            start: epoch nanoseconds, seconds or datetime like, None for the first tick
+            end: as `start`, exclusive, None for the last tick
+        """
+        start = None if start is None else nanos(start)
+        end = None if end is None else nanos(end)
+        first = None if start is None else _day(start)
+        last = None if end is None else _day(end - 1)
+        for day in self.days(exchange, symbol):
+            if (first is not None and day < first) or (last is not None and day > last):
+                continue
+            ticks = self._map(self._path(exchange, symbol, day)).between(start, end)
+            if len(ticks):
+                yield ticks
+
+    def read(self, exchange: str, symbol: str, start=None, end=None) -> Ticks:
+        """ticks in `[start, end)`, zero copy when they fall on a single day"""
+        return Ticks.concat(list(self.query(exchange, symbol, start, end)))
+
+    def events(self, instruments: Optional[Iterable[Tuple[str, str]]] = None, start=None, end=None) -> Iterator[Event]:
+        """`Ticker` events of the instruments in time order, to hand to `TradingEngine.run`"""
+
+        def ticks(exchange: str, symbol: str) -> Iterator[Tuple[int, str, str, float, float]]:
+            for part in self.query(exchange, symbol, start, end):
+                for timestamp, bid, ask in zip(part.timestamp.tolist(), part.bid.tolist(), part.ask.tolist()):
+                    yield timestamp, exchange, symbol, bid, ask
+
+        streams = [ticks(*key) for key in (self.instruments() if instruments is None else instruments)]
+        for timestamp, exchange, symbol, bid, ask in heapq.merge(*streams):
+            seconds = timestamp / 1e9
+            yield Event(type=EventType.TICKER, data=Tick(exchange, symbol, bid, ask, seconds, seconds))
@@ -0,0 +1,259 @@
+import itertools
+import os
+import shutil
+import tempfile
+import zlib
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# (name, dtype) of the columns of a segment, stored back to back on disk
+COLUMNS = (("timestamp", np.dtype("<i8")), ("bid", np.dtype("<f8")), ("ask", np.dtype("<f8")))
+TICK_BYTES = sum(dtype.itemsize for _, dtype in COLUMNS)
+
+
+class Segment:
+    """Fixed size run of ticks, held in memory or spilled to a compressed file"""
+
+    __slots__ = ("id", "size", "length", "timestamp", "bid", "ask", "path")
+
+    _ids = itertools.count()
+
+    def __init__(self, size: int) -> None:
+        self.id = next(Segment._ids)
+        self.size = size
+        self.length = 0
+        self.timestamp: Optional[np.ndarray] = np.empty(size, dtype=np.int64)
+        self.bid: Optional[np.ndarray] = np.empty(size)
+        self.ask: Optional[np.ndarray] = np.empty(size)
+        # compressed copy on disk, None until first spilled
+        self.path: Optional[str] = None
+
+    @property
+    def resident(self) -> bool:
+        return self.timestamp is not None
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * TICK_BYTES
+
+    @property
+    def full(self) -> bool:
+        return self.length == self.size
+
+    def spill(self, directory: str, level: int) -> int:
+        """write the ticks to disk, unless already there, and drop them from memory,
+        returns the compressed size"""
+        if self.path is None:
+            path = os.path.join(directory, f"{self.id}.seg")
+            data = b"".join(getattr(self, name)[: self.length].tobytes() for name, _ in COLUMNS)
+            with open(path, "wb") as f:
+                f.write(zlib.compress(data, level))
+            self.path = path
+        self.timestamp = self.bid = self.ask = None
+        return os.path.getsize(self.path)
+
+    def read(self) -> Tuple[np.ndarray, ...]:
+        """the spilled columns, without loading them back"""
+        with open(self.path, "rb") as f:  # type: ignore[arg-type]
+            data = zlib.decompress(f.read())
+        columns = []
+        offset = 0
+        for _, dtype in COLUMNS:
+            columns.append(np.frombuffer(data, dtype=dtype, count=self.length, offset=offset))
+            offset += self.length * dtype.itemsize
+        return tuple(columns)
+
+    def load(self) -> None:
+        for (name, dtype), values in zip(COLUMNS, self.read()):
+            column = np.empty(self.size, dtype=dtype)
+            column[: self.length] = values
+            setattr(self, name, column)
+
+    def discard(self) -> None:
+        self.timestamp = self.bid = self.ask = None
+        if self.path is not None:
+            os.remove(self.path)
+            self.path = None
+
+
+class MemoryBudget:
+    """Caps the bytes of tick history held in memory across every buffer sharing it
+
+    Full segments are kept in least recently used order; once the resident
+    bytes go over `limit` the least recently used ones are compressed to
+    files under `directory` and dropped from memory. Segments still being
+    filled are never spilled. Reads of spilled segments fall through to
+    disk: `read` decompresses them without caching, `touch` loads them
+    back, which may in turn spill others.
+
+    Args:
+        limit (int): max resident bytes
+        directory (Optional[str]): where spilled segments go, a temporary directory if None
+        level (int): zlib compression level
+    """
+
+    def __init__(self, limit: int, directory: Optional[str] = None, level: int = 1) -> None:
+        self.limit = limit
+        self.level = level
+        self._owned = directory is None
+        self.directory = tempfile.mkdtemp(prefix="mxts-") if directory is None else directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.resident = 0
+        self.spilled = 0
+        self.evictions = 0
+        self.loads = 0
+        self._lru: "OrderedDict[int, Segment]" = OrderedDict()
+        self._spilled_bytes: Dict[int, int] = {}
+
+    def allocate(self, size: int) -> Segment:
+        segment = Segment(size)
+        self.resident += segment.nbytes
+        self._enforce()
+        return segment
+
+    def seal(self, segment: Segment) -> None:
+        """a segment filled up, from now on it may be spilled"""
+        self._lru[segment.id] = segment
+        self._enforce()
+
+    def touch(self, segment: Segment) -> Segment:
+        """mark a segment as used, loading it back if it was spilled"""
+        if not segment.resident:
+            segment.load()
+            self.resident += segment.nbytes
+            self.loads += 1
+            self._lru[segment.id] = segment
+            self._enforce(keep=segment)
+        elif segment.id in self._lru:
+            self._lru.move_to_end(segment.id)
+        return segment
+
+    def read(self, segment: Segment) -> Tuple[np.ndarray, ...]:
+        """the filled part of a segment's columns, from disk if spilled"""
+        if segment.resident:
+            return tuple(getattr(segment, name)[: segment.length] for name, _ in COLUMNS)
+        self.loads += 1
+        return segment.read()
+
+    def release(self, segment: Segment) -> None:
+        """a segment left the history, free it in memory and on disk"""
+        if segment.resident:
+            self.resident -= segment.nbytes
+        self._lru.pop(segment.id, None)
+        self.spilled -= self._spilled_bytes.pop(segment.id, 0)
+        segment.discard()
+
+    def _enforce(self, keep: Optional[Segment] = None) -> None:
+        lru = self._lru
+        while self.resident > self.limit and lru:
+            id, segment = next(iter(lru.items()))
+            if segment is keep:
+                if len(lru) == 1:
+                    return
+                lru.move_to_end(id)
+                continue
+            del lru[id]
+            size = segment.spill(self.directory, self.level)
+            if id not in self._spilled_bytes:
+                self._spilled_bytes[id] = size
+                self.spilled += size
+            self.resident -= segment.nbytes
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """resident and spilled (compressed) bytes, evictions and reads from disk"""
+        return {
+            "limit_bytes": self.limit,
+            "resident_bytes": self.resident,
+            "spilled_bytes": self.spilled,
+            "evictions": self.evictions,
+            "loads": self.loads,
+        }
+
+    def close(self) -> None:
+        """remove the spill directory, if the budget created it"""
+        if self._owned:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class SegmentedBuffer:
+    """Window of the last `capacity` ticks of one instrument, in segments under a `MemoryBudget`
+
+    A drop-in for `TickBuffer` when windows are too long to keep in memory:
+    appends are O(1) and the oldest segments of the window may live on disk.
+    `view` returns copies, assembled from memory and disk without loading
+    spilled segments back; only the oldest segment, which ticks leave the
+    window from, is.
+
+    Args:
+        capacity (int): number of ticks kept
+        budget (MemoryBudget): budget the segments are accounted to
+        segment_size (Optional[int]): ticks per segment, at most `capacity`,
+            an eighth of it up to 4096 if None
+    """
+
+    __slots__ = ("capacity", "budget", "segment_size", "count", "_segments", "_head")
+
+    def __init__(self, capacity: int, budget: MemoryBudget, segment_size: Optional[int] = None) -> None:
+        self.capacity = capacity
+        self.budget = budget
+        if segment_size is None:
+            segment_size = min(max(capacity // 8, 1), 4096)
+        self.segment_size = min(segment_size, capacity)
+        # ticks ever appended
+        self.count = 0
+        self._segments: Deque[Segment] = deque()
+        # position of the oldest tick of the window in the first segment
+        self._head = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp: int, bid: float, ask: float) -> Optional[Tuple[int, float, float]]:
+        """add a tick, returns the tick it pushed out of the window, if any"""
+        segments = self._segments
+        if not segments or segments[-1].full:
+            segments.append(self.budget.allocate(self.segment_size))
+        tail = segments[-1]
+        i = tail.length
+        tail.timestamp[i] = timestamp  # type: ignore[index]
+        tail.bid[i] = bid  # type: ignore[index]
+        tail.ask[i] = ask  # type: ignore[index]
+        tail.length = i + 1
+        self.count += 1
+        if tail.full:
+            self.budget.seal(tail)
+
+        if self.count <= self.capacity:
+            return None
+        head = self.budget.touch(segments[0])
+        j = self._head
+        evicted = int(head.timestamp[j]), float(head.bid[j]), float(head.ask[j])  # type: ignore[index]
+        self._head = j + 1
+        if self._head == head.size:
+            segments.popleft()
+            self.budget.release(head)
+            self._head = 0
+        return evicted
+
+    def view(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(timestamp, bid, ask) oldest first, copies"""
+        parts = []
+        for k, segment in enumerate(self._segments):
+            columns = self.budget.read(segment)
+            parts.append(tuple(column[self._head :] for column in columns) if k == 0 else columns)
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+        return tuple(np.concatenate(column) for column in zip(*parts))  # type: ignore[return-value]
+
+    def latest(self) -> Tuple[int, float, float]:
+        timestamp, bid, ask = self.budget.read(self._segments[-1])
+        return int(timestamp[-1]), float(bid[-1]), float(ask[-1])
+
+    def frame(self, name: str) -> pd.DataFrame:
+        """the ticks as a DataFrame with `{name}_bid` and `{name}_ask` columns indexed by time"""
+        timestamp, bid, ask = self.view()
+        return pd.DataFrame({f"{name}_bid": bid, f"{name}_ask": ask}, index=pd.to_datetime(timestamp))
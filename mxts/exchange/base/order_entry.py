@@ -19,7 +19,7 @@ class OrderEntry:
     #    """get cash balance"""
     #    return []
 
-    async def new_order(self, order: Order) -> bool:
+    async def new_order(self, order: "Order") -> bool:
         """Submit a new order to the exchange. 
            Should set the given order's `id` field to exchange-assigned id
         Args:
@@ -31,7 +31,7 @@ class OrderEntry:
         """
         raise NotImplementedError()
 
-    async def cancel_order(self, order: Order) -> bool:
+    async def cancel_order(self, order: "Order") -> bool:
         """cancel a previously submitted order to the exchange.
         Args:
             order (Order)
@@ -0,0 +1,85 @@
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Tuple
+
+import aiohttp
+
+from mxts.engine.latency import Histogram
+
+# name of the client method whose HTTP requests are in flight, see `metered`
+_METHOD: ContextVar[str] = ContextVar("method", default="")
+
+
+class ClientStats:
+    """Request counters of an exchange client
+
+    Plain ints and dicts updated on the event loop, read by the metrics
+    exporter at scrape time, so the request path never takes a lock.
+
+    Attributes:
+        statuses (Dict[Tuple[str, int], int]): responses per (endpoint, HTTP status),
+            status 0 counts requests that got no response
+        limiter_wait (Histogram): nanoseconds requests waited on the rate limiter
+        connects (Dict[str, int]): stream connections opened per endpoint
+    """
+
+    __slots__ = ("statuses", "limiter_wait", "connects")
+
+    def __init__(self) -> None:
+        self.statuses: Dict[Tuple[str, int], int] = {}
+        self.limiter_wait = Histogram()
+        self.connects: Dict[str, int] = {}
+
+    def status(self, endpoint: str, status: int) -> None:
+        key = (endpoint, status)
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def connected(self, endpoint: str) -> None:
+        self.connects[endpoint] = self.connects.get(endpoint, 0) + 1
+
+    @property
+    def reconnects(self) -> Dict[str, int]:
+        """stream connections opened after the first, per endpoint"""
+        return {endpoint: n - 1 for endpoint, n in list(self.connects.items())}
+
+
+# stats of every client, by exchange, shared by all clients of an exchange
+CLIENTS: Dict[str, ClientStats] = {}
+
+
+def client_stats(exchange: str) -> ClientStats:
+    """request counters of an exchange's clients"""
+    stats = CLIENTS.get(exchange)
+    if stats is None:
+        stats = CLIENTS[exchange] = ClientStats()
+    return stats
+
+
+def metered(method: Callable[..., Any]) -> Callable[..., Any]:
+    """label the HTTP requests a client method makes with the method's name"""
+    name = method.__name__
+
+    @wraps(method)
+    async def wrap(*args: Any, **kwargs: Any) -> Any:
+        token = _METHOD.set(name)
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            _METHOD.reset(token)
+
+    return wrap
+
+
+def trace_config(stats: ClientStats) -> aiohttp.TraceConfig:
+    """aiohttp tracing hooks counting response statuses per `metered` method"""
+
+    async def on_request_end(session: Any, context: Any, params: Any) -> None:
+        stats.status(_METHOD.get(), params.response.status)
+
+    async def on_request_exception(session: Any, context: Any, params: Any) -> None:
+        stats.status(_METHOD.get(), 0)
+
+    config = aiohttp.TraceConfig()
+    config.on_request_end.append(on_request_end)
+    config.on_request_exception.append(on_request_exception)
+    return config
@@ -10,6 +10,8 @@ from pydantic import PositiveInt
 from pandas import Timestamp
 from yarl import URL
 
+from mxts.exchange.base.stats import client_stats, metered, trace_config
+
 from .data import *
    
 
@@ -19,7 +21,10 @@ class CoinbaseClient:
         self._user_secret = kwargs.get("secret")
         self._user_key = kwargs.get("key")
         self._user_passphrase = kwargs.get("passphrase")
-        self._session = aiohttp.ClientSession(raise_for_status=True)
+        self._stats = client_stats("coinbase")
+        self._session = aiohttp.ClientSession(
+            raise_for_status=True, trace_configs=[trace_config(self._stats)]
+        )
 
     async def close(self) -> None:
         return await self._session.close()
@@ -66,18 +71,21 @@ class CoinbaseClient:
     def _make_url(self, path: str, params = {}) -> URL:
         return self._base_url / path % params
 
+    @metered
     async def get_accounts(self) -> List[Account]:
         url = self._make_url(f"accounts") 
         async with self._session.get(url, headers=self._hash_msg("GET", url.path)) as resp:
             ret = await resp.json()
             return [Account(**r) for r in ret]
 
+    @metered
     async def get_account(self, account_id: str) -> Account:
         url = self._make_url(f"accounts/{account_id}")
         async with self._session.get(url, headers=self._hash_msg("GET", url.path)) as resp:
             ret = await resp.json()
             return Account(**ret)
 
+    @metered
     async def get_account_ledger(
         self, 
         account_id: str,
@@ -123,21 +131,25 @@ class CoinbaseClient:
     #    async with self._session.post(self._make_url("conversions"), json=kwargs) as resp:
     #         ret = await resp.json()
 
+    @metered
     async def get_fees(self) -> Fees:
         async with self._session.get(self._make_url(f"fees")) as resp:
             ret = await resp.json()
             return Fees(**ret)
 
+    @metered
     async def get_ticker(self, product_id: str) -> Ticker:
         async with self._session.get(self._make_url(f"products/{product_id}/ticker")) as resp:
             ret = await resp.json()
             return Ticker(**ret)
     
+    @metered
     async def get_stats(self, product_id: str) -> Stats:
         async with self._session.get(self._make_url(f"products/{product_id}/stats")) as resp:
             ret = await resp.json()
             return Stats(**ret)
     
+    @metered
     async def get_candles(
         self, 
         product_id: str, 
@@ -164,6 +176,7 @@ class CoinbaseClient:
             ret = await resp.json()
             return [Candle(**r) for r in ret]
 
+    @metered
     async def get_products(self) -> List[Product]:
         async with self._session.get(self._make_url(f"products")) as resp:
             ret = await resp.json()
@@ -226,6 +239,7 @@ class CoinbaseClient:
     #         ret = await resp.json()
     #         return [Order(**r) for r in ret]
 
+    @metered
     async def create_order(
         self,
         profile_id: str = None,
@@ -294,6 +308,7 @@ class CoinbaseClient:
             ret = await resp.json()
             return ret
     
+    @metered
     async def cancel_all_orders(self, profile_id: str, product_id: str) -> None:
         params = {
             "profile_id": profile_id,
@@ -302,6 +317,7 @@ class CoinbaseClient:
         async with self._session.delete(self._make_url(f"orders"), params=params) as resp:
             resp
     
+    @metered
     async def cancel_order(self, profile_id: str, order_id: str) -> None:
         params = {
             "profile_id": profile_id
@@ -309,15 +325,18 @@ class CoinbaseClient:
         async with self._session.delete(self._make_url(f"orders/{order_id}"), params=params) as resp:
             resp
     
+    @metered
     async def get_order(self, order_id: str) -> None:
         async with self._session.get(self._make_url(f"orders/{order_id}")) as resp:
             resp
    
+    @metered
     async def get_currency(self, currency_id: str) -> Currency:
        async with self._session.get(self._make_url(f"currencies/{currency_id}")) as resp:
            ret = await resp.json()
            return Currency(**ret)
     
+    @metered
     async def get_currencies(self) -> List[Currency]:
        async with self._session.get(self._make_url(f"currencies")) as resp:
            ret = await resp.json()
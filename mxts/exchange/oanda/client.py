@@ -8,6 +8,7 @@ import aiohttp
 from yarl import URL
 
 from mxts.config import OandaConfig
+from mxts.exchange.base.stats import client_stats
 
 from .definitions.types import AcceptDatetimeFormat
 from .definitions.types import AccountID
@@ -128,6 +129,9 @@ class OandaClient(AccountInterface, InstrumentInterface, OrderInterface, Positio
 
         self.debug = config.verbose
 
+        # response statuses, rate limiter waits and stream connections, see `mxts.engine.metrics`
+        self._stats = client_stats('oanda')
+
     async def account(self):
         """Get updated account
 
@@ -185,10 +189,12 @@ class OandaClient(AccountInterface, InstrumentInterface, OrderInterface, Positio
             self._next_request_time += self._min_time_between_requests
         except AttributeError:
             self._next_request_time = time()
+            self._stats.limiter_wait.record(0)
             return
 
-        if self._next_request_time - time() > 0:
-            wait_time = self._next_request_time - time()
+        wait_time = self._next_request_time - time()
+        self._stats.limiter_wait.record(int(wait_time * 1e9))
+        if wait_time > 0:
             if self.debug:
                 logger.debug('Request waiting for %s seconds', wait_time)
             await sleep(wait_time)
@@ -57,6 +57,7 @@ async def _rest_response(self, response, endpoint, enable_rest, method_name):
     try:
         async with timeout(self.rest_timeout):
             async with response as resp:
+                self._stats.status(method_name, resp.status)
                 schema, status, boolean = _lookup_schema(endpoint, resp.status)
                 # Update client headers.
                 self.default_parameters.update(resp.raw_headers)
@@ -111,6 +112,8 @@ def _construct_json_body_and_schema(line, schema, endpoint):
 
 async def _stream_parser(self, response, endpoint, method_name):
     async with response as resp:
+        self._stats.status(method_name, resp.status)
+        self._stats.connected(method_name)
         schema, status, boolean = _lookup_schema(endpoint, resp.status)
         while not resp.content.at_eof():
             try:
@@ -0,0 +1 @@
+from .exchange import SimulationExchange  # noqa: F401
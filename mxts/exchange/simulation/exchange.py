@@ -0,0 +1,193 @@
+import math
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+from mxts.config import EventType, OrderFlag, OrderType, Side
+from mxts.core import Event, EventHandler, Order, OrderBook, Trade
+from mxts.core.handler import callback
+from mxts.exchange.base.order_entry import OrderEntry
+from mxts.utils import id_gen
+
+# quote layout, sizes are inf when the feed does not publish them
+BID, BID_SIZE, ASK, ASK_SIZE = range(4)
+
+
+def _size(value) -> float:
+    return math.inf if value is None else float(value)
+
+
+class SimulationExchange(OrderEntry, EventHandler):
+    """Local matching engine for paper trading
+
+    Orders never leave the process: they are matched against the market data
+    the engine feeds this handler, live or replayed. Marketable orders take
+    the current quote (up to its size, if the feed publishes sizes) and the
+    rest of a `LIMIT` order rests in a price-time priority `OrderBook`, to be
+    filled at its limit price when the quote or a trade print reaches it.
+    `STOP` orders submit their `stop_target` once triggered.
+
+    Order flags:
+        FILL_OR_KILL: fill completely on arrival or cancel
+        IMMEDIATE_OR_CANCEL: fill what is available on arrival, cancel the rest
+        ALL_OR_NONE: only ever fill completely, may rest until it can
+
+    Emits `Received`, `Rejected` and `Canceled` events carrying the order,
+    and a `Fill` plus a `Bought` or `Sold` event carrying a `Trade` per fill.
+
+    Args:
+        push_event (Callable): engine coroutine the events are pushed through
+        triggered (Optional[Callable[[Order, Order], None]]): called with a
+            triggered stop and its `stop_target`, once the target has its id
+            and before it is submitted
+    """
+
+    def __init__(
+        self,
+        push_event: Callable[[Event], Awaitable[None]],
+        triggered: Optional[Callable[[Order, Order], None]] = None,
+    ) -> None:
+        super().__init__()
+        self._push_event = push_event
+        self._triggered = triggered
+        self._books: Dict[Hashable, OrderBook] = {}
+        self._quotes: Dict[Hashable, List[float]] = {}
+        self._order_id = id_gen()
+        self._trade_id = id_gen()
+
+    def book(self, symbol: Hashable) -> OrderBook:
+        book = self._books.get(symbol)
+        if book is None:
+            book = self._books[symbol] = OrderBook()
+        return book
+
+    ##################
+    # Market data    #
+    ##################
+    @callback(EventType.TICKER)
+    async def on_ticker(self, event: Event) -> None:
+        data = event.data
+        bid, ask = float(data.bid), float(data.ask)
+        quote = [
+            bid,
+            _size(getattr(data, "bid_size", None)),
+            ask,
+            _size(getattr(data, "ask_size", None)),
+        ]
+        self._quotes[data.symbol] = quote
+
+        book = self._books.get(data.symbol)
+        if book:
+            await self._trigger(book, bid, ask)
+            for order, volume in book.match(Side.BUY, ask, quote[ASK_SIZE]):
+                quote[ASK_SIZE] -= volume
+                await self._fill(order, volume, order.price)
+            for order, volume in book.match(Side.SELL, bid, quote[BID_SIZE]):
+                quote[BID_SIZE] -= volume
+                await self._fill(order, volume, order.price)
+
+    @callback(EventType.TRADE)
+    async def on_trade(self, event: Event) -> None:
+        if not self._books:
+            # nothing was ever ordered, nothing to match
+            return
+        data = event.data
+        book = self._books.get(data.symbol)
+        if book:
+            price, amount = float(data.price), float(data.amount)
+            await self._trigger(book, price, price)
+            for side in (Side.BUY, Side.SELL):
+                for order, volume in book.match(side, price, amount):
+                    await self._fill(order, volume, order.price)
+
+    async def _trigger(self, book: OrderBook, bid: float, ask: float) -> None:
+        for stop in book.triggered(bid, ask):
+            target = stop.stop_target
+            target.id = self._order_id()
+            if self._triggered is not None:
+                self._triggered(stop, target)
+            await self._submit(target)
+
+    ##################
+    # Order entry    #
+    ##################
+    async def new_order(self, order: Order) -> bool:
+        """Submit a new order, sets `order.id`
+
+        Returns:
+            True if the order was received, False if it was rejected
+        """
+        order.id = self._order_id()
+        return await self._submit(order)
+
+    async def _submit(self, order: Order) -> bool:
+        symbol = order.instrument.name
+        quote = self._quotes.get(symbol)
+
+        if order.order_type == OrderType.MARKET and quote is None:
+            await self._push_event(Event(type=EventType.REJECTED, data=order))
+            return False
+
+        await self._push_event(Event(type=EventType.RECEIVED, data=order))
+        book = self.book(symbol)
+
+        if order.order_type == OrderType.STOP:
+            book.add(order)
+            if quote is not None:
+                await self._trigger(book, quote[BID], quote[ASK])
+            return True
+
+        await self._take(book, order, quote)
+        return True
+
+    async def _take(self, book: OrderBook, order: Order, quote) -> None:
+        """execute an incoming order against the quote, then rest or cancel the rest"""
+        buy = order.side == Side.BUY
+        available, price = 0.0, math.nan
+        if quote is not None:
+            price, size = (quote[ASK], quote[ASK_SIZE]) if buy else (quote[BID], quote[BID_SIZE])
+            crosses = order.order_type == OrderType.MARKET or (
+                (order.price >= price) if buy else (order.price <= price)
+            )
+            available = size if crosses else 0.0
+
+        remaining = order.volume - order.filled
+        if order.flag in (OrderFlag.FILL_OR_KILL, OrderFlag.ALL_OR_NONE) and available < remaining:
+            available = 0.0
+            if order.flag == OrderFlag.FILL_OR_KILL:
+                await self._push_event(Event(type=EventType.CANCELED, data=order))
+                return
+
+        volume = min(available, remaining)
+        if volume > 0:
+            quote[ASK_SIZE if buy else BID_SIZE] -= volume
+            order.filled += volume
+            await self._fill(order, volume, price)
+
+        if order.filled < order.volume:
+            if order.order_type == OrderType.MARKET or order.flag == OrderFlag.IMMEDIATE_OR_CANCEL:
+                await self._push_event(Event(type=EventType.CANCELED, data=order))
+            else:
+                book.add(order)
+
+    async def cancel_order(self, order: Order) -> bool:
+        """Cancel a resting order
+
+        Returns:
+            True if the order was canceled, False if it was not resting
+        """
+        book = self._books.get(order.instrument.name)
+        if book is None or book.remove(order.id) is None:
+            return False
+        await self._push_event(Event(type=EventType.CANCELED, data=order))
+        return True
+
+    async def _fill(self, order: Order, volume: float, price: float) -> None:
+        trade = Trade(
+            id=self._trade_id(),
+            price=price,
+            volume=volume,
+            my_order=str(order.id),
+            taker_order=order,
+        )
+        await self._push_event(Event(type=EventType.FILL, data=trade))
+        traded = EventType.BOUGHT if order.side == Side.BUY else EventType.SOLD
+        await self._push_event(Event(type=traded, data=trade))
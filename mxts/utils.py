@@ -1,6 +1,9 @@
-from typing import Callable, List
+from typing import Any, Callable, List
 import itertools
 
+import numpy as np
+import pandas as pd
+
 
 def id_gen() -> Callable[[], int]:
     __c = itertools.count()
@@ -9,3 +12,12 @@ def id_gen() -> Callable[[], int]:
         return next(__c)
 
     return _gen_id
+
+
+def nanos(time: Any) -> int:
+    """epoch nanoseconds of an int (nanoseconds), float (seconds) or datetime like"""
+    if isinstance(time, (int, np.integer)):
+        return int(time)
+    if isinstance(time, float):
+        return int(time * 1_000_000_000)
+    return pd.Timestamp(time).value
@@ -0,0 +1,61 @@
+from mxts.config import EventType
+from mxts.core.data import Event
+from mxts.core.handler import EventHandler, callback, _noop
+
+
+class Trader(EventHandler):
+    async def on_trade(self, event: Event) -> None:
+        self.last = event
+
+    async def on_fill(self, event: Event) -> None:
+        """overridden, but still empty"""
+
+    @callback(EventType.DATA, EventType.TICKER)
+    async def on_data(self, event: Event) -> None:
+        self.last = event
+
+
+class Child(Trader):
+    async def on_fill(self, event: Event) -> None:
+        self.filled = event
+
+
+class GrandChild(Trader):
+    pass
+
+
+class TestCallbacks:
+    def test_noop(self):
+        async def empty(self, event):
+            pass
+
+        async def docstring(self, event):
+            """nothing"""
+
+        async def body(self, event):
+            return event
+
+        assert _noop(empty)
+        assert _noop(docstring)
+        assert not _noop(body)
+
+    def test_only_overrides(self):
+        assert EventHandler.callbacks == {}
+        assert Trader.callbacks == {
+            "on_trade": (EventType.TRADE,),
+            "on_fill": (EventType.FILL,),
+            "on_data": (EventType.DATA, EventType.TICKER),
+        }
+        # Trader's empty on_fill is not inherited
+        assert GrandChild.callbacks == {
+            "on_trade": (EventType.TRADE,),
+            "on_data": (EventType.DATA, EventType.TICKER),
+        }
+        assert Child.callbacks == {
+            "on_trade": (EventType.TRADE,),
+            "on_fill": (EventType.FILL,),
+            "on_data": (EventType.DATA, EventType.TICKER),
+        }
+
+    def test_built_per_class(self):
+        assert Trader().callbacks is Trader().callbacks is Trader.callbacks
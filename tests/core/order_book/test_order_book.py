@@ -0,0 +1,61 @@
+from mxts.config import InstrumentType, OrderFlag, OrderType, Side
+from mxts.config.enums import ExchangeType
+from mxts.core import Instrument, Order, OrderBook
+
+BTC = Instrument(name="BTC-USD", exchange=ExchangeType.COINBASE, type=InstrumentType.CURRENCY)
+
+
+def order(id, side, price, volume=1.0, order_type=OrderType.LIMIT, flag=OrderFlag.NONE):
+    return Order(
+        id=id,
+        type=InstrumentType.CURRENCY,
+        instrument=BTC,
+        exchange=ExchangeType.COINBASE,
+        volume=volume,
+        price=price,
+        filled=0.0,
+        side=side,
+        order_type=order_type,
+        flag=flag,
+        force_done=False,
+    )
+
+
+class TestOrderBook:
+    def test_price_time_priority(self):
+        book = OrderBook()
+        book.add(order(1, Side.BUY, 99.0))
+        book.add(order(2, Side.BUY, 100.0))
+        book.add(order(3, Side.BUY, 100.0))
+
+        fills = book.match(Side.BUY, 99.5, 1.5)
+        assert [(o.id, v) for o, v in fills] == [(2, 1.0), (3, 0.5)]
+        assert book.best(Side.BUY).id == 3
+        assert len(book) == 2
+
+    def test_cancel_is_skipped(self):
+        book = OrderBook()
+        book.add(order(1, Side.SELL, 101.0))
+        book.add(order(2, Side.SELL, 102.0))
+        assert book.remove(1).id == 1
+        assert book.remove(1) is None
+        assert book.best(Side.SELL).id == 2
+
+    def test_all_or_none_keeps_its_place(self):
+        book = OrderBook()
+        book.add(order(1, Side.SELL, 100.0, volume=5.0, flag=OrderFlag.ALL_OR_NONE))
+        book.add(order(2, Side.SELL, 100.0))
+
+        assert [o.id for o, _ in book.match(Side.SELL, 100.0, 2.0)] == [2]
+        assert book.best(Side.SELL).id == 1
+        assert [o.id for o, _ in book.match(Side.SELL, 100.0, 5.0)] == [1]
+
+    def test_stops(self):
+        book = OrderBook()
+        book.add(order(1, Side.BUY, 105.0, volume=0.0, order_type=OrderType.STOP))
+        book.add(order(2, Side.SELL, 95.0, volume=0.0, order_type=OrderType.STOP))
+
+        assert book.triggered(bid=99.0, ask=101.0) == []
+        assert [o.id for o in book.triggered(bid=104.0, ask=105.0)] == [1]
+        assert [o.id for o in book.triggered(bid=90.0, ask=91.0)] == [2]
+        assert len(book) == 0
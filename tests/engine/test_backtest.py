@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+import pytest
+
+from mxts.config import EventType, InstrumentType, OrderType, Settings, Side, TradingType
+from mxts.config.enums import ExchangeType
+from mxts.core import Instrument, Order
+from mxts.core.data import Event
+from mxts.core.handler import EventHandler, callback
+from mxts.engine.engine import TradingEngine
+
+
+class Clocked(EventHandler):
+    def __init__(self, engine) -> None:
+        super().__init__()
+        self.engine = engine
+        self.seen = []
+
+    @callback(conflate=True)
+    async def on_trade(self, event: Event) -> None:
+        self.seen.append((EventType.TRADE, self.engine.now().value))
+
+    async def on_fill(self, event: Event) -> None:
+        self.seen.append((EventType.FILL, self.engine.now().value))
+
+    async def on_start(self, event: Event) -> None:
+        self.seen.append((EventType.START, None))
+
+    async def on_exit(self, event: Event) -> None:
+        self.seen.append((EventType.EXIT, None))
+
+
+def trade(ts):
+    return Event(type=EventType.TRADE, data=SimpleNamespace(symbol="BTC-USD", timestamp=ts))
+
+
+def backtest(events, trading_type=TradingType.BACKTEST):
+    engine = TradingEngine(Settings(exchanges=[], heartbeat=1, trading_type=trading_type))
+    handler = Clocked(engine)
+    engine.register_handler(handler)
+
+    beats = []
+
+    async def on_heartbeat(event):
+        beats.append(engine.now().value)
+
+    engine._handler_subs[EventType.HEARTBEAT].append(on_heartbeat)
+    engine.run(events)
+    return handler.seen, beats
+
+
+@pytest.mark.parametrize("trading_type", [TradingType.BACKTEST, TradingType.SIMULATION])
+def test_replay_honours_simulated_clock(trading_type):
+    seen, beats = backtest([trade(0.0), trade(0.5), trade(2.5)], trading_type)
+    assert seen == [
+        (EventType.START, None),
+        (EventType.TRADE, 0),
+        (EventType.TRADE, 500_000_000),
+        (EventType.TRADE, 2_500_000_000),
+        (EventType.EXIT, None),
+    ]
+    assert beats == [1_000_000_000, 2_000_000_000]
+
+
+def test_replay_is_deterministic():
+    events = [trade(i / 10) for i in range(100)]
+    assert backtest(events) == backtest(events)
+
+
+def test_long_gap_sends_bounded_heartbeats():
+    _, beats = backtest([trade(0.0), trade(1e6)])
+    assert len(beats) == 100
+    assert beats[-1] == 1_000_000 * 1_000_000_000
+
+
+def test_strategy_trades_in_backtest():
+    btc = Instrument(name="BTC-USD", exchange=ExchangeType.COINBASE, type=InstrumentType.CURRENCY)
+
+    class Trader(EventHandler):
+        def __init__(self) -> None:
+            super().__init__()
+            self.traded = []
+
+        @callback(EventType.TICKER)
+        async def on_ticker(self, event: Event) -> None:
+            if not self.traded and event.data.timestamp == 1.0:
+                order = Order(
+                    id=0,
+                    type=InstrumentType.CURRENCY,
+                    instrument=btc,
+                    exchange=ExchangeType.COINBASE,
+                    volume=1.0,
+                    price=0.0,
+                    filled=0.0,
+                    side=Side.BUY,
+                    order_type=OrderType.MARKET,
+                    stop_target=None,
+                    force_done=False,
+                )
+                assert await self._manager.new_order(self, order)
+
+        async def on_traded(self, event: Event) -> None:
+            self.traded.append((event.type, event.data.price, self._manager.now().value))
+
+    engine = TradingEngine(Settings(exchanges=[], heartbeat=1, trading_type=TradingType.BACKTEST))
+    trader = Trader()
+    engine.register_handler(trader)
+    engine.run(
+        [
+            Event(type=EventType.TICKER, data=SimpleNamespace(symbol="BTC-USD", bid=99.0, ask=101.0 + ts, timestamp=ts))
+            for ts in (0.0, 1.0, 2.0)
+        ]
+    )
+    assert trader.traded == [(EventType.BOUGHT, 102.0, 1_000_000_000)]
@@ -0,0 +1,107 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from mxts.config import EventType, Settings, TradingType
+from mxts.core.data import Event
+from mxts.core.handler import EventHandler
+from mxts.engine.bars import BarAggregator
+from mxts.engine.engine import TradingEngine
+
+
+def trade(ts, price, amount=1.0, symbol="BTC-USD"):
+    return Event(
+        type=EventType.TRADE,
+        data=SimpleNamespace(exchange="COINBASE", symbol=symbol, timestamp=ts, price=price, amount=amount),
+    )
+
+
+def aggregate(events, **kwargs):
+    bars = []
+
+    async def push_event(event, droppable=True):
+        bars.append(event.data)
+
+    aggregator = BarAggregator(push_event, **kwargs)
+
+    async def run():
+        for event in events:
+            await aggregator.on_trade(event)
+        await aggregator.flush()
+
+    asyncio.run(run())
+    return bars
+
+
+class TestBarAggregator:
+    def test_time_bars(self):
+        bars = aggregate(
+            [trade(0.0, 10.0), trade(20.0, 12.0), trade(59.0, 9.0, 2.0), trade(61.0, 11.0), trade(185.0, 13.0)],
+            kind="time",
+            size="M1",
+        )
+        assert [(b.start, b.end) for b in bars] == [
+            (0, 60_000_000_000),
+            (60_000_000_000, 120_000_000_000),
+            (180_000_000_000, 240_000_000_000),
+        ]
+        first = bars[0]
+        assert (first.open, first.high, first.low, first.close) == (10.0, 12.0, 9.0, 9.0)
+        assert first.volume == 4.0
+        assert first.ticks == 3
+
+    def test_tick_bars_per_instrument(self):
+        events = [trade(i, float(i), symbol="BTC-USD" if i % 2 else "ETH-USD") for i in range(8)]
+        bars = aggregate(events, kind="tick", size=2)
+        assert [(b.symbol, b.open, b.close) for b in bars] == [
+            ("ETH-USD", 0.0, 2.0),
+            ("BTC-USD", 1.0, 3.0),
+            ("ETH-USD", 4.0, 6.0),
+            ("BTC-USD", 5.0, 7.0),
+        ]
+
+    def test_volume_and_dollar_bars(self):
+        events = [trade(i, 10.0, 1.5) for i in range(4)]
+        assert [b.volume for b in aggregate(events, kind="volume", size=3)] == [3.0, 3.0]
+        assert [b.ticks for b in aggregate(events, kind="dollar", size=40)] == [3, 1]
+
+    def test_ticker_bars_need_time_or_ticks(self):
+        with pytest.raises(ValueError):
+            BarAggregator(None, kind="volume", size=1, source=EventType.TICKER)
+        with pytest.raises(ValueError):
+            BarAggregator(None, kind="time", size="X1")
+
+
+class Collector(EventHandler):
+    def __init__(self) -> None:
+        self.bars = []
+
+    async def on_data(self, event: Event) -> None:
+        self.bars.append((event.data.start, event.data.close))
+
+
+def test_backtest_bars():
+    engine = TradingEngine(Settings(exchanges=[], heartbeat=1, trading_type=TradingType.BACKTEST))
+    engine.bars(kind="time", size="S5")
+    collector = Collector()
+    engine.register_handler(collector)
+    engine.run([trade(i, float(i)) for i in range(12)])
+    # the last, partial bar is emitted when the replay ends
+    assert collector.bars == [(0, 4.0), (5_000_000_000, 9.0), (10_000_000_000, 11.0)]
+
+
+def test_shutdown_emits_open_bars():
+    async def run():
+        engine = TradingEngine(Settings(exchanges=[], trading_type=TradingType.SIMULATION))
+        engine.bars(kind="time", size="S5")
+        collector = Collector()
+        engine.register_handler(collector)
+        engine._dispatcher = asyncio.ensure_future(engine.dispatch())
+        for i in range(7):
+            await engine.push_event(trade(i, float(i)))
+        await engine.shutdown()
+        return collector
+
+    collector = asyncio.run(run())
+    assert collector.bars == [(0, 4.0), (5_000_000_000, 6.0)]
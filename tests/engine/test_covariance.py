@@ -0,0 +1,66 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from mxts.engine.covariance import RollingCovariance
+from mxts.engine.datastore import MarketDataStore
+from mxts.engine.snapshot import SnapshotMatrix
+
+
+def walk(n, instruments, seed=0):
+    steps = np.random.default_rng(seed).normal(0, 0.01, (n, instruments))
+    return 100 * np.exp(np.cumsum(steps, axis=0))
+
+
+class TestRollingCovariance:
+    def test_window_matches_numpy(self):
+        prices = walk(200, 3)
+        snapshot = SnapshotMatrix(["A", "B", "C"])
+        covariance = RollingCovariance(snapshot, interval=1, window=50)
+        for t, row in enumerate(prices):
+            for name, price in zip("ABC", row):
+                snapshot.update(name, t, price, price)
+            covariance.sample(t)
+
+        returns = np.diff(np.log(prices), axis=0)[-50:]
+        assert covariance.cov == pytest.approx(np.cov(returns, rowvar=False))
+        assert covariance.corr == pytest.approx(np.corrcoef(returns, rowvar=False))
+        with pytest.raises(ValueError):
+            covariance.cov[0, 0] = 1.0
+
+    def test_weighted_correlation(self):
+        prices = walk(100, 1)[:, 0]
+        snapshot = SnapshotMatrix(["A", "B", "C"])
+        covariance = RollingCovariance(snapshot, interval=1, halflife=10)
+        for t, price in enumerate(prices):
+            snapshot.update("A", t, price, price)
+            snapshot.update("B", t, 2 * price, 2 * price)
+            snapshot.update("C", t, 1 / price, 1 / price)
+            covariance.sample(t)
+        assert covariance.corr == pytest.approx(np.array([[1, 1, -1], [1, 1, -1], [-1, -1, 1]]))
+        assert covariance.samples == 99
+
+    def test_arguments(self):
+        with pytest.raises(ValueError):
+            RollingCovariance(SnapshotMatrix(["A"]), interval=1)
+        with pytest.raises(ValueError):
+            RollingCovariance(SnapshotMatrix(["A"]), interval=1, halflife=5, window=5)
+
+
+def test_store_samples_on_interval():
+    prices = walk(40, 1)[:, 0]
+    store = MarketDataStore(None, ["A", "B"])
+    covariance = store.covariance("1s", window=10)
+
+    async def run():
+        for i, price in enumerate(prices):
+            # four ticks a second of each pair
+            for pair, quote in (("A", price), ("B", 2 * price)):
+                await store.update_data(SimpleNamespace(instrument=pair, time=i * 250_000_000, bid=quote, ask=quote))
+
+    asyncio.run(run())
+    assert covariance.samples == 9
+    assert covariance.due == 10_000_000_000
+    assert covariance.corr[0, 1] > 0.5
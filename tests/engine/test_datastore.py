@@ -0,0 +1,145 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from mxts.config import OverflowPolicy
+from mxts.engine.datastore import MarketDataStore, RollingStats, TickBuffer
+
+
+class _Subscriber:
+    def __init__(self):
+        self.msgs = []
+
+    def receive_msg(self, msg):
+        self.msgs.append(msg)
+
+
+class TestTickBuffer:
+    def test_view_before_full(self):
+        buffer = TickBuffer(4)
+        for i in range(3):
+            buffer.append(i, 1.0 + i, 2.0 + i)
+        timestamp, bid, ask = buffer.view()
+        assert len(buffer) == 3
+        assert timestamp.tolist() == [0, 1, 2]
+        assert bid.tolist() == [1.0, 2.0, 3.0]
+        assert ask.tolist() == [2.0, 3.0, 4.0]
+
+    def test_view_wraps_in_order(self):
+        buffer = TickBuffer(4)
+        for i in range(11):
+            buffer.append(i, float(i), float(i) + 1)
+        timestamp, bid, _ = buffer.view()
+        assert len(buffer) == 4
+        assert timestamp.tolist() == [7, 8, 9, 10]
+        assert bid.tolist() == [7.0, 8.0, 9.0, 10.0]
+        # no copy is taken
+        assert np.shares_memory(bid, buffer.bid)
+        assert buffer.latest() == (10, 10.0, 11.0)
+
+    def test_frame(self):
+        buffer = TickBuffer(2)
+        for i in range(3):
+            buffer.append(i * 1_000_000_000, float(i), float(i) + 1)
+        frame = buffer.frame("EUR_USD")
+        assert list(frame.columns) == ["EUR_USD_bid", "EUR_USD_ask"]
+        assert list(frame.index) == [pd.Timestamp(1, unit="s"), pd.Timestamp(2, unit="s")]
+        assert frame["EUR_USD_bid"].tolist() == [1.0, 2.0]
+
+
+class TestRollingStats:
+    def test_matches_window(self):
+        values = np.random.default_rng(0).normal(100, 5, 500)
+        stats = RollingStats(20)
+        for i, value in enumerate(values):
+            stats.push(value, values[i - 20] if i >= 20 else None)
+            window = values[max(0, i - 19) : i + 1]
+            assert stats.count == len(window)
+            assert np.isclose(stats.mean, window.mean())
+            assert stats.min == window.min()
+            assert stats.max == window.max()
+            if len(window) > 1:
+                assert np.isclose(stats.std, window.std(ddof=1))
+        assert stats.latest == values[-1]
+
+
+def tick(instrument, i):
+    return SimpleNamespace(instrument=instrument, time=pd.Timestamp(i, unit="s"), bid=float(i), ask=float(i) + 1)
+
+
+def feed(store, ticks):
+    async def run():
+        for t in ticks:
+            await store.update_data(t)
+        await store.join()
+
+    asyncio.run(run())
+
+
+class _Slow(_Subscriber):
+    async def receive_msg(self, msg):
+        await asyncio.sleep(0.01)
+        self.msgs.append(msg)
+
+
+class TestMarketDataStore:
+    def test_update_data_keeps_length(self):
+        store = MarketDataStore(None, ["EUR_USD"], length=3)
+        subscriber = _Subscriber()
+        store.attach(subscriber, policy=OverflowPolicy.BLOCK)
+        feed(store, [tick("EUR_USD", i) for i in range(5)])
+        assert len(subscriber.msgs) == 5
+        assert store.frame("EUR_USD")["EUR_USD_bid"].tolist() == [2.0, 3.0, 4.0]
+        stats = subscriber.msgs[-1]["EUR_USD"]
+        assert stats.count == 3
+        assert stats.time == 4_000_000_000
+        assert (stats.bid, stats.bid_mean, stats.bid_min, stats.bid_max) == (4.0, 3.0, 2.0, 4.0)
+        assert stats.ask_std == 1.0
+
+    def test_topics(self):
+        store = MarketDataStore(None, ["EUR_USD", "EUR_GBP", "USD_JPY"])
+        eur, jpy, every = _Subscriber(), _Subscriber(), _Subscriber()
+        store.attach(eur, topics=["EUR_*"], policy=OverflowPolicy.BLOCK)
+        store.attach(jpy, topics=["USD_JPY"], policy=OverflowPolicy.BLOCK)
+        store.attach(every, policy=OverflowPolicy.BLOCK)
+        feed(store, [tick(pair, i) for i, pair in enumerate(["EUR_USD", "USD_JPY", "EUR_GBP"])])
+        assert [list(m) for m in eur.msgs] == [["EUR_USD"], ["EUR_GBP"]]
+        assert [list(m) for m in jpy.msgs] == [["USD_JPY"]]
+        assert len(every.msgs) == 3
+
+    def test_slow_subscriber_conflates_alone(self):
+        store = MarketDataStore(None, ["EUR_USD", "USD_JPY"])
+        fast, slow = _Subscriber(), _Slow()
+        store.attach(fast, policy=OverflowPolicy.BLOCK, maxsize=100)
+        subscription = store.attach(slow)
+
+        async def run():
+            for i in range(10):
+                await store.update_data(tick("EUR_USD", i))
+                await store.update_data(tick("USD_JPY", i))
+                await asyncio.sleep(0)
+            await store.join()
+
+        asyncio.run(run())
+        assert len(fast.msgs) == 20
+        # the slow subscriber only gets the latest stats of each pair it fell behind on
+        assert len(slow.msgs) < 20
+        assert [m for m in slow.msgs if "USD_JPY" in m][-1]["USD_JPY"].bid == 9.0
+        assert subscription.conflated == 20 - len(slow.msgs)
+
+    def test_drop_oldest(self):
+        store = MarketDataStore(None, ["EUR_USD"])
+        subscriber = _Subscriber()
+        subscription = store.attach(subscriber, maxsize=2, policy=OverflowPolicy.DROP_OLDEST)
+        feed(store, [tick("EUR_USD", i) for i in range(5)])
+        assert [m["EUR_USD"].bid for m in subscriber.msgs] == [3.0, 4.0]
+        assert subscription.dropped == 3
+
+    def test_quantiles(self):
+        store = MarketDataStore(None, ["EUR_USD"], length=5)
+        feed(store, [SimpleNamespace(instrument="EUR_USD", time=i, bid=float(i), ask=float(i) + 1) for i in range(5)])
+        bid, ask = store.quantiles("EUR_USD", (0.0, 0.5, 1.0))
+        assert bid.tolist() == [0.0, 2.0, 4.0]
+        assert ask.tolist() == [1.0, 3.0, 5.0]
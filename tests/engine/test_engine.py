@@ -0,0 +1,333 @@
+import asyncio
+import pickle
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from mxts.config import EventType, InstrumentType, OrderType, Settings, Side, TradingType
+from mxts.config.enums import ExchangeType
+from mxts.core import Instrument, Order
+from mxts.core.data import Event
+from mxts.core.handler import EventHandler, batched, callback
+from mxts.engine.breaker import CircuitBreaker
+from mxts.engine.engine import TradingEngine
+
+
+class Recorder(EventHandler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.events = []
+
+    async def on_trade(self, event: Event) -> None:
+        self.events.append(event)
+
+    async def on_fill(self, event: Event) -> None:
+        self.events.append(event)
+
+
+def engine():
+    return TradingEngine(Settings(exchanges=[], queue_size=8))
+
+
+BTC = Instrument(name="BTC-USD", exchange=ExchangeType.COINBASE, type=InstrumentType.CURRENCY)
+
+
+def market_order(side, volume):
+    return Order(
+        id=0,
+        type=InstrumentType.CURRENCY,
+        instrument=BTC,
+        exchange=ExchangeType.COINBASE,
+        volume=volume,
+        price=0.0,
+        filled=0.0,
+        side=side,
+        order_type=OrderType.MARKET,
+        stop_target=None,
+        force_done=False,
+    )
+
+
+class TestTradingEngine:
+    def test_dispatch(self):
+        async def run():
+            eng = engine()
+            handler = Recorder()
+            eng.register_handler(handler)
+            eng._dispatcher = asyncio.ensure_future(eng.dispatch())
+            await eng.push_event(Event(type=EventType.TRADE, data=1))
+            await eng.push_event(Event(type=EventType.FILL, data=2))
+            await eng.shutdown()
+            return handler
+
+        handler = asyncio.run(run())
+        # the fill jumps the queued trade
+        assert [e.data for e in handler.events] == [2, 1]
+
+    def test_failing_callback_raises_error_event(self):
+        class Broken(EventHandler):
+            async def on_trade(self, event: Event) -> None:
+                raise ValueError("boom")
+
+        errors = []
+
+        class Errors(EventHandler):
+            async def on_trade(self, event: Event) -> None:
+                pass
+
+            async def on_error(self, event: Event) -> None:
+                errors.append(event)
+
+        async def run():
+            eng = engine()
+            eng.register_handler(Broken())
+            eng.register_handler(Errors())
+            eng._dispatcher = asyncio.ensure_future(eng.dispatch())
+            await eng.push_event(Event(type=EventType.TRADE, data=1))
+            await eng.shutdown()
+
+        asyncio.run(run())
+        assert len(errors) == 1
+        assert "boom" in errors[0].data.exception
+
+    def test_conflating_callback(self):
+        class Slow(EventHandler):
+            def __init__(self) -> None:
+                super().__init__()
+                self.seen = []
+
+            @callback(conflate=True)
+            async def on_trade(self, event: Event) -> None:
+                self.seen.append((event.data.symbol, event.data.price))
+                await asyncio.sleep(0.01)
+
+        async def run():
+            eng = engine()
+            handler, other = Slow(), Slow()
+            eng.register_handler(handler)
+            eng.register_handler(other)
+            eng._dispatcher = asyncio.ensure_future(eng.dispatch())
+            for price in range(10):
+                for symbol in ("BTC-USD", "ETH-USD"):
+                    data = SimpleNamespace(exchange="COINBASE", symbol=symbol, price=price)
+                    await eng.push_event(Event(type=EventType.TRADE, data=data))
+                    await asyncio.sleep(0)
+            await eng.shutdown()
+            return eng, handler, other
+
+        eng, handler, other = asyncio.run(run())
+        # the slow handler skips stale ticks but always ends on the latest one
+        assert handler.seen[0] == ("BTC-USD", 0)
+        assert set(handler.seen[-2:]) == {("BTC-USD", 9), ("ETH-USD", 9)}
+        # every instance is counted on its own
+        stats = eng.conflation_stats()
+        assert set(stats) == {(handler, "on_trade"), (other, "on_trade")}
+        conflated = stats[handler, "on_trade"]
+        assert conflated > 0
+        assert len(handler.seen) + conflated == 20
+
+    def test_batched_callback(self):
+        class Vectorized(EventHandler):
+            def __init__(self) -> None:
+                super().__init__()
+                self.batches = []
+
+            @batched(max_size=4, max_wait=0.01)
+            async def on_ticks(self, batch) -> None:
+                self.batches.append((batch.instrument.copy(), batch.bid.copy()))
+
+        async def run():
+            eng = engine()
+            handler = Vectorized()
+            eng.register_handler(handler)
+            eng._dispatcher = asyncio.ensure_future(eng.dispatch())
+            for bid in range(10):
+                symbol = "BTC-USD" if bid % 2 else "ETH-USD"
+                data = SimpleNamespace(exchange="COINBASE", symbol=symbol, bid=bid, ask=bid + 1, timestamp=bid)
+                await eng.push_event(Event(type=EventType.TICKER, data=data))
+            await eng.shutdown()
+            return eng, handler
+
+        eng, handler = asyncio.run(run())
+        assert all(len(bids) <= 4 for _, bids in handler.batches)
+        codes = np.concatenate([codes for codes, _ in handler.batches])
+        bids = np.concatenate([bids for _, bids in handler.batches])
+        assert bids.tolist() == list(range(10))
+        assert [eng.symbols.lookup(c)[1] for c in codes[:2]] == ["ETH-USD", "BTC-USD"]
+
+    def test_hung_handler_is_timed_out_and_tripped(self):
+        calls = []
+
+        class Hung(EventHandler):
+            async def on_trade(self, event: Event) -> None:
+                calls.append(event.data)
+                await asyncio.sleep(3600)
+
+        async def run():
+            eng = TradingEngine(Settings(exchanges=[], handler_timeout=0.01, breaker_threshold=2))
+            healthy = Recorder()
+            eng.register_handler(Hung())
+            eng.register_handler(healthy)
+            eng._dispatcher = asyncio.ensure_future(eng.dispatch())
+            for i in range(5):
+                await eng.push_event(Event(type=EventType.TRADE, data=i))
+            await asyncio.wait_for(eng.shutdown(), 1)
+            return healthy
+
+        healthy = asyncio.run(run())
+        assert calls == [0, 1]
+        assert [e.data for e in healthy.events] == [0, 1, 2, 3, 4]
+
+    def test_wrapped_handlers_are_timed_out_and_tripped(self):
+        calls = []
+
+        class Hung(EventHandler):
+            @callback(conflate=True)
+            async def on_trade(self, event: Event) -> None:
+                calls.append(event.data.price)
+                await asyncio.sleep(3600)
+
+        class Failing(EventHandler):
+            @batched(max_size=1)
+            async def on_ticks(self, batch) -> None:
+                calls.append(batch.bid[0])
+                raise ValueError("boom")
+
+        async def run():
+            eng = TradingEngine(Settings(exchanges=[], handler_timeout=0.01, breaker_threshold=2))
+            hung, failing = Hung(), Failing()
+            eng.register_handler(hung)
+            eng.register_handler(failing)
+            eng._dispatcher = asyncio.ensure_future(eng.dispatch())
+            for i in range(5):
+                data = SimpleNamespace(exchange="COINBASE", symbol="BTC-USD", price=i, bid=i, ask=i + 1)
+                await eng.push_event(Event(type=EventType.TRADE, data=data))
+                await eng.push_event(Event(type=EventType.TICKER, data=data))
+                await asyncio.sleep(0.05)
+            await asyncio.wait_for(eng.shutdown(), 1)
+            return eng, hung, failing
+
+        eng, hung, failing = asyncio.run(run())
+        assert sorted(calls) == [0, 0, 1, 1]
+        assert {b.handler for b in eng._tripped} == {hung, failing}
+
+    def test_breaker_readmits_after_cooldown(self):
+        calls = []
+        trips = []
+
+        class Failing(EventHandler):
+            async def on_trade(self, event: Event) -> None:
+                calls.append(event.data.timestamp // 10**9)
+                raise ValueError("boom")
+
+        class Errors(EventHandler):
+            async def on_trade(self, event: Event) -> None:
+                pass
+
+            async def on_error(self, event: Event) -> None:
+                if isinstance(event.data.data, CircuitBreaker):
+                    trips.append(event.data.data.handler)
+
+        eng = TradingEngine(
+            Settings(
+                exchanges=[],
+                trading_type=TradingType.BACKTEST,
+                heartbeat=3600,
+                breaker_threshold=2,
+                breaker_cooldown=10,
+            )
+        )
+        failing = Failing()
+        eng.register_handler(failing)
+        eng.register_handler(Errors())
+        eng.run([Event(type=EventType.TRADE, data=SimpleNamespace(timestamp=s * 10**9)) for s in range(30)])
+
+        # out for 10s of simulated time after tripping, half open when back
+        assert calls == [0, 1, 11, 21]
+        assert trips == [failing] * 3
+
+    def test_simulated_orders_fill_their_owner(self):
+        class Trader(EventHandler):
+            def __init__(self, side, volume) -> None:
+                super().__init__()
+                self.order = market_order(side, volume)
+                self.traded = []
+
+            @callback(EventType.TICKER)
+            async def on_ticker(self, event: Event) -> None:
+                if not self.traded and self.order.id == 0:
+                    await self._manager.new_order(self, self.order)
+
+            async def on_traded(self, event: Event) -> None:
+                self.traded.append((event.type, event.data.price, event.data.volume))
+
+        async def run():
+            eng = TradingEngine(Settings(exchanges=[], trading_type=TradingType.SIMULATION))
+            buyer, seller, recorder = Trader(Side.BUY, 1.0), Trader(Side.SELL, 2.0), Recorder()
+            for handler in (buyer, seller, recorder):
+                eng.register_handler(handler)
+            eng._dispatcher = asyncio.ensure_future(eng.dispatch())
+            data = SimpleNamespace(exchange="COINBASE", symbol="BTC-USD", bid=99.0, ask=101.0)
+            await eng.push_event(Event(type=EventType.TICKER, data=data))
+            await eng.shutdown()
+            return eng, buyer, seller, recorder
+
+        eng, buyer, seller, recorder = asyncio.run(run())
+        assert buyer.traded == [(EventType.BOUGHT, 101.0, 1.0)]
+        assert seller.traded == [(EventType.SOLD, 99.0, 2.0)]
+        # a handler that never trades still sees every fill
+        assert sorted(e.data.volume for e in recorder.events) == [1.0, 2.0]
+        assert len(eng._owners) == 0
+
+    @pytest.mark.parametrize("first", [(99.0, 101.0), (94.0, 96.0)], ids=["later", "on_submission"])
+    def test_triggered_stop_fills_its_owner(self, first):
+        class Trader(EventHandler):
+            def __init__(self, order) -> None:
+                super().__init__()
+                self.order = order
+                self.placed = False
+                self.fills = []
+
+            @callback(EventType.TICKER)
+            async def on_ticker(self, event: Event) -> None:
+                if not self.placed:
+                    self.placed = True
+                    await self._manager.new_order(self, self.order)
+
+            async def on_fill(self, event: Event) -> None:
+                self.fills.append((event.data.price, event.data.volume))
+
+        target = market_order(Side.SELL, 1.0)
+        stop = market_order(Side.SELL, 0.0).copy(
+            update={"order_type": OrderType.STOP, "price": 95.0, "stop_target": target}
+        )
+
+        async def run():
+            eng = TradingEngine(Settings(exchanges=[], trading_type=TradingType.SIMULATION))
+            owner, other = Trader(stop), Trader(market_order(Side.BUY, 2.0))
+            for handler in (owner, other):
+                eng.register_handler(handler)
+            eng._dispatcher = asyncio.ensure_future(eng.dispatch())
+            for bid, ask in (first, (94.0, 96.0)):
+                data = SimpleNamespace(exchange="COINBASE", symbol="BTC-USD", bid=bid, ask=ask)
+                await eng.push_event(Event(type=EventType.TICKER, data=data))
+                await eng._event_queue.join()
+            await eng.shutdown()
+            return eng, owner, other
+
+        eng, owner, other = asyncio.run(run())
+        assert owner.fills == [(94.0, 1.0)]
+        assert other.fills == [(first[1], 2.0)]
+        assert len(eng._owners) == 0
+
+    def test_registered_handler_pickles_without_engine(self, tmp_path):
+        eng = TradingEngine(Settings(exchanges=[], journal_fp=str(tmp_path / "journal")))
+        handler = Recorder()
+        eng.register_handler(handler)
+        assert handler._manager is eng
+
+        copy = pickle.loads(pickle.dumps(handler))
+        assert not hasattr(copy, "_manager")
+        assert handler._manager is eng
+        asyncio.run(eng.journal.close())
@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+
+from mxts.config import EventType, Lane, OverflowPolicy
+from mxts.core.data import Event
+from mxts.engine.event_queue import EventQueue
+
+
+def tick(symbol, bid):
+    return Event(type=EventType.TICKER, data=SimpleNamespace(exchange="COINBASE", symbol=symbol, bid=bid))
+
+
+def drain(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+class TestEventQueue:
+    def test_drop_oldest(self):
+        async def run():
+            queue = EventQueue(maxsize=2, policy=OverflowPolicy.DROP_OLDEST)
+            for bid in range(5):
+                await queue.put_event(tick("BTC-USD", bid))
+            return queue, drain(queue)
+
+        queue, events = asyncio.run(run())
+        assert [e.data.bid for e in events] == [3, 4]
+        assert queue.dropped == 3
+
+    def test_conflate(self):
+        async def run():
+            queue = EventQueue(maxsize=10, policy=OverflowPolicy.CONFLATE)
+            for bid in range(3):
+                await queue.put_event(tick("BTC-USD", bid))
+                await queue.put_event(tick("ETH-USD", bid))
+            return queue, drain(queue)
+
+        queue, events = asyncio.run(run())
+        assert [(e.data.symbol, e.data.bid) for e in events] == [("BTC-USD", 2), ("ETH-USD", 2)]
+        assert queue.conflated == 4
+        assert queue.depth == 0
+
+    def test_order_entry_never_waits(self):
+        async def run():
+            queue = EventQueue(maxsize=1, policy=OverflowPolicy.BLOCK)
+            await queue.put_event(tick("BTC-USD", 1))
+            blocked = asyncio.ensure_future(queue.put_event(tick("BTC-USD", 2)))
+            await asyncio.sleep(0)
+            assert not blocked.done()
+            # a fill is accepted even though market data is saturated
+            await asyncio.wait_for(queue.put_event(Event(type=EventType.FILL, data=None)), 1)
+            # and dispatched ahead of the queued tick
+            first = [queue.get_nowait(), queue.get_nowait()]
+            await blocked
+            return first + drain(queue)
+
+        events = asyncio.run(run())
+        assert [e.type for e in events] == [EventType.FILL, EventType.TICKER, EventType.TICKER]
+
+    def test_lane_stats(self):
+        async def run():
+            queue = EventQueue()
+            for bid in range(3):
+                await queue.put_event(tick("BTC-USD", bid))
+            await queue.put_event(Event(type=EventType.HEARTBEAT, data=None))
+            await queue.put_event(Event(type=EventType.REJECTED, data=None))
+            return queue, drain(queue)
+
+        queue, events = asyncio.run(run())
+        assert [e.type for e in events[:2]] == [EventType.REJECTED, EventType.HEARTBEAT]
+        stats = queue.stats()
+        assert stats[Lane.MARKET_DATA].max_depth == 3
+        assert stats[Lane.MARKET_DATA].count == 3
+        assert stats[Lane.ORDER_ENTRY].count == 1
+        assert all(s.depth == 0 for s in stats.values())
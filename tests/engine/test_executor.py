@@ -0,0 +1,40 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+ray = pytest.importorskip("ray")
+
+from mxts.config import EventType, Settings
+from mxts.core.data import Event
+from mxts.core.handler import EventHandler, cpu_bound
+from mxts.engine.engine import TradingEngine
+
+
+class Model(EventHandler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.weights = np.arange(4, dtype=float)
+        self.results = []
+
+    @cpu_bound(EventType.TICKER)
+    def on_features(self, event: Event) -> float:
+        return float(event.data @ self.weights)
+
+    async def on_data(self, event: Event) -> None:
+        self.results.append(event.data.value)
+
+
+def test_cpu_bound_callback_results_come_back_as_events():
+    async def run():
+        eng = TradingEngine(Settings(exchanges=[], ray_local_mode=True))
+        model = Model()
+        eng.register_handler(model)
+        eng._dispatcher = asyncio.ensure_future(eng.dispatch())
+        for i in range(3):
+            await eng.push_event(Event(type=EventType.TICKER, data=np.full(4, float(i))))
+        await eng.shutdown()
+        return model
+
+    model = asyncio.run(run())
+    assert sorted(model.results) == [0.0, 6.0, 12.0]
@@ -0,0 +1,74 @@
+import asyncio
+import multiprocessing
+
+from mxts.config import Settings
+from mxts.engine.feed import FeedProcess, TickRing, feed_symbols
+
+
+def _produce(name, capacity, count):
+    ring = TickRing.attach(name, capacity)
+    for i in range(count):
+        ring.write(i % 2, float(i), float(i) + 0.5, 100.0 + i, 101.0 + i)
+    ring.close()
+
+
+class TestTickRing:
+    def test_read_in_order(self):
+        ring = TickRing.create(8)
+        try:
+            for i in range(5):
+                ring.write(1, float(i), float(i), 1.0, 2.0)
+            records = list(ring.read(3)) + list(ring.read(10))
+            assert [r[0] for r in records] == [1, 2, 3, 4, 5]
+            assert [r[1] for r in records] == [0.0, 1.0, 2.0, 3.0, 4.0]
+            assert list(ring.read(10)) == []
+            assert ring.overruns == 0
+        finally:
+            ring.close()
+
+    def test_overrun_counted(self):
+        ring = TickRing.create(8)
+        try:
+            for i in range(20):
+                ring.write(0, float(i), float(i), 1.0, 2.0)
+            records = list(ring.read(100))
+            # only the last capacity records survive
+            assert [r[1] for r in records] == [float(i) for i in range(12, 20)]
+            assert ring.overruns == 12
+        finally:
+            ring.close()
+
+    def test_across_processes(self):
+        ring = TickRing.create(1024)
+        try:
+            process = multiprocessing.Process(target=_produce, args=(ring.name, ring.capacity, 500))
+            process.start()
+            process.join()
+            records = list(ring.read(1000))
+            assert len(records) == 500
+            assert [r[3] for r in records] == [100.0 + i for i in range(500)]
+        finally:
+            ring.close()
+
+
+def test_consume_builds_ticks():
+    config = Settings(exchanges=["COINBASE"], symbols=["BTC-USD", "ETH-USD"], feed_ring_size=16)
+    feed = FeedProcess(config)
+    symbols = feed_symbols(config)
+    received = []
+
+    async def ticker(tick, receipt):
+        received.append((tick.exchange, tick.symbol, tick.bid, tick.ask, tick.timestamp, receipt))
+
+    async def run():
+        feed.ring.write(symbols.code("COINBASE", "ETH-USD"), float("nan"), 7.0, 1.0, 2.0)
+        task = asyncio.ensure_future(feed.consume(ticker))
+        await asyncio.sleep(0.01)
+        task.cancel()
+
+    try:
+        asyncio.run(run())
+    finally:
+        feed.close()
+    assert received == [("COINBASE", "ETH-USD", 1.0, 2.0, None, 7.0)]
+    assert feed.received == 1
@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+from mxts.config import EventType, Settings, TradingType
+from mxts.core.data import Event
+from mxts.core.handler import EventHandler
+from mxts.engine.engine import TradingEngine
+from mxts.engine.journal import JournalReader, JournalWriter
+
+
+class Recorder(EventHandler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.events = []
+
+    async def on_trade(self, event: Event) -> None:
+        self.events.append(event.data.timestamp)
+
+
+def trades(n):
+    return [Event(type=EventType.TRADE, data=SimpleNamespace(symbol="BTC-USD", timestamp=i)) for i in range(n)]
+
+
+class TestJournal:
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "events.journal")
+
+        async def write():
+            journal = JournalWriter(path, batch_bytes=256, chunk=4096)
+            for event in trades(500):
+                journal.append(event)
+            # not picklable, skipped
+            journal.append(Event(type=EventType.DATA, data=lambda: None))
+            await journal.close()
+            return journal
+
+        journal = asyncio.run(write())
+        assert (journal.count, journal.skipped) == (500, 1)
+        events = list(JournalReader(path))
+        assert [e.data.timestamp for e in events] == list(range(500))
+        assert all(e.type == EventType.TRADE for e in events)
+
+    def test_recovers_torn_tail(self, tmp_path):
+        path = str(tmp_path / "events.journal")
+
+        async def write(events):
+            journal = JournalWriter(path, chunk=4096)
+            for event in events:
+                journal.append(event)
+            await journal.close()
+
+        asyncio.run(write(trades(3)))
+        # a crash leaves a partial record and preallocated zeros behind
+        with open(path, "ab") as f:
+            f.write(b"\x40\x00\x00\x00torn" + bytes(64))
+        assert len(list(JournalReader(path))) == 3
+
+        asyncio.run(write(trades(2)))
+        assert [e.data.timestamp for e in JournalReader(path)] == [0, 1, 2, 0, 1]
+
+    def test_engine_journal_replays(self, tmp_path):
+        path = str(tmp_path / "events.journal")
+        engine = TradingEngine(Settings(exchanges=[], trading_type=TradingType.BACKTEST, journal_fp=path))
+        engine.run(trades(10))
+
+        types = [e.type for e in JournalReader(path)]
+        assert types[0] == EventType.START
+        assert types[-1] == EventType.EXIT
+        assert types.count(EventType.TRADE) == 10
+
+        replayed = TradingEngine(Settings(exchanges=[], trading_type=TradingType.BACKTEST))
+        handler = Recorder()
+        replayed.register_handler(handler)
+        replayed.run([e for e in JournalReader(path) if e.type == EventType.TRADE])
+        assert handler.events == list(range(10))
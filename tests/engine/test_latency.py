@@ -0,0 +1,99 @@
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from mxts.config import EventType, Settings
+from mxts.core.data import Event
+from mxts.core.handler import EventHandler, batched, callback
+from mxts.engine.engine import TradingEngine
+from mxts.engine.latency import Histogram
+
+
+class TestHistogram:
+    def test_percentiles(self):
+        rng = random.Random(1)
+        values = sorted(int(rng.lognormvariate(10, 2)) for _ in range(10000))
+        h = Histogram()
+        for v in values:
+            h.record(v)
+
+        assert h.count == len(values)
+        assert h.min == values[0]
+        assert h.max == values[-1]
+        assert h.percentile(100) == values[-1]
+        for p in (50, 90, 99):
+            exact = values[int(len(values) * p / 100) - 1]
+            assert abs(h.percentile(p) - exact) <= exact / 32
+
+    def test_negative_is_zero(self):
+        h = Histogram()
+        h.record(-5)
+        assert h.min == h.max == h.percentile(50) == 0
+
+
+class Slow(EventHandler):
+    @callback(EventType.TICKER)
+    async def on_ticker(self, event: Event) -> None:
+        await asyncio.sleep(0.01)
+
+
+def test_engine_records_stages():
+    async def run():
+        eng = TradingEngine(Settings(exchanges=[]))
+        eng.register_handler(Slow())
+        eng._dispatcher = asyncio.ensure_future(eng.dispatch())
+        tick = SimpleNamespace(symbol="BTC-USD", timestamp=time.time() - 0.001)
+        await eng.ticker(tick, time.time())
+        await eng.shutdown()
+        return eng
+
+    eng = asyncio.run(run())
+    stats = eng.latency_stats()
+    ticker = stats["events"]["TICKER"]
+    assert set(ticker) == {"network", "ingest", "queue", "dispatch", "total"}
+    assert ticker["network"]["count"] == 1
+    assert ticker["dispatch"]["min"] >= 10_000_000
+    assert ticker["total"]["min"] >= ticker["dispatch"]["min"]
+    assert stats["handlers"]["Slow.on_ticker"]["count"] == 1
+
+
+class Wrapped(EventHandler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    @callback(conflate=True)
+    async def on_trade(self, event: Event) -> None:
+        self.calls += 1
+        raise ValueError("boom")
+
+    @batched(max_size=2, max_wait=0.01)
+    async def on_ticks(self, batch) -> None:
+        self.calls += 1
+
+
+def test_wrapped_callbacks_recorded():
+    async def run():
+        eng = TradingEngine(Settings(exchanges=[]))
+        handler = Wrapped()
+        eng.register_handler(handler)
+        eng._dispatcher = asyncio.ensure_future(eng.dispatch())
+        await eng.push_event(Event(type=EventType.TRADE, data=SimpleNamespace(exchange="COINBASE", symbol="BTC-USD")))
+        tick = SimpleNamespace(exchange="COINBASE", symbol="BTC-USD", bid=1.0, ask=2.0, timestamp=time.time())
+        await eng.ticker(tick, time.time())
+        await asyncio.wait_for(eng.shutdown(), 5)
+        return eng, handler
+
+    eng, handler = asyncio.run(run())
+    # handing off to the conflating and batching wrappers is timed under the handler's name
+    handlers = eng.latency_stats()["handlers"]
+    assert handlers["Wrapped.on_trade"]["count"] == 1
+    assert handlers["Wrapped.on_ticks"]["count"] == 1
+    assert handler.calls == 2
+
+
+def test_disabled():
+    eng = TradingEngine(Settings(exchanges=[], latency_stats=False))
+    assert eng.latency is None
+    assert eng.latency_stats() == {}
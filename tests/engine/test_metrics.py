@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from prometheus_client import CollectorRegistry, generate_latest
+
+from mxts.config import EventType, Settings, TradingType
+from mxts.core.data import Event
+from mxts.core.handler import EventHandler
+from mxts.engine.engine import TradingEngine
+from mxts.engine.latency import Histogram
+from mxts.engine.metrics import MetricsCollector, buckets
+from mxts.exchange.base.stats import client_stats
+
+
+class Recorder(EventHandler):
+    async def on_trade(self, event: Event) -> None:
+        pass
+
+
+def test_buckets():
+    h = Histogram()
+    for v in (500, 2_000, 2_000_000, 20_000_000_000):
+        h.record(v)
+    counts = dict(buckets(h, (1e-6, 1e-3, 1.0)))
+    assert counts == {"1e-06": 1, "0.001": 2, "1.0": 3, "+Inf": 4}
+
+
+def test_exported():
+    engine = TradingEngine(Settings(exchanges=[], trading_type=TradingType.BACKTEST))
+    engine.register_handler(Recorder())
+    engine.run([Event(type=EventType.TRADE, data=SimpleNamespace(timestamp=i)) for i in range(3)])
+
+    stats = client_stats("test")
+    stats.status("get_ticker", 200)
+    stats.status("get_ticker", 429)
+    stats.connected("stream_pricing")
+    stats.connected("stream_pricing")
+
+    registry = CollectorRegistry()
+    registry.register(MetricsCollector(engine))
+    text = generate_latest(registry).decode()
+
+    assert 'mxts_events_total{type="TRADE"} 3.0' in text
+    assert 'mxts_queue_depth{lane="MARKET_DATA"} 0.0' in text
+    assert 'mxts_handler_latency_seconds_count{callback="Recorder.on_trade"} 3.0' in text
+    # label order in the text format differs across prometheus_client versions
+    labels = {"exchange": "test", "endpoint": "get_ticker", "status": "429"}
+    assert registry.get_sample_value("mxts_http_responses_total", labels) == 1.0
+    labels = {"exchange": "test", "endpoint": "stream_pricing"}
+    assert registry.get_sample_value("mxts_stream_reconnects_total", labels) == 1.0
@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq
+
+from mxts.config import EventType, InstrumentType, Settings, Side, TradingType
+from mxts.config.enums import ExchangeType
+from mxts.core import Event, Instrument, Order, Trade
+from mxts.engine.engine import TradingEngine
+from mxts.engine.parquet import TICKS, ParquetRecorder, ParquetWriter, export_ticks, read, read_ticks, tick_events
+from mxts.engine.tickstore import TickStore
+
+START = 1641168000 * 1_000_000_000
+
+
+class TestParquetWriter:
+    def test_row_groups(self, tmp_path):
+        path = str(tmp_path / "ticks.parquet")
+        with ParquetWriter(path, TICKS, row_group_size=4) as writer:
+            for i in range(10):
+                writer.append(START + i, "COINBASE", "BTC-USD" if i % 2 else "ETH-USD", float(i), i + 1.0, 1.0, 2.0)
+
+        assert pq.ParquetFile(path).num_row_groups == 3
+        ticks = read_ticks(path, "COINBASE", "BTC-USD", start=START + 2, end=START + 8)
+        assert ticks.timestamp.tolist() == [START + 3, START + 5, START + 7]
+        assert ticks.bid.tolist() == [3.0, 5.0, 7.0]
+
+    def test_export_from_tick_store(self, tmp_path):
+        store = TickStore(str(tmp_path / "store"))
+        for i in range(5):
+            store.append("COINBASE", "BTC-USD", START + i, float(i), float(i) + 1)
+        store.close()
+
+        path = str(tmp_path / "ticks.parquet")
+        assert export_ticks(store, path) == 5
+        table = read(path, ["bid"], start=START + 1, end=START + 3)
+        assert table.column("bid").to_pylist() == [1.0, 2.0]
+
+        events = list(tick_events(path))
+        assert [e.data.bid for e in events] == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert events[0].type == EventType.TICKER
+
+
+class TestParquetRecorder:
+    def test_records_orders_and_fills(self, tmp_path):
+        btc = Instrument(name="BTC-USD", exchange=ExchangeType.COINBASE, type=InstrumentType.CURRENCY)
+        order = Order(
+            id=7,
+            type=InstrumentType.CURRENCY,
+            instrument=btc,
+            exchange=ExchangeType.COINBASE,
+            volume=1.0,
+            price=100.0,
+            filled=1.0,
+            side=Side.BUY,
+            force_done=False,
+        )
+        trade = Trade(id=3, price=100.0, volume=1.0, my_order="7", taker_order=order)
+        ticker = SimpleNamespace(exchange="COINBASE", symbol="BTC-USD", bid=99.0, ask=101.0, timestamp=1.5)
+
+        recorder = ParquetRecorder(str(tmp_path))
+        assert "on_trade" not in recorder.callbacks
+        # fills are stamped with the engine clock, not the order's creation time
+        recorder._manager = SimpleNamespace(now=lambda: SimpleNamespace(value=START))
+
+        async def run():
+            await recorder.on_ticker(Event(type=EventType.TICKER, data=ticker))
+            await recorder.on_order_status(Event(type=EventType.RECEIVED, data=order))
+            await recorder.on_fill(Event(type=EventType.FILL, data=trade))
+            await recorder.on_exit(Event(type=EventType.EXIT, data=None))
+
+        asyncio.run(run())
+
+        ticks = read(str(tmp_path / "ticks.parquet"))
+        assert ticks.column("timestamp").cast(pa.int64()).to_pylist() == [1_500_000_000]
+        assert np.isnan(ticks.column("bid_size").to_pylist()[0])
+        orders = read(str(tmp_path / "orders.parquet"))
+        assert orders.column("status").to_pylist() == ["RECEIVED"]
+        assert orders.column("id").to_pylist() == [7]
+        trades = read(str(tmp_path / "trades.parquet"))
+        assert trades.column("order_id").to_pylist() == [7]
+        assert trades.column("timestamp").cast(pa.int64()).to_pylist() == [START]
+        assert trades.column("side").to_pylist() == ["BUY"]
+
+    def test_records_bars(self, tmp_path):
+        engine = TradingEngine(Settings(exchanges=[], trading_type=TradingType.BACKTEST))
+        engine.bars("time", "M1")
+        engine.register_handler(ParquetRecorder(str(tmp_path)))
+        engine.run(
+            [
+                Event(
+                    type=EventType.TRADE,
+                    data=SimpleNamespace(exchange="COINBASE", symbol="BTC-USD", price=price, amount=1.0, timestamp=ts),
+                )
+                for ts, price in ((0.0, 100.0), (30.0, 105.0), (45.0, 95.0), (61.0, 101.0))
+            ]
+        )
+
+        candles = read(str(tmp_path / "candles.parquet"))
+        assert candles.column("timestamp").cast(pa.int64()).to_pylist()[0] == 0
+        assert [candles.column(name)[0].as_py() for name in ("open", "high", "low", "close", "volume")] == [
+            100.0,
+            105.0,
+            95.0,
+            95.0,
+            3.0,
+        ]
@@ -0,0 +1,97 @@
+import random
+from types import SimpleNamespace
+
+from mxts.config import EventType, Settings, TradingType
+from mxts.core.data import Event
+from mxts.core.handler import EventHandler
+from mxts.engine.engine import TradingEngine
+from mxts.engine.managers import Periodic, TimerWheel
+
+SECOND = 1_000_000_000
+DAY = 86400
+
+
+class TestPeriodic:
+    def test_next(self):
+        # 1970-01-01 00:00:00
+        assert Periodic(print, 0, "*", "*").next(0) == 60
+        assert Periodic(print, "*", "*", "*").next(0) == 1
+        assert Periodic(print, 30, 15, "*").next(0) == 15 * 60 + 30
+        assert Periodic(print, 30, 15, "*").next(15 * 60 + 30) == 3600 + 15 * 60 + 30
+        assert Periodic(print, 0, 0, 9).next(10 * 3600) == DAY + 9 * 3600
+        assert Periodic(print, 59, 59, 23).next(DAY - 1) == 2 * DAY - 1
+
+
+class TestTimerWheel:
+    def test_fires_in_order_on_time(self):
+        rng = random.Random(7)
+        fields = [0, 1, 30, 59, "*"]
+        periodics = [
+            Periodic(print, rng.choice(fields), rng.choice(fields), rng.choice([0, 13, 23, "*"]))
+            for _ in range(50)
+        ]
+
+        wheel = TimerWheel()
+        wheel.now = start = 1_600_000_000
+        for p in periodics:
+            p.expires = p.next(start)
+            wheel.add(p)
+
+        fired = []
+        now = start
+        while now < start + 2 * DAY:
+            # mix of single steps and large jumps
+            now += rng.choice([1, 7, 59, 3600, 20000])
+            for p in wheel.advance(now):
+                fired.append((p.expires, id(p)))
+                p.expires = p.next(p.expires)
+                wheel.add(p)
+
+        expected = []
+        for p in periodics:
+            t = p.next(start)
+            while t <= now:
+                expected.append((t, id(p)))
+                t = p.next(t)
+
+        assert [t for t, _ in fired] == sorted(t for t, _ in fired)
+        assert sorted(fired) == sorted(expected)
+
+
+class Hours(EventHandler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.trades = []
+        self.runs = []
+
+    async def on_start(self, event: Event) -> None:
+        self._manager.periodic(self.every_minute, second=0, minute="*")
+        # 09:30 to 16:00
+        self._manager.restrictTradingHours(self, start_minute=30, start_hour=9, end_hour=16)
+
+    async def every_minute(self) -> None:
+        self.runs.append(self._manager.now().value)
+
+    async def on_trade(self, event: Event) -> None:
+        self.trades.append(event.data.timestamp)
+
+
+def trade(ts):
+    return Event(type=EventType.TRADE, data=SimpleNamespace(symbol="BTC-USD", timestamp=ts))
+
+
+def test_backtest_runs_periodics_on_simulated_time():
+    engine = TradingEngine(Settings(exchanges=[], heartbeat=3600, trading_type=TradingType.BACKTEST))
+    handler = Hours()
+    engine.register_handler(handler)
+
+    hours = [9, 10, 16, 9 + 24, 9.75 + 24]
+    engine.run([trade(int(h * 3600) * SECOND) for h in hours])
+
+    # outside of 09:30 - 16:00 trades are not delivered
+    assert handler.trades == [10 * 3600 * SECOND, int(9.75 * 3600) * SECOND + DAY * SECOND]
+    # every minute from the first event on, on the minute
+    assert handler.runs[0] == 9 * 3600 * SECOND
+    assert handler.runs[-1] == int(9.75 * 3600 + DAY) * SECOND
+    assert len(handler.runs) == int(0.75 * 60 + 24 * 60) + 1
+    assert all(t % (60 * SECOND) == 0 for t in handler.runs)
@@ -0,0 +1,140 @@
+import asyncio
+import multiprocessing
+import os
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from mxts.config import EventType, InstrumentType, OrderType, Settings, ShardMode, Side, TradingType
+from mxts.config.enums import ExchangeType
+from mxts.core import Instrument, Order
+from mxts.core.data import Event
+from mxts.core.handler import EventHandler, callback
+from mxts.engine.engine import TradingEngine
+from mxts.engine.shard import shard_of
+
+SYMBOLS = ["BTC-USD", "ETH-USD", "SOL-USD", "LTC-USD"]
+
+
+class Reporter(EventHandler):
+    def __init__(self, seen) -> None:
+        super().__init__()
+        self.seen = seen
+
+    async def on_trade(self, event: Event) -> None:
+        self.seen.put((os.getpid(), event.data.symbol))
+
+
+def run_sharded(mode, handlers):
+    async def run():
+        eng = TradingEngine(Settings(exchanges=[], shards=2, shard_mode=mode))
+        for handler in handlers:
+            eng.register_handler(handler)
+        eng._dispatcher = asyncio.ensure_future(eng.dispatch())
+        for symbol in SYMBOLS * 3:
+            data = SimpleNamespace(exchange="COINBASE", symbol=symbol)
+            await eng.push_event(Event(type=EventType.TRADE, data=data))
+        await eng.shutdown()
+
+    asyncio.run(run())
+
+
+def drain(seen):
+    out = []
+    while not seen.empty():
+        out.append(seen.get())
+    return out
+
+
+def test_symbol_sharding():
+    seen = multiprocessing.Queue()
+    run_sharded(ShardMode.SYMBOL, [Reporter(seen)])
+    reports = drain(seen)
+
+    assert len(reports) == len(SYMBOLS) * 3
+    owners = {}
+    for pid, symbol in reports:
+        assert owners.setdefault(symbol, pid) == pid
+        assert pid != os.getpid()
+    assert len(set(owners.values())) == len({shard_of(s, 2) for s in SYMBOLS})
+
+
+def test_strategy_sharding():
+    seen = multiprocessing.Queue()
+    run_sharded(ShardMode.STRATEGY, [Reporter(seen), Reporter(seen)])
+    reports = drain(seen)
+
+    # each strategy sees every symbol, from its own process
+    assert len(reports) == len(SYMBOLS) * 3 * 2
+    assert len({pid for pid, _ in reports}) == 2
+
+
+class Trader(EventHandler):
+    def __init__(self, seen, volume) -> None:
+        super().__init__()
+        self.seen = seen
+        self.volume = volume
+        self.ordered = False
+
+    @callback(EventType.TICKER)
+    async def on_ticker(self, event: Event) -> None:
+        if not self.ordered:
+            self.ordered = True
+            instrument = Instrument(name="BTC-USD", exchange=ExchangeType.COINBASE, type=InstrumentType.CURRENCY)
+            order = Order(
+                id=0,
+                type=InstrumentType.CURRENCY,
+                instrument=instrument,
+                exchange=ExchangeType.COINBASE,
+                volume=self.volume,
+                price=0.0,
+                filled=0.0,
+                side=Side.BUY,
+                order_type=OrderType.MARKET,
+                stop_target=None,
+                force_done=False,
+            )
+            await self._manager.new_order(self, order)
+
+    async def on_bought(self, event: Event) -> None:
+        self.seen.put((os.getpid(), self.volume, event.data.volume))
+
+
+def test_shard_orders_filled_by_router():
+    seen = multiprocessing.Queue()
+
+    async def run():
+        config = Settings(
+            exchanges=[], shards=2, shard_mode=ShardMode.STRATEGY, trading_type=TradingType.SIMULATION
+        )
+        eng = TradingEngine(config)
+        eng.register_handler(Trader(seen, 1.0))
+        eng.register_handler(Trader(seen, 2.0))
+        eng._dispatcher = asyncio.ensure_future(eng.dispatch())
+        data = SimpleNamespace(exchange="COINBASE", symbol="BTC-USD", bid=99.0, ask=101.0)
+        await eng.push_event(Event(type=EventType.TICKER, data=data))
+        # the orders come up from the shards, their fills go back down
+        reports = []
+        for _ in range(200):
+            while not seen.empty():
+                reports.append(seen.get())
+            if len(reports) >= 2:
+                break
+            await asyncio.sleep(0.05)
+        await eng.shutdown()
+        return reports + drain(seen), len(eng._router._owners)
+
+    reports, open_orders = asyncio.run(run())
+    # each fill only reaches the shard of the trader that placed the order
+    assert sorted((ordered, filled) for _, ordered, filled in reports) == [(1.0, 1.0), (2.0, 2.0)]
+    assert len({pid for pid, _, _ in reports}) == 2
+    assert open_orders == 0
+
+
+def test_replays_are_unsharded():
+    with pytest.raises(ValidationError):
+        Settings(exchanges=[], trading_type=TradingType.BACKTEST, shards=2)
+    eng = TradingEngine(Settings(exchanges=[], trading_type=TradingType.SIMULATION, shards=2))
+    with pytest.raises(ValueError):
+        eng.run([Event(type=EventType.TRADE, data=SimpleNamespace(timestamp=0))])
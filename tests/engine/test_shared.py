@@ -0,0 +1,133 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from mxts.engine.datastore import MarketDataStore
+from mxts.engine.shared import RedisMarketData
+
+
+class FakeRedis:
+    """in-process stand-in for the aioredis commands the store uses, values
+    are kept as strings like the server keeps them"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.sets = {}
+        self.messages = []
+        # pipelines executed, one round trip each
+        self.round_trips = 0
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    def hmset_dict(self, key, fields):
+        self.hashes.setdefault(key, {}).update({name: str(value) for name, value in fields.items()})
+
+    def publish(self, channel, message):
+        self.messages.append((channel, message))
+
+    async def smembers(self, key, encoding=None):
+        return set(self.sets.get(key, ()))
+
+    async def hgetall(self, key, encoding=None):
+        return dict(self.hashes.get(key, {}))
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            future = asyncio.get_event_loop().create_future()
+            self.commands.append((future, getattr(self.redis, name), args, kwargs))
+            return future
+
+        return command
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        results = []
+        for future, method, args, kwargs in self.commands:
+            result = method(*args, **kwargs)
+            if asyncio.iscoroutine(result):
+                result = await result
+            future.set_result(result)
+            results.append(result)
+        return results
+
+
+def tick(instrument, i, price):
+    return SimpleNamespace(instrument=instrument, time=i, bid=price, ask=price + 0.5)
+
+
+class TestRedisPublisher:
+    def test_writes_coalesced_per_flush(self):
+        redis = FakeRedis()
+        store = MarketDataStore(None, ["EUR_USD", "USD_JPY"], length=50)
+        publisher = store.share(redis, interval=3600)
+
+        async def run():
+            for i in range(1000):
+                await store.update_data(tick("EUR_USD", i, 1.0 + i / 1000))
+                await store.update_data(tick("USD_JPY", i, 110.0 + i / 100))
+            await publisher.flush()
+            await publisher.flush()
+
+        asyncio.run(run())
+        assert redis.round_trips == 1
+        assert publisher.writes == 2
+        assert redis.sets["mxts:instruments"] == {"EUR_USD", "USD_JPY"}
+        assert redis.messages == [("mxts:updates", "EUR_USD USD_JPY")]
+
+    def test_reader_sees_store_stats(self):
+        redis = FakeRedis()
+        store = MarketDataStore(None, ["EUR_USD", "USD_JPY"], length=50)
+        publisher = store.share(redis, prefix="fx", interval=0.01)
+        reader = RedisMarketData(redis, prefix="fx")
+
+        async def run():
+            for i in range(200):
+                await store.update_data(tick("EUR_USD", i, 1.0 + i / 1000))
+                if i % 50 == 0:
+                    await asyncio.sleep(0.02)
+            await publisher.close()
+            return await reader.instruments(), await reader.snapshot(), await reader.stats("USD_JPY")
+
+        instruments, snapshot, missing = asyncio.run(run())
+        assert instruments == ["EUR_USD"]
+        assert missing is None
+        stats = store.compute_stats("EUR_USD")
+        shared = snapshot["EUR_USD"]
+        assert shared["time"] == 199
+        assert shared["count"] == stats.count
+        assert shared["bid"] == stats.bid
+        assert shared["ask_mean"] == pytest.approx(stats.ask_mean)
+        # a handful of flushes, not one per tick
+        assert 2 <= redis.round_trips < 20
+
+    def test_failed_flush_is_retried(self):
+        redis = FakeRedis()
+        store = MarketDataStore(None, ["EUR_USD"], length=10)
+        publisher = store.share(redis, interval=3600)
+
+        async def fail():
+            raise ConnectionError("redis went away")
+
+        async def run():
+            await store.update_data(tick("EUR_USD", 0, 1.0))
+            pipeline = FakePipeline(redis)
+            pipeline.execute = fail
+            redis.pipeline = lambda: pipeline
+            await publisher.flush()
+            del redis.pipeline
+            await publisher.close()
+
+        asyncio.run(run())
+        assert publisher.flushes == 1
+        assert redis.hashes["mxts:EUR_USD"]["bid"] == "1.0"
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from mxts.engine.snapshot import FIELDS, SnapshotMatrix, asof_panel
+from mxts.engine.tickstore import TickStore
+
+SECOND = 1_000_000_000
+
+
+class TestSnapshotMatrix:
+    def test_update_in_place(self):
+        snapshot = SnapshotMatrix(["EUR_USD", "USD_JPY"])
+        snapshot.update("USD_JPY", 5, 110.0, 110.2)
+        values = snapshot.values
+        assert values.shape == (2, len(FIELDS))
+        assert np.isnan(values[0]).all()
+        assert values[1].tolist() == pytest.approx([110.0, 110.2, 110.1])
+        assert snapshot.times.tolist() == [0, 5]
+
+        snapshot.update("USD_JPY", 6, 111.0, 111.0)
+        # the view sees updates without being fetched again
+        assert values[1, 0] == 111.0
+        with pytest.raises(ValueError):
+            values[0, 0] = 1.0
+
+    def test_grows_for_new_instruments(self):
+        snapshot = SnapshotMatrix(capacity=2)
+        for i in range(1000):
+            snapshot.update(f"PAIR_{i}", i, float(i), float(i) + 1)
+        assert len(snapshot) == 1000
+        assert snapshot.values[:, 0].tolist() == [float(i) for i in range(1000)]
+        assert snapshot.frame().loc["PAIR_7", "ask"] == 8.0
+
+
+class TestAsofPanel:
+    def test_last_quote_at_or_before_sample(self):
+        ticks = {
+            "A": (np.array([0, 2 * SECOND, 5 * SECOND]), np.array([1.0, 2.0, 3.0]), np.array([1.0, 2.0, 3.0])),
+            "B": (np.array([3 * SECOND]), np.array([10.0]), np.array([12.0])),
+        }
+        panel = asof_panel(ticks, 0, 6 * SECOND, SECOND)
+        assert panel.times.tolist() == [i * SECOND for i in range(6)]
+        assert panel.field("bid")[:, 0].tolist() == [1.0, 1.0, 2.0, 2.0, 2.0, 3.0]
+        mid = panel.field("mid")[:, 1]
+        assert np.isnan(mid[:3]).all()
+        assert mid[3:].tolist() == [11.0, 11.0, 11.0]
+        assert list(panel.frame("mid").columns) == ["A", "B"]
+
+    def test_from_tick_store(self, tmp_path):
+        store = TickStore(str(tmp_path))
+        for i in range(10):
+            store.append("COINBASE", "BTC-USD", i * SECOND, float(i), float(i) + 1)
+        store.close()
+
+        panel = asof_panel({"BTC-USD": store.read("COINBASE", "BTC-USD")}, 0.5, 10.5, "2s")
+        assert panel.field("ask")[:, 0].tolist() == [1.0, 3.0, 5.0, 7.0, 9.0]
@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+
+from mxts.config import EventType
+from mxts.engine.tickstore import DAY, TickStore
+
+# 2022-01-03 00:00 UTC
+START = 1641168000 * 1_000_000_000
+
+
+class TestTickStore:
+    def test_partitions_by_day(self, tmp_path):
+        store = TickStore(str(tmp_path), flush_size=4)
+        for i in range(10):
+            store.append("COINBASE", "BTC-USD", START + i * DAY // 4, 100.0 + i, 101.0 + i)
+        store.close()
+
+        days = store.days("COINBASE", "BTC-USD")
+        assert [d.isoformat() for d in days] == ["2022-01-03", "2022-01-04", "2022-01-05"]
+        ticks = store.read("COINBASE", "BTC-USD")
+        assert len(ticks) == 10
+        assert ticks.bid.tolist() == [100.0 + i for i in range(10)]
+        assert math.isnan(ticks.bid_size[0])
+
+    def test_range_query_is_zero_copy(self, tmp_path):
+        store = TickStore(str(tmp_path))
+        for i in range(100):
+            store.append("COINBASE", "ETH-USD", START + i, float(i), float(i) + 1, 1.0, 2.0)
+        store.flush()
+
+        ticks = store.read("COINBASE", "ETH-USD", START + 10, START + 20)
+        assert ticks.timestamp.tolist() == [START + i for i in range(10, 20)]
+        assert isinstance(ticks.bid, np.memmap)
+        assert ticks.ask_size.tolist() == [2.0] * 10
+        assert len(store.read("COINBASE", "ETH-USD", START + 200)) == 0
+        store.close()
+
+    def test_reopen_appends(self, tmp_path):
+        store = TickStore(str(tmp_path))
+        store.append("COINBASE", "BTC-USD", START, 1.0, 2.0)
+        store.close()
+
+        store = TickStore(str(tmp_path))
+        store.append("COINBASE", "BTC-USD", START + 1, 3.0, 4.0)
+        # out of order ticks are kept at the last timestamp
+        store.append("COINBASE", "BTC-USD", START, 5.0, 6.0)
+        store.close()
+
+        ticks = store.read("COINBASE", "BTC-USD")
+        assert ticks.timestamp.tolist() == [START, START + 1, START + 1]
+        assert ticks.bid.tolist() == [1.0, 3.0, 5.0]
+        assert store.reordered == 1
+
+    def test_events_merged_in_time_order(self, tmp_path):
+        store = TickStore(str(tmp_path))
+        for i in range(5):
+            store.append("COINBASE", "BTC-USD", START + 2 * i, 1.0, 2.0)
+            store.append("COINBASE", "ETH-USD", START + 2 * i + 1, 3.0, 4.0)
+        store.close()
+
+        events = list(store.events())
+        assert len(events) == 10
+        assert all(e.type == EventType.TICKER for e in events)
+        assert [e.data.symbol for e in events[:2]] == ["BTC-USD", "ETH-USD"]
+        timestamps = [e.data.timestamp for e in events]
+        assert timestamps == sorted(timestamps)
@@ -0,0 +1,81 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from mxts.engine.datastore import MarketDataStore, TickBuffer
+from mxts.engine.tiered import TICK_BYTES, MemoryBudget, SegmentedBuffer
+
+
+class TestSegmentedBuffer:
+    def test_matches_tick_buffer_under_budget(self, tmp_path):
+        # room for three segments of 100 ticks
+        budget = MemoryBudget(3 * 100 * TICK_BYTES, str(tmp_path))
+        buffers = [SegmentedBuffer(1000, budget, 100) for _ in range(2)]
+        rings = [TickBuffer(1000) for _ in range(2)]
+        for i in range(2500):
+            for k in range(2):
+                tick = (i, float(i + k), float(i + k) + 0.5)
+                assert buffers[k].append(*tick) == rings[k].append(*tick)
+            assert budget.resident <= budget.limit
+
+        for buffer, ring in zip(buffers, rings):
+            for column, expected in zip(buffer.view(), ring.view()):
+                assert column.tolist() == expected.tolist()
+            assert buffer.latest() == ring.latest()
+            assert len(buffer) == 1000
+
+        stats = budget.stats()
+        assert stats["evictions"] > 0
+        assert stats["loads"] > 0
+        assert stats["spilled_bytes"] > 0
+        # segments that left the windows are removed from disk
+        assert len(os.listdir(tmp_path)) <= 2 * 1000 // 100
+
+    def test_reads_fall_through_without_loading(self, tmp_path):
+        budget = MemoryBudget(100 * TICK_BYTES, str(tmp_path))
+        buffer = SegmentedBuffer(10_000, budget, 100)
+        for i in range(1000):
+            buffer.append(i, float(i), float(i))
+        resident, evictions = budget.resident, budget.evictions
+
+        timestamp, bid, _ = buffer.view()
+        assert timestamp.tolist() == list(range(1000))
+        assert bid[-1] == 999.0
+        assert budget.resident == resident
+        assert budget.evictions == evictions
+        assert budget.loads == 9
+
+    def test_close_removes_spill_directory(self):
+        budget = MemoryBudget(0)
+        buffer = SegmentedBuffer(10, budget, 5)
+        for i in range(10):
+            buffer.append(i, 1.0, 1.0)
+        assert os.listdir(budget.directory)
+        budget.close()
+        assert not os.path.exists(budget.directory)
+
+
+def test_store_under_budget():
+    ticks = np.random.default_rng(0).normal(100, 1, 1200)
+    stores = [MarketDataStore(None, ["A"], length=500), MarketDataStore(None, ["A"], length=500, budget=5000)]
+
+    async def run():
+        for store in stores:
+            for i, price in enumerate(ticks):
+                await store.update_data(SimpleNamespace(instrument="A", time=i, bid=price, ask=price + 0.1))
+
+    asyncio.run(run())
+    plain, tiered = (store.compute_stats("A") for store in stores)
+    assert tiered.bid_mean == pytest.approx(plain.bid_mean)
+    assert tiered.ask_std == pytest.approx(plain.ask_std)
+    assert tiered.bid_min == plain.bid_min
+    assert stores[1].frame("A").equals(stores[0].frame("A"))
+
+    memory = stores[1].memory()
+    assert memory["resident_bytes"] <= 5000
+    assert memory["evictions"] > 0
+    assert stores[0].memory()["resident_bytes"] == 2 * 500 * TICK_BYTES
+    stores[1].close()
@@ -0,0 +1,102 @@
+import asyncio
+from types import SimpleNamespace
+
+from mxts.config import EventType, InstrumentType, OrderFlag, OrderType, Side
+from mxts.config.enums import ExchangeType
+from mxts.core import Event, Instrument, Order
+from mxts.exchange.simulation import SimulationExchange
+
+BTC = Instrument(name="BTC-USD", exchange=ExchangeType.COINBASE, type=InstrumentType.CURRENCY)
+
+
+def order(side, price, volume=1.0, order_type=OrderType.LIMIT, flag=OrderFlag.NONE, stop_target=None):
+    return Order(
+        id=0,
+        type=InstrumentType.CURRENCY,
+        instrument=BTC,
+        exchange=ExchangeType.COINBASE,
+        volume=volume,
+        price=price,
+        filled=0.0,
+        side=side,
+        order_type=order_type,
+        flag=flag,
+        stop_target=stop_target,
+        force_done=False,
+    )
+
+
+def ticker(bid, ask, bid_size=None, ask_size=None):
+    data = SimpleNamespace(symbol="BTC-USD", bid=bid, ask=ask, bid_size=bid_size, ask_size=ask_size)
+    return Event(type=EventType.TICKER, data=data)
+
+
+def simulate(*steps):
+    events = []
+
+    async def push_event(event):
+        events.append(event)
+
+    async def run():
+        exchange = SimulationExchange(push_event)
+        for step in steps:
+            if isinstance(step, Event):
+                await exchange.on_ticker(step)
+            else:
+                await exchange.new_order(step)
+        return exchange
+
+    exchange = asyncio.run(run())
+    return exchange, [(e.type, getattr(e.data, "price", None), getattr(e.data, "volume", None)) for e in events]
+
+
+class TestSimulationExchange:
+    def test_resting_limit_fills_when_market_crosses(self):
+        _, events = simulate(ticker(99.0, 101.0), order(Side.BUY, 100.0), ticker(98.0, 99.5))
+        assert events == [
+            (EventType.RECEIVED, 100.0, 1.0),
+            (EventType.FILL, 100.0, 1.0),
+            (EventType.BOUGHT, 100.0, 1.0),
+        ]
+
+    def test_market_order_takes_quote_size(self):
+        _, events = simulate(ticker(99.0, 101.0, ask_size=0.4), order(Side.BUY, 0.0, order_type=OrderType.MARKET))
+        assert events == [
+            (EventType.RECEIVED, 0.0, 1.0),
+            (EventType.FILL, 101.0, 0.4),
+            (EventType.BOUGHT, 101.0, 0.4),
+            (EventType.CANCELED, 0.0, 1.0),
+        ]
+
+    def test_market_order_without_quote_is_rejected(self):
+        _, events = simulate(order(Side.SELL, 0.0, order_type=OrderType.MARKET))
+        assert events == [(EventType.REJECTED, 0.0, 1.0)]
+
+    def test_fill_or_kill(self):
+        _, events = simulate(ticker(99.0, 101.0, ask_size=0.5), order(Side.BUY, 101.0, flag=OrderFlag.FILL_OR_KILL))
+        assert [e[0] for e in events] == [EventType.RECEIVED, EventType.CANCELED]
+
+    def test_immediate_or_cancel(self):
+        _, events = simulate(ticker(99.0, 101.0, ask_size=0.5), order(Side.BUY, 101.0, flag=OrderFlag.IMMEDIATE_OR_CANCEL))
+        assert [e[0] for e in events] == [EventType.RECEIVED, EventType.FILL, EventType.BOUGHT, EventType.CANCELED]
+
+    def test_all_or_none_rests_until_it_can_fill(self):
+        exchange, events = simulate(
+            ticker(99.0, 101.0, ask_size=0.5),
+            order(Side.BUY, 101.0, flag=OrderFlag.ALL_OR_NONE),
+            ticker(99.0, 101.0, ask_size=2.0),
+        )
+        assert events[1:] == [(EventType.FILL, 101.0, 1.0), (EventType.BOUGHT, 101.0, 1.0)]
+        assert len(exchange.book("BTC-USD")) == 0
+
+    def test_stop_submits_its_target(self):
+        target = order(Side.SELL, 0.0, order_type=OrderType.MARKET)
+        stop = order(Side.SELL, 95.0, volume=0.0, order_type=OrderType.STOP, stop_target=target)
+        _, events = simulate(ticker(99.0, 101.0), stop, ticker(94.0, 96.0))
+        assert [e[0] for e in events] == [
+            EventType.RECEIVED,
+            EventType.RECEIVED,
+            EventType.FILL,
+            EventType.SOLD,
+        ]
+        assert events[2][1] == 94.0